@@ -0,0 +1,34 @@
+"""Parent chunks table for the postgres docstore backend.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = "002"
+down_revision: str | None = "001"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "parent_chunks",
+        sa.Column("id", sa.Text, primary_key=True),
+        sa.Column("document_id", sa.Text, nullable=False),
+        sa.Column("content", sa.Text, nullable=False),
+    )
+    op.create_index(
+        "ix_parent_chunks_document_id", "parent_chunks", ["document_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_parent_chunks_document_id", table_name="parent_chunks")
+    op.drop_table("parent_chunks")
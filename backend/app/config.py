@@ -22,6 +22,9 @@ class Settings(BaseSettings):
 
     chroma_host: str = "chromadb"
     chroma_port: int = 8000
+    # chromadb's async HTTP client for chat-time queries; off until it beats
+    # the thread-wrapped sync client (scripts/benchmark_retrieval.py)
+    chroma_async_client: bool = False
 
     ollama_base_url: str = "http://ollama:11434"
     llm_model: str = "qwen3.5:4b"
@@ -35,23 +38,105 @@ class Settings(BaseSettings):
     converter_url: str = ""
 
     docstore_path: str = "/data/docstore"
+    # "files": one file per parent chunk; "segment" (opt-in, after
+    # `make migrate-docstore` on an existing docstore): append-only segment
+    # files under {docstore_path}/segments;
+    # "postgres" / "redis": parent chunks off the volume.  Workers without
+    # the volume also need lexical_index_path="", retrieval_cache_backend
+    # and embedding_cache_backend "redis" (or "none"): those default to it
+    docstore_backend: str = "files"
+    # compress segment-store values with a dictionary trained on the
+    # library: "zstd", "zlib" or None (older values stay readable either way)
+    docstore_compression: str | None = None
+    # API-process LRU of parent texts, bounded in bytes (0 disables)
+    docstore_cache_bytes: int = 64 << 20
+    # BM25 index fused with dense retrieval; empty string disables it.
+    # `make backfill-lexical` indexes papers ingested before it existed.
+    lexical_index_path: str = "/data/docstore/lexical_index"
 
     retriever_topk: int = 5
+    # drop retrieved chunks whose Chroma distance exceeds this value, or the
+    # best hit's distance by more than this fraction (None disables each)
+    retriever_max_distance: float | None = None
+    retriever_relative_gap: float | None = None
+    # MMR over retriever_mmr_fetch_k candidates to drop near-duplicate
+    # overlapping chunks (None disables; 0.5 balances relevance/diversity)
+    retriever_mmr_lambda: float | None = None
+    retriever_mmr_fetch_k: int = 20
+    # two-stage retrieval for large libraries: search chunks of the N papers
+    # closest to the query (paper-level index of title, abstract and
+    # section centroids) instead of the whole scope (None disables)
+    retriever_paper_fetch_n: int | None = None
     reranker_model: str | None = "ms-marco-MultiBERT-L-12"
     reranker_topk: int = 5
+    # candidates fetched for reranking, and the per-request budget after
+    # which the retriever's own order is used instead
+    reranker_fetch_k: int = 20
+    reranker_timeout_seconds: float = 1.0
+    # pairs from concurrent requests arriving within this window share one
+    # inference call; scores are cached per (model, query, chunk)
+    reranker_batch_window_ms: float = 5.0
+    reranker_score_cache_size: int = 4096
 
     chat_context_docs: int = 2
     chat_max_context_chars: int = 6000
+    # pack context blocks by their token counts (see chunk_tokenizer);
+    # chat_max_context_chars still caps the result (None disables)
+    chat_max_context_tokens: int | None = None
+    # per-paper quota retrieval (one search per selected paper) is used for
+    # at most this many papers; larger selections get one global search.
+    # Clients read both from GET /settings/chat (None: no quota suggested)
+    chat_per_paper_quota: int | None = 2
+    chat_per_paper_max_papers: int = 4
     chat_history_turns: int = 4
     chat_model_keep_alive: str = "30m"
     chat_fast_retrieval: bool = True
+    # per-stage budgets; a late expansion keeps the child chunks, a late
+    # search keeps the BM25 hits.  The retrieval timeout caps the total:
+    # each stage gets at most what is left of it.
+    chat_embed_timeout_seconds: float = 0.5
+    chat_search_timeout_seconds: float = 1.0
+    chat_expand_timeout_seconds: float = 0.5
     chat_retrieval_timeout_seconds: float = 2.5
 
+    # opt-in: replay the stored answer for a near-duplicate question over
+    # the same papers (cosine >= threshold).  Answers are reused regardless
+    # of the conversation history, so follow-ups like "explain it" may hit.
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_size: int = 1024
+    semantic_cache_ttl_seconds: float = 86400.0
+
     chat_num_ctx: int = 20000
     chat_num_predict: int = 50000
     chat_temperature: float = 0.1
 
     embedding_batch_size: int = 128
+    # size child chunks in tokens of the embedding model's tokenizer
+    # (tokenizer.json path or Hugging Face id, e.g.
+    # nomic-ai/nomic-embed-text-v1.5) instead of characters (None)
+    chunk_tokenizer: str | None = None
+    chunk_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    embedding_max_concurrency: int = 4
+    embedding_target_latency_seconds: float = 10.0
+    # "local" (LocalFileStore at embedding_cache_path), "redis" or "none"
+    embedding_cache_backend: str = "local"
+    embedding_cache_path: str = "/data/embedding_cache"
+
+    query_embedding_cache_size: int = 1024
+    query_embedding_cache_ttl_seconds: float = 3600.0
+    # set to a directory to persist query embeddings across API restarts
+    query_embedding_cache_path: str | None = None
+
+    # retrieval results cached per (query, papers, topk, model, index
+    # version); size 0 disables.  "redis" adds a tier shared by API workers
+    # and keeps the per-paper index versions in Redis, "memory" keeps them
+    # under index_versions_path on the docstore volume.
+    retrieval_cache_size: int = 256
+    retrieval_cache_ttl_seconds: float = 600.0
+    retrieval_cache_backend: str = "memory"
+    index_versions_path: str = "/data/docstore/index_versions"
 
 
 @lru_cache
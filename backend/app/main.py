@@ -12,7 +12,7 @@ Routers:
   /tasks   – Celery task status polling
 
 Health:
-  GET /health  – liveness probe (DB ping + Chroma ping)
+  GET /health  – liveness probe (DB ping + Chroma ping) and parent-cache stats
 """
 
 from __future__ import annotations
@@ -22,18 +22,26 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from flashrank import Ranker
+from langchain_classic.storage import LocalFileStore
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 
+from docseer.agents.answer_cache import SemanticAnswerCache
 from docseer.agents.basic_agent import BasicAgent
-from docseer.databases.chroma import ChromaVectorDB
-from docseer.databases.localfilestore import LocalFileStoreDB
+from docseer.databases.embedding_cache import QueryEmbeddingCache
+from docseer.databases.lexical_index import BM25Index
+from docseer.databases.parent_cache import ParentCache
+from docseer.retrievers.async_flashrankrerank import AsyncFlashrankRerank
 from docseer.retrievers.retriever import Retriever
 
-from .config import get_settings
+from .config import Settings, get_settings
 from .database import async_engine
 from .models.paper import Base
 from .ollama_utils import ensure_models
 from .routers import chat_router, papers_router, settings_router, tasks_router
+from .services.docstore import open_docstore
+from .services.retrieval_cache import index_versions, retrieval_cache
+from .services.retriever import build_retriever, build_vector_db
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +60,29 @@ async def _warmup_model(llm: ChatOllama, model_name: str) -> None:
         logger.warning("LLM warm-up failed (non-fatal): %s", exc)
 
 
+def _load_reranker(
+    settings: Settings, model: str
+) -> AsyncFlashrankRerank | None:
+    """
+    Load the FlashRank *model* and run one rerank so the first chat request
+    does not pay for it.  Reranking is skipped if the model cannot be loaded.
+    """
+    try:
+        reranker = AsyncFlashrankRerank(
+            client=Ranker(model_name=model),
+            model=model,
+            top_n=settings.reranker_topk,
+            batch_window=settings.reranker_batch_window_ms / 1000,
+            score_cache_size=settings.reranker_score_cache_size,
+        )
+        reranker.warmup()
+        logger.info("Reranker '%s' loaded.", model)
+        return reranker
+    except Exception as exc:
+        logger.warning("Reranker load failed, reranking disabled: %s", exc)
+        return None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings = get_settings()
@@ -74,18 +105,43 @@ async def lifespan(app: FastAPI):
         base_url=settings.ollama_base_url,
     )
 
-    vector_db = ChromaVectorDB(
-        model_embeddings=embeddings,
-        batch_size=settings.embedding_batch_size,
-        chroma_host=settings.chroma_host,
-        chroma_port=settings.chroma_port,
+    query_cache = QueryEmbeddingCache(
+        maxsize=settings.query_embedding_cache_size,
+        ttl=settings.query_embedding_cache_ttl_seconds,
+        store=(
+            LocalFileStore(settings.query_embedding_cache_path)
+            if settings.query_embedding_cache_path
+            else None
+        ),
     )
-    docstore = LocalFileStoreDB(path_db=settings.docstore_path)
 
-    retriever = Retriever(
-        vector_db=vector_db,
+    vector_db = build_vector_db(settings, embeddings, query_cache)
+    docstore = open_docstore(settings)
+    if settings.docstore_cache_bytes > 0:
+        docstore = ParentCache(
+            docstore, max_bytes=settings.docstore_cache_bytes
+        )
+
+    lexical_index = (
+        BM25Index(settings.lexical_index_path)
+        if settings.lexical_index_path
+        else None
+    )
+    if lexical_index is not None and len(lexical_index) < (
+        await asyncio.to_thread(vector_db.collection.count)
+    ):
+        logger.warning(
+            "The BM25 index misses chunks stored in Chroma; run "
+            "`make backfill-lexical` to index papers ingested before it."
+        )
+
+    retriever = build_retriever(
+        settings,
+        vector_db,
         docstore=docstore,
-        topk=settings.retriever_topk,
+        lexical_index=lexical_index,
+        result_cache=retrieval_cache(settings),
+        index_versions=index_versions(settings),
     )
 
     llm = ChatOllama(
@@ -100,6 +156,23 @@ async def lifespan(app: FastAPI):
 
     app.state.retriever = retriever
     app.state.agent = agent
+    app.state.answer_cache = (
+        SemanticAnswerCache(
+            threshold=settings.semantic_cache_threshold,
+            maxsize=settings.semantic_cache_size,
+            ttl=settings.semantic_cache_ttl_seconds,
+        )
+        if settings.semantic_cache_enabled
+        else None
+    )
+
+    app.state.reranker = (
+        await asyncio.to_thread(
+            _load_reranker, settings, settings.reranker_model
+        )
+        if settings.reranker_model
+        else None
+    )
 
     asyncio.create_task(_warmup_model(llm, settings.llm_model))
 
@@ -162,4 +235,7 @@ async def health() -> dict:
     results["status"] = (
         "ok" if all(v == "ok" for v in results.values()) else "degraded"
     )
+    docstore = getattr(getattr(app.state, "retriever", None), "docstore", None)
+    if isinstance(docstore, ParentCache):
+        results["docstore_cache"] = docstore.stats()
     return results
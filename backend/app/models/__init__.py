@@ -1,3 +1,4 @@
+from .docstore import ParentChunk
 from .paper import Base, Paper, PaperStatus
 
-__all__ = ["Base", "Paper", "PaperStatus"]
+__all__ = ["Base", "Paper", "PaperStatus", "ParentChunk"]
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Text
+
+from .paper import Base
+
+
+class ParentChunk(Base):
+    """Parent chunk text, for the ``postgres`` docstore backend."""
+
+    __tablename__ = "parent_chunks"
+
+    id = Column(Text, primary_key=True)
+    document_id = Column(Text, nullable=False, index=True)
+    content = Column(Text, nullable=False)
@@ -2,6 +2,12 @@
 Chat router
 ───────────
 POST /chat/stream   – SSE stream; JSON events per chunk:
+                      {"type": "meta", "content": "context-chunks", "kept": n,
+                       "topk": k, "tokens": t}
+                      {"type": "meta", "content": "semantic-cache", "hit": b}
+                      {"type": "meta", "content": "rerank-skipped", "reason": r}
+                      {"type": "meta", "content": "stage-timings",
+                       "timings": {stage: ms}, "degraded": {stage: reason}}
                       {"type": "thinking", "content": "..."}
                       {"type": "response", "content": "..."}
                       {"type": "done"}
@@ -12,6 +18,7 @@ DELETE /chat/history – clear conversation history
 
 from __future__ import annotations
 
+import re
 import json
 import logging
 import asyncio
@@ -20,7 +27,11 @@ from typing import AsyncIterator
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 
+from docseer.agents.answer_cache import SemanticAnswerCache
 from docseer.agents.utils import docs_to_md
+from docseer.retrievers import doc_tokens, interleave_papers
+from docseer.retrievers.deadlines import StageBudget
+from docseer.retrievers.result_cache import ALL_DOCUMENTS
 
 from ..config import get_settings
 from ..schemas.chat import ChatHistoryResponse, ChatMessage, QueryRequest
@@ -34,9 +45,26 @@ def _sse(payload: dict) -> str:
     return f"data: {json.dumps(payload)}\n\n"
 
 
-def _build_context_md(query: str, context: list, settings) -> str:
+def _build_context_md(
+    query: str, context: list, settings, per_paper: bool = False
+) -> str:
     """Build a bounded context string to reduce first-token latency."""
-    limited_context = context[: settings.chat_context_docs]
+    max_docs = settings.chat_context_docs
+    if per_paper:
+        # one chunk of every paper in a per-paper (comparative) retrieval
+        papers = {doc.metadata.get("document_id") for doc in context}
+        max_docs = max(max_docs, len(papers))
+    limited_context = context[:max_docs]
+    if settings.chat_max_context_tokens is not None:
+        # whole blocks while they fit the budget, always at least one
+        budget = settings.chat_max_context_tokens
+        packed = []
+        for doc in limited_context:
+            budget -= doc_tokens(doc)
+            if packed and budget < 0:
+                break
+            packed.append(doc)
+        limited_context = packed
     context_md = docs_to_md(limited_context)
     if len(context_md) > settings.chat_max_context_chars:
         context_md = context_md[: settings.chat_max_context_chars]
@@ -48,12 +76,96 @@ def _build_context_md(query: str, context: list, settings) -> str:
     return context_md
 
 
+def _per_paper_quota(
+    quota: int | None, paper_ids: list[str] | None, settings
+) -> int | None:
+    """
+    The per-paper quota when it applies: more than one paper, and few
+    enough that one search per paper stays cheaper than one over all.
+    """
+    n_papers = len(paper_ids or [])
+    if quota is None or not 1 < n_papers <= settings.chat_per_paper_max_papers:
+        return None
+    return quota
+
+
+def _stage_budget(settings) -> StageBudget:
+    """
+    Per-request stage deadlines.  A late parent expansion falls back to the
+    child chunks and a late rerank to the retriever's order, so the context
+    already paid for still reaches the LLM.
+    """
+    budgets = {"rerank": settings.reranker_timeout_seconds}
+    if settings.chat_fast_retrieval:
+        budgets |= {
+            "embed": settings.chat_embed_timeout_seconds,
+            "papers": settings.chat_search_timeout_seconds,
+            "search": settings.chat_search_timeout_seconds,
+            "lexical": settings.chat_search_timeout_seconds,
+            "expand": settings.chat_expand_timeout_seconds,
+        }
+    return StageBudget(budgets)
+
+
+async def _rerank(
+    reranker, query: str, context: list, topk: int, stages: StageBudget
+) -> tuple[list, str | None]:
+    """
+    Rerank *context* within the stage budget.  Returns the documents and,
+    when the retriever's order had to be kept instead, the reason.
+    """
+    ranked = await stages.run(
+        "rerank", reranker.acompress_documents(context, query), fallback=None
+    )
+    if ranked is None:
+        return context[:topk], stages.degraded["rerank"]
+    return list(ranked)[:topk], None
+
+
+async def _answer_cache_key(
+    agent,
+    retriever,
+    query: str,
+    paper_ids: list[str] | None,
+    topk: int,
+    think_mode: bool,
+    stages: StageBudget,
+    per_paper_quota: int | None = None,
+) -> tuple[list[float], int] | None:
+    """
+    Query embedding + partition (papers, models, index versions), or None
+    when the embedding misses its stage budget.
+    """
+    embedding = await stages.run(
+        "embed", retriever.vector_db.aembed_query(query), fallback=None
+    )
+    if embedding is None:
+        return None
+    versions: list[str] = []
+    if getattr(retriever, "index_versions", None) is not None:
+        versions = await asyncio.to_thread(
+            retriever.index_versions.get,
+            sorted(paper_ids) if paper_ids is not None else [ALL_DOCUMENTS],
+        )
+    partition = SemanticAnswerCache.partition(
+        sorted(paper_ids or []),
+        topk,
+        think_mode,
+        per_paper_quota,
+        getattr(agent.model, "model", None),
+        retriever.vector_db.model_name,
+        versions,
+    )
+    return embedding, partition
+
+
 async def _stream_chain(
     request: Request,
     query: str,
     think_mode: bool,
     paper_ids: list[str] | None = None,
     topk: int = 5,
+    per_paper_quota: int | None = None,
 ) -> AsyncIterator[str]:
     """
     Core streaming coroutine.
@@ -66,18 +178,78 @@ async def _stream_chain(
     settings = get_settings()
 
     yield _sse({"type": "meta", "content": "stream-start"})
+    per_paper_quota = _per_paper_quota(per_paper_quota, paper_ids, settings)
+    stages = _stage_budget(settings)
+
+    answer_cache: SemanticAnswerCache | None = getattr(
+        request.app.state, "answer_cache", None
+    )
+    cache_key: tuple[list[float], int] | None = None
+    if answer_cache is not None:
+        try:
+            cache_key = await _answer_cache_key(
+                agent,
+                retriever,
+                query,
+                paper_ids,
+                topk,
+                think_mode,
+                stages,
+                per_paper_quota,
+            )
+        except Exception as exc:
+            logger.warning(
+                "Semantic cache lookup failed for %r: %s", query, exc
+            )
+
+    if answer_cache is not None:
+        if cache_key is not None:
+            cached = answer_cache.get(*cache_key)
+        else:
+            # no embedding in time: answer from retrieval as on a miss
+            cached = None
+            answer_cache.misses += 1
+        yield _sse(
+            {
+                "type": "meta",
+                "content": "semantic-cache",
+                "hit": cached is not None,
+                "hits": answer_cache.hits,
+                "misses": answer_cache.misses,
+            }
+        )
+        if cached is not None:
+            for piece in re.findall(r"\S*\s*", cached):
+                if piece:
+                    yield _sse({"type": "response", "content": piece})
+            agent._update_chat_history(query, cached)
+            yield _sse({"type": "done"})
+            return
 
     context = []
     context_md = ""
     retrieval_error: str | None = None
+    per_paper = per_paper_quota is not None
+
+    # over-fetch when a reranker will pick the final topk; a per-paper
+    # retrieval is already balanced, the reranker only reorders it
+    reranker = getattr(request.app.state, "reranker", None)
+    fetch_k = topk
+    if reranker is not None and not per_paper:
+        fetch_k = max(topk, settings.reranker_fetch_k)
 
     if settings.chat_fast_retrieval:
         try:
-            context = await asyncio.wait_for(
-                retriever.aretrieve(query, paper_ids=paper_ids, topk=topk),
-                timeout=settings.chat_retrieval_timeout_seconds,
-            )
-            context_md = _build_context_md(query, context, settings)
+            # each stage gets at most what is left of the retrieval budget,
+            # so a late stage falls back instead of dropping all context
+            with stages.deadline(settings.chat_retrieval_timeout_seconds):
+                context = await retriever.aretrieve(
+                    query,
+                    paper_ids=paper_ids,
+                    topk=fetch_k,
+                    stages=stages,
+                    per_paper_quota=per_paper_quota,
+                )
         except Exception as exc:
             retrieval_error = str(exc)
             logger.warning(
@@ -87,12 +259,49 @@ async def _stream_chain(
             )
     else:
         context = await retriever.aretrieve(
-            query, paper_ids=paper_ids, topk=topk
+            query,
+            paper_ids=paper_ids,
+            topk=fetch_k,
+            stages=stages,
+            per_paper_quota=per_paper_quota,
         )
-        context_md = _build_context_md(query, context, settings)
 
     if retrieval_error:
         yield _sse({"type": "meta", "content": "retrieval-unavailable"})
+    else:
+        if reranker is not None and context:
+            context, rerank_skipped = await _rerank(
+                reranker, query, context, topk, stages
+            )
+            if per_paper:
+                context = interleave_papers(context)
+            if rerank_skipped:
+                yield _sse(
+                    {
+                        "type": "meta",
+                        "content": "rerank-skipped",
+                        "reason": rerank_skipped,
+                    }
+                )
+        # chunks that survived the distance cutoff / reranker, out of topk
+        yield _sse(
+            {
+                "type": "meta",
+                "content": "context-chunks",
+                "kept": len(context),
+                "topk": topk,
+                "tokens": sum(doc_tokens(doc) for doc in context),
+            }
+        )
+    yield _sse(
+        {
+            "type": "meta",
+            "content": "stage-timings",
+            "timings": stages.timings,
+            "degraded": stages.degraded,
+        }
+    )
+    context_md = _build_context_md(query, context, settings, per_paper)
 
     llm = agent.model.bind(reasoning=think_mode)
     chain = agent.prompt | llm
@@ -133,6 +342,14 @@ async def _stream_chain(
         return
 
     agent._update_chat_history(query, full_response)
+    if (
+        answer_cache is not None
+        and cache_key is not None
+        and full_response
+        and not retrieval_error
+        and not stages.degraded
+    ):
+        answer_cache.set(*cache_key, full_response)
     yield _sse({"type": "done"})
 
 
@@ -148,7 +365,12 @@ async def stream_chat(
     """
     return StreamingResponse(
         _stream_chain(
-            request, body.query, body.think_mode, body.paper_ids, body.topk
+            request,
+            body.query,
+            body.think_mode,
+            body.paper_ids,
+            body.topk,
+            body.per_paper_quota,
         ),
         media_type="text/event-stream",
         headers={
@@ -168,15 +390,26 @@ async def invoke_chat(body: QueryRequest, request: Request) -> dict:
     agent = request.app.state.agent
     retriever = request.app.state.retriever
     settings = get_settings()
+    reranker = getattr(request.app.state, "reranker", None)
+    per_paper_quota = _per_paper_quota(
+        body.per_paper_quota, body.paper_ids, settings
+    )
+    per_paper = per_paper_quota is not None
+    fetch_k = body.topk
+    if reranker is not None and not per_paper:
+        fetch_k = max(body.topk, settings.reranker_fetch_k)
+    stages = _stage_budget(settings)
 
     if settings.chat_fast_retrieval:
         try:
-            context = await asyncio.wait_for(
-                retriever.aretrieve(
-                    body.query, paper_ids=body.paper_ids, topk=body.topk
-                ),
-                timeout=settings.chat_retrieval_timeout_seconds,
-            )
+            with stages.deadline(settings.chat_retrieval_timeout_seconds):
+                context = await retriever.aretrieve(
+                    body.query,
+                    paper_ids=body.paper_ids,
+                    topk=fetch_k,
+                    stages=stages,
+                    per_paper_quota=per_paper_quota,
+                )
         except Exception as exc:
             logger.warning(
                 "Retriever failed for invoke query %r, continuing without context: %s",
@@ -186,9 +419,19 @@ async def invoke_chat(body: QueryRequest, request: Request) -> dict:
             context = []
     else:
         context = await retriever.aretrieve(
-            body.query, paper_ids=body.paper_ids, topk=body.topk
+            body.query,
+            paper_ids=body.paper_ids,
+            topk=fetch_k,
+            stages=stages,
+            per_paper_quota=per_paper_quota,
+        )
+    if reranker is not None and context:
+        context, _ = await _rerank(
+            reranker, body.query, context, body.topk, stages
         )
-    context_md = _build_context_md(body.query, context, settings)
+        if per_paper:
+            context = interleave_papers(context)
+    context_md = _build_context_md(body.query, context, settings, per_paper)
 
     llm = agent.model.bind(reasoning=True) if body.think_mode else agent.model
     chain = agent.prompt | llm
@@ -5,12 +5,21 @@ import uuid
 import logging
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+    status,
+)
 from fastapi.responses import JSONResponse
 from sqlalchemy import or_, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from docseer.databases import ParentCache
+
 from ..dependencies import get_db
 from ..models.paper import Paper, PaperStatus
 from ..schemas.paper import (
@@ -60,6 +69,14 @@ def _source_uuid(source_path: str) -> uuid.UUID:
     return uuid.uuid5(_NS, source_path)
 
 
+def _drop_cached_parents(request: Request, paper_id: str) -> None:
+    """Evict *paper_id* from the API's parent cache (re-ingest / delete)."""
+    retriever = getattr(request.app.state, "retriever", None)
+    docstore = getattr(retriever, "docstore", None)
+    if isinstance(docstore, ParentCache):
+        docstore.invalidate(paper_id)
+
+
 def _dispatch(paper: Paper) -> IngestResponse:
     """Fire-and-forget ingest task, update paper.celery_task_id in place."""
     task = ingest_paper.apply_async(args=[str(paper.id)], queue="ingest")
@@ -310,7 +327,9 @@ async def import_from_url(body: UrlImportRequest, db: DB):
     response_model=IngestResponse,
     status_code=status.HTTP_202_ACCEPTED,
 )
-async def trigger_ingest(paper_id: uuid.UUID, body: IngestRequest, db: DB):
+async def trigger_ingest(
+    paper_id: uuid.UUID, body: IngestRequest, db: DB, request: Request
+):
     """(Re-)trigger ingestion for an existing paper."""
     paper = await _get_or_404(db, paper_id)
 
@@ -331,6 +350,7 @@ async def trigger_ingest(paper_id: uuid.UUID, body: IngestRequest, db: DB):
     paper.error_message = None  # type: ignore[assignment]  # ty:ignore[invalid-assignment]
     resp = _dispatch(paper)
     await db.commit()
+    _drop_cached_parents(request, str(paper.id))
     return resp
 
 
@@ -346,7 +366,10 @@ async def update_paper(paper_id: uuid.UUID, body: PaperUpdate, db: DB):
 
 @router.delete("/{paper_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_paper(
-    paper_id: uuid.UUID, background_tasks: BackgroundTasks, db: DB
+    paper_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
+    db: DB,
+    request: Request,
 ):
     paper = await _get_or_404(db, paper_id)
     pid = str(paper.id)
@@ -354,4 +377,7 @@ async def delete_paper(
     await db.delete(paper)
     await db.commit()
     if had_embeddings:
-        background_tasks.add_task(delete_paper_embeddings, pid)
+        _drop_cached_parents(request, pid)
+        background_tasks.add_task(
+            delete_paper_embeddings, pid, request.app.state.retriever
+        )
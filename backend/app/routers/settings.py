@@ -4,6 +4,7 @@ Settings router
 GET  /models            – list all models available in Ollama
 GET  /settings/models   – current LLM + embedding model names
 POST /settings/models   – hot-swap LLM and/or embedding model (no restart needed)
+GET  /settings/chat     – chat limits clients apply to their requests
 """
 
 from __future__ import annotations
@@ -18,10 +19,10 @@ from pydantic import BaseModel
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 
 from docseer.agents.basic_agent import BasicAgent
-from docseer.databases.chroma import ChromaVectorDB
 from docseer.retrievers.retriever import Retriever
 
 from ..config import get_settings
+from ..services.retriever import build_retriever, build_vector_db
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["settings"])
@@ -37,6 +38,11 @@ class CurrentModels(BaseModel):
     embedding_model: str
 
 
+class ChatLimits(BaseModel):
+    per_paper_quota: Optional[int]
+    per_paper_max_papers: int
+
+
 @router.get("/models", response_model=list[str])
 async def list_models() -> list[str]:
     """Return all model names currently available in Ollama."""
@@ -74,6 +80,7 @@ async def update_models(body: ModelUpdate, request: Request) -> list[str]:
                       preserved) backed by the requested ChatOllama model.
     - Embedding swap: creates a new ChromaVectorDB with the requested
                       OllamaEmbeddings model and a new Retriever wrapping it.
+                      Cached query embeddings of the old model are dropped.
 
     Returns a list of human-readable change strings, e.g.
       ["LLM → llama3.2:3b", "Embedding → nomic-embed-text"]
@@ -108,23 +115,34 @@ async def update_models(body: ModelUpdate, request: Request) -> list[str]:
         body.embedding_model
         and body.embedding_model != retriever.vector_db.model_embeddings.model
     ):
+        query_cache = retriever.vector_db.query_cache
+        if query_cache is not None:
+            query_cache.invalidate(retriever.vector_db.model_name)
+
         new_embeddings = OllamaEmbeddings(
             model=body.embedding_model,
             base_url=settings.ollama_base_url,
         )
-        new_vector_db = ChromaVectorDB(
-            model_embeddings=new_embeddings,
-            batch_size=settings.embedding_batch_size,
-            chroma_host=settings.chroma_host,
-            chroma_port=settings.chroma_port,
-        )
-        new_retriever = Retriever(
-            vector_db=new_vector_db,
+        new_retriever = build_retriever(
+            settings,
+            build_vector_db(settings, new_embeddings, query_cache),
             docstore=retriever.docstore,
-            topk=settings.retriever_topk,
+            lexical_index=retriever.lexical_index,
+            result_cache=retriever.result_cache,
+            index_versions=retriever.index_versions,
         )
         request.app.state.retriever = new_retriever
         changes.append(f"Embedding → {body.embedding_model}")
         logger.info("Embedding model hot-swapped to %s", body.embedding_model)
 
     return changes
+
+
+@router.get("/settings/chat", response_model=ChatLimits)
+async def get_chat_limits() -> ChatLimits:
+    """Return the per-paper retrieval limits the chat endpoints apply."""
+    settings = get_settings()
+    return ChatLimits(
+        per_paper_quota=settings.chat_per_paper_quota,
+        per_paper_max_papers=settings.chat_per_paper_max_papers,
+    )
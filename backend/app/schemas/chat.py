@@ -6,6 +6,10 @@ class QueryRequest(BaseModel):
     think_mode: bool = False
     paper_ids: list[str] | None = None
     topk: int = 5
+    # search each of several paper_ids separately for up to this many
+    # chunks, so every selected paper is represented in the context
+    # (ignored above settings.chat_per_paper_max_papers papers)
+    per_paper_quota: int | None = None
 
 
 class ChatMessage(BaseModel):
@@ -0,0 +1,265 @@
+"""
+Parent-chunk docstore shared by the API and the ingest workers:
+  - open_docstore()     — backend selected by settings.docstore_backend
+  - PostgresDocstore    — parent_chunks table, for workers on other nodes
+  - RedisDocstore       — chunk keys plus a key set per paper in Redis
+
+Every backend has the interface Retriever expects from LocalFileStoreDB:
+add / get / mget / keys / delete / delete_ids / is_empty.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from langchain_core.documents import Document
+from sqlalchemy.engine import Engine
+
+from docseer.databases import LocalFileStoreDB, SegmentStoreDB
+from docseer.databases.segment_store import document_id_of
+
+from ..config import Settings
+
+
+class PostgresDocstore:
+    """
+    Writes are bulk-loaded with COPY into a temporary table and upserted
+    from there; reads fetch all requested ids in one ``= ANY(%s)`` query.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        # see is_empty
+        self._has_chunks = False
+
+    @contextmanager
+    def _cursor(self):
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:  # ty: ignore[invalid-context-manager]
+                yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @property
+    def is_empty(self) -> bool:
+        # asked on every retrieval: once the table has rows it is not asked
+        # again (a parent deleted since then is simply missing from mget)
+        if not self._has_chunks:
+            with self._cursor() as cur:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM parent_chunks)")
+                self._has_chunks = cur.fetchone()[0]
+        return not self._has_chunks
+
+    def add(self, ids: list[str], chunks: list[Document]) -> None:
+        assert len(ids) == len(chunks)
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        # an id repeated in one batch would hit ON CONFLICT twice
+        for key, chunk in dict(zip(ids, chunks)).items():
+            # text columns cannot hold NUL
+            content = chunk.page_content.replace("\x00", "")
+            writer.writerow((key, document_id_of(key), content))
+        rows.seek(0)
+
+        with self._cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE parent_chunks_load "
+                "(LIKE parent_chunks) ON COMMIT DROP"
+            )
+            cur.copy_expert(
+                "COPY parent_chunks_load (id, document_id, content) "
+                "FROM STDIN WITH (FORMAT csv)",
+                rows,
+            )
+            cur.execute(
+                "INSERT INTO parent_chunks "
+                "SELECT id, document_id, content FROM parent_chunks_load "
+                "ON CONFLICT (id) DO UPDATE SET "
+                "document_id = EXCLUDED.document_id, "
+                "content = EXCLUDED.content"
+            )
+        self._has_chunks = self._has_chunks or bool(ids)
+
+    def mget(self, ids: list[str]) -> list[str | None]:
+        if not ids:
+            return []
+        with self._cursor() as cur:
+            cur.execute(
+                "SELECT id, content FROM parent_chunks WHERE id = ANY(%s)",
+                (list(ids),),
+            )
+            found = dict(cur.fetchall())
+        return [found.get(key) for key in ids]
+
+    def get(self, ids: list[str]) -> list[str]:
+        return [content for content in self.mget(ids) if content is not None]
+
+    def keys(self, document_id: str) -> list[str]:
+        with self._cursor() as cur:
+            cur.execute(
+                "SELECT id FROM parent_chunks WHERE document_id = %s "
+                "ORDER BY id",
+                (document_id,),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def delete(self, document_id: str) -> None:
+        with self._cursor() as cur:
+            cur.execute(
+                "DELETE FROM parent_chunks WHERE document_id = %s",
+                (document_id,),
+            )
+
+    def delete_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        with self._cursor() as cur:
+            cur.execute(
+                "DELETE FROM parent_chunks WHERE id = ANY(%s)", (list(ids),)
+            )
+
+
+class RedisDocstore:
+    """
+    ``{namespace}:chunk:{id}`` holds the text, ``{namespace}:doc:{paper}``
+    the ids of a paper and ``{namespace}:documents`` the papers, so
+    deleting a paper never scans the keyspace.
+    """
+
+    def __init__(self, redis_url: str, namespace: str = "docstore"):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.namespace = namespace
+        # see PostgresDocstore.is_empty
+        self._has_chunks = False
+
+    def _chunk_key(self, key: str) -> str:
+        return f"{self.namespace}:chunk:{key}"
+
+    def _document_key(self, document_id: str) -> str:
+        return f"{self.namespace}:doc:{document_id}"
+
+    @property
+    def _documents_key(self) -> str:
+        return f"{self.namespace}:documents"
+
+    @property
+    def is_empty(self) -> bool:
+        if not self._has_chunks:
+            self._has_chunks = self.client.scard(self._documents_key) != 0
+        return not self._has_chunks
+
+    def add(self, ids: list[str], chunks: list[Document]) -> None:
+        assert len(ids) == len(chunks)
+        pipe = self.client.pipeline(transaction=False)
+        for key, chunk in zip(ids, chunks):
+            document_id = document_id_of(key)
+            pipe.set(self._chunk_key(key), chunk.page_content.encode("utf-8"))
+            pipe.sadd(self._document_key(document_id), key)
+            pipe.sadd(self._documents_key, document_id)
+        pipe.execute()
+        self._has_chunks = self._has_chunks or bool(ids)
+
+    def mget(self, ids: list[str]) -> list[str | None]:
+        if not ids:
+            return []
+        values = self.client.mget([self._chunk_key(key) for key in ids])
+        return [
+            v.decode("utf-8") if v is not None else None
+            for v in values  # ty: ignore[not-iterable]
+        ]
+
+    def get(self, ids: list[str]) -> list[str]:
+        return [content for content in self.mget(ids) if content is not None]
+
+    def keys(self, document_id: str) -> list[str]:
+        return sorted(
+            k.decode("utf-8")
+            for k in self.client.smembers(  # ty: ignore[not-iterable]
+                self._document_key(document_id)
+            )
+        )
+
+    def delete(self, document_id: str) -> None:
+        keys = self.keys(document_id)
+        pipe = self.client.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*(self._chunk_key(key) for key in keys))
+        pipe.delete(self._document_key(document_id))
+        pipe.srem(self._documents_key, document_id)
+        pipe.execute()
+
+    def delete_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        by_document: dict[str, list[str]] = {}
+        for key in ids:
+            by_document.setdefault(document_id_of(key), []).append(key)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(*(self._chunk_key(key) for key in ids))
+        for document_id, keys in by_document.items():
+            pipe.srem(self._document_key(document_id), *keys)
+        pipe.execute()
+
+        # Redis drops a set once it is empty
+        documents = list(by_document)
+        exists = self.client.pipeline(transaction=False)
+        for document_id in documents:
+            exists.exists(self._document_key(document_id))
+        emptied = [d for d, n in zip(documents, exists.execute()) if not n]
+        if emptied:
+            self.client.srem(self._documents_key, *emptied)
+
+
+def _has_chunk_files(path: str) -> bool:
+    try:
+        with os.scandir(path) as entries:
+            return any(entry.is_file() for entry in entries)
+    except FileNotFoundError:
+        return False
+
+
+def open_docstore(
+    settings: Settings,
+) -> SegmentStoreDB | LocalFileStoreDB | PostgresDocstore | RedisDocstore:
+    """
+    ``segment`` and ``files`` need the docstore volume shared by the API
+    and every worker; ``postgres`` and ``redis`` do not.
+
+    The segment store lives in ``segments/`` on the docstore volume.  An
+    existing file-per-chunk docstore must be migrated first
+    (``make migrate-docstore``): falling back to it would keep writing new
+    papers there, and those would be missing from the segment store once
+    a later start picks it up.
+    """
+    if settings.docstore_backend == "postgres":
+        from ..database import sync_engine
+
+        return PostgresDocstore(sync_engine)
+    if settings.docstore_backend == "redis":
+        return RedisDocstore(settings.redis_url)
+    if settings.docstore_backend == "files":
+        return LocalFileStoreDB(settings.docstore_path)
+
+    store = SegmentStoreDB(
+        Path(settings.docstore_path) / "segments",
+        compression=settings.docstore_compression,
+    )
+    if store.is_empty and _has_chunk_files(settings.docstore_path):
+        raise RuntimeError(
+            f"Docstore {settings.docstore_path} has not been migrated to "
+            "segments yet: run `make migrate-docstore`, or set "
+            "DOCSEER_DOCSTORE_BACKEND=files to keep the file store."
+        )
+    return store
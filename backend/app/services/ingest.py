@@ -8,40 +8,36 @@ from __future__ import annotations
 import asyncio
 import logging
 
-import chromadb
-
-from docseer.databases import LocalFileStoreDB
-
-from ..config import get_settings
+from docseer.retrievers.retriever import Retriever
 
 logger = logging.getLogger(__name__)
 
 
-async def delete_paper_embeddings(paper_id: str) -> None:
+async def delete_paper_embeddings(paper_id: str, retriever: Retriever) -> None:
     """
     Remove all vectors and parent-chunk docs for *paper_id*.
     Runs in a thread-pool so it never blocks the event loop.
     Deliberately does NOT require the embeddings model — ChromaDB delete
-    and LocalFileStore delete are both metadata/ID operations only.
+    and docstore delete are both metadata/ID operations only.
+
+    Uses the stores of the app's *retriever*, so a delete neither opens
+    new clients nor loads a second copy of the BM25 index.  Each step is
+    attempted even if an earlier one fails.
     """
-    settings = get_settings()
 
     def _sync() -> None:
         try:
-            client = chromadb.HttpClient(
-                host=settings.chroma_host, port=settings.chroma_port
-            )
-            col = client.get_or_create_collection("vector_db")
-            col.delete(where={"document_id": paper_id})
+            # chunk vectors and paper-level vectors
+            retriever.vector_db.delete(paper_id)
             logger.info("Deleted ChromaDB vectors for paper %s", paper_id)
         except Exception as exc:
             logger.warning(
                 "ChromaDB delete failed for paper %s: %s", paper_id, exc
             )
 
+        docstore = retriever.docstore
         try:
-            docstore = LocalFileStoreDB(settings.docstore_path)
-            if not docstore.is_empty:
+            if docstore is not None and not docstore.is_empty:
                 docstore.delete(paper_id)
                 logger.info("Deleted docstore chunks for paper %s", paper_id)
         except Exception as exc:
@@ -49,4 +45,25 @@ async def delete_paper_embeddings(paper_id: str) -> None:
                 "Docstore delete failed for paper %s: %s", paper_id, exc
             )
 
+        if retriever.lexical_index is not None:
+            try:
+                retriever.lexical_index.delete(paper_id)
+                logger.info("Deleted lexical index entries for %s", paper_id)
+            except Exception as exc:
+                logger.warning(
+                    "Lexical index delete failed for paper %s: %s",
+                    paper_id,
+                    exc,
+                )
+
+        if retriever.index_versions is not None:
+            try:
+                retriever.index_versions.bump(paper_id)
+            except Exception as exc:
+                logger.warning(
+                    "Index version bump failed for paper %s: %s",
+                    paper_id,
+                    exc,
+                )
+
     await asyncio.to_thread(_sync)
@@ -0,0 +1,49 @@
+"""
+Retrieval cache helpers:
+  - index_versions()   — per-paper index versions shared by API and workers
+  - retrieval_cache()  — result cache in front of Retriever.aretrieve
+"""
+
+from __future__ import annotations
+
+from langchain_classic.storage import LocalFileStore
+
+from docseer.retrievers import IndexVersions, RetrievalCache
+
+from ..config import Settings
+
+
+def index_versions(settings: Settings) -> IndexVersions:
+    """
+    Versions must be visible to every process that writes or caches, so
+    they live in Redis with the redis backend and on the docstore volume
+    otherwise.
+    """
+    if settings.retrieval_cache_backend == "redis":
+        from langchain_community.storage import RedisStore
+
+        return IndexVersions(
+            RedisStore(
+                redis_url=settings.redis_url, namespace="index_versions"
+            )
+        )
+    return IndexVersions(LocalFileStore(settings.index_versions_path))
+
+
+def retrieval_cache(settings: Settings) -> RetrievalCache | None:
+    if settings.retrieval_cache_size <= 0:
+        return None
+    store = None
+    if settings.retrieval_cache_backend == "redis":
+        from langchain_community.storage import RedisStore
+
+        store = RedisStore(
+            redis_url=settings.redis_url,
+            namespace="retrieval_cache",
+            ttl=int(settings.retrieval_cache_ttl_seconds),
+        )
+    return RetrievalCache(
+        maxsize=settings.retrieval_cache_size,
+        ttl=settings.retrieval_cache_ttl_seconds,
+        store=store,
+    )
@@ -0,0 +1,59 @@
+"""
+Builders for the API's retriever, shared by startup (main.py) and the
+embedding hot-swap (routers/settings.py) so the two configure it the same.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from langchain_core.embeddings import Embeddings
+
+from docseer.databases.chroma import ChromaVectorDB
+from docseer.databases.embedding_cache import QueryEmbeddingCache
+from docseer.databases.lexical_index import BM25Index
+from docseer.retrievers.result_cache import IndexVersions, RetrievalCache
+from docseer.retrievers.retriever import Retriever
+
+from ..config import Settings
+
+
+def build_vector_db(
+    settings: Settings,
+    embeddings: Embeddings,
+    query_cache: QueryEmbeddingCache | None,
+) -> ChromaVectorDB:
+    return ChromaVectorDB(
+        model_embeddings=embeddings,
+        batch_size=settings.embedding_batch_size,
+        chroma_host=settings.chroma_host,
+        chroma_port=settings.chroma_port,
+        max_concurrency=settings.embedding_max_concurrency,
+        target_latency=settings.embedding_target_latency_seconds,
+        query_cache=query_cache,
+        use_async_client=settings.chroma_async_client,
+    )
+
+
+def build_retriever(
+    settings: Settings,
+    vector_db: ChromaVectorDB,
+    docstore: Any,
+    lexical_index: BM25Index | None,
+    result_cache: RetrievalCache | None,
+    index_versions: IndexVersions | None,
+) -> Retriever:
+    """A Retriever over the given stores, tuned by the retriever_* settings."""
+    return Retriever(
+        vector_db=vector_db,
+        docstore=docstore,
+        topk=settings.retriever_topk,
+        max_distance=settings.retriever_max_distance,
+        relative_gap=settings.retriever_relative_gap,
+        mmr_lambda=settings.retriever_mmr_lambda,
+        mmr_fetch_k=settings.retriever_mmr_fetch_k,
+        paper_fetch_n=settings.retriever_paper_fetch_n,
+        lexical_index=lexical_index,
+        result_cache=result_cache,
+        index_versions=index_versions,
+    )
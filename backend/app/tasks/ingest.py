@@ -4,8 +4,14 @@ Celery task: ingest_paper
 Pipeline: source_path → PDF bytes → Markdown → chunks → embeddings → ChromaDB
 Status transitions written back to PostgreSQL at every step.
 
+Re-ingest is incremental: chunk ids are content-addressed, so only new or
+changed chunks are embedded / written and only vanished ones are deleted.
+The paper keeps its existing vectors while the task runs.
+
 Worker-level singletons (DocConverter, ParentChildChunker) are cached per
 process so Docling models load only once per worker, not once per task.
+Child-chunk embeddings go through a content-hash EmbeddingCache shared by
+all workers, so re-ingesting unchanged text never reaches Ollama.
 """
 
 from __future__ import annotations
@@ -17,17 +23,20 @@ from datetime import datetime, timezone
 from functools import lru_cache
 from typing import Any
 
+from langchain_classic.storage import LocalFileStore
 from langchain_ollama import OllamaEmbeddings
 
-from docseer.chunkers import ParentChildChunker
+from docseer.chunkers import ParentChildChunker, TokenCounter
 from docseer.converters import DocConverter, RemoteContentExtractor
-from docseer.databases import ChromaVectorDB, LocalFileStoreDB
+from docseer.databases import BM25Index, ChromaVectorDB, EmbeddingCache
 from docseer.retrievers import Retriever
 
 from ..celery_app import celery_app
 from ..config import get_settings
 from ..database import SyncSessionFactory
 from ..models.paper import Paper, PaperStatus
+from ..services.docstore import open_docstore
+from ..services.retrieval_cache import index_versions
 from ..services.metadata import grobid_metadata_to_paper
 
 logger = logging.getLogger(__name__)
@@ -46,9 +55,47 @@ def _converter() -> DocConverter:
     return DocConverter(url=f"{s.grobid_url}/api/processHeaderDocument")
 
 
+@lru_cache(maxsize=1)
+def _token_counter() -> TokenCounter | None:
+    s = get_settings()
+    if not s.chunk_tokenizer:
+        return None
+    try:
+        return TokenCounter(s.chunk_tokenizer)
+    except Exception as exc:
+        logger.warning(
+            "Tokenizer %r unavailable, chunking by characters: %s",
+            s.chunk_tokenizer,
+            exc,
+        )
+        return None
+
+
 @lru_cache(maxsize=1)
 def _chunker() -> ParentChildChunker:
-    return ParentChildChunker()
+    counter = _token_counter()
+    if counter is None:
+        return ParentChildChunker()
+    s = get_settings()
+    return ParentChildChunker(
+        child_chunk_size=s.chunk_tokens,
+        child_chunk_overlap=s.chunk_overlap_tokens,
+        length_function=counter,
+    )
+
+
+@lru_cache(maxsize=1)
+def _embedding_cache() -> EmbeddingCache | None:
+    s = get_settings()
+    if s.embedding_cache_backend == "local":
+        return EmbeddingCache(LocalFileStore(s.embedding_cache_path))
+    if s.embedding_cache_backend == "redis":
+        from langchain_community.storage import RedisStore
+
+        return EmbeddingCache(
+            RedisStore(redis_url=s.redis_url, namespace="embeddings")
+        )
+    return None
 
 
 @lru_cache(maxsize=1)
@@ -63,10 +110,19 @@ def _retriever() -> Retriever:
         batch_size=s.embedding_batch_size,
         chroma_host=s.chroma_host,
         chroma_port=s.chroma_port,
+        embedding_cache=_embedding_cache(),
+        max_concurrency=s.embedding_max_concurrency,
+        target_latency=s.embedding_target_latency_seconds,
     )
-    docstore = LocalFileStoreDB(s.docstore_path)
+    docstore = open_docstore(s)
     return Retriever(
-        vector_db=vector_db, docstore=docstore, topk=s.retriever_topk
+        vector_db=vector_db,
+        docstore=docstore,
+        topk=s.retriever_topk,
+        lexical_index=(
+            BM25Index(s.lexical_index_path) if s.lexical_index_path else None
+        ),
+        index_versions=index_versions(s),
     )
 
 
@@ -117,9 +173,11 @@ def ingest_paper(self, paper_id: str) -> dict[str, Any]:
     Steps & progress meta (visible via GET /api/tasks/{task_id}):
       1. loading    – read paper row, validate source_path
       2. converting – PDF/URL → Markdown via Docling + GROBID
-      3. chunking   – Markdown → parent/child chunk pairs
-      4. embedding  – child chunks → ChromaDB; parent chunks → LocalFileStore
-      5. done       – update paper row, return summary
+      3. embedding  – Markdown → parent/child chunks, streamed section by
+                      section: new child chunks → ChromaDB and parent chunks
+                      → docstore, then drop chunks that vanished and
+                      rebuild the paper-level vectors
+      4. done       – update paper row, return summary
     """
     paper_uuid = uuid.UUID(paper_id)
 
@@ -140,10 +198,8 @@ def ingest_paper(self, paper_id: str) -> dict[str, Any]:
                     f"Paper {paper_id} has no source_path — cannot ingest"
                 )
             source_path = str(paper.source_path)
-
-        logger.info("Purging existing embeddings for paper %s", paper_id)
-        _retriever().delete_document(paper_id)
-        _set_progress(paper_uuid, "Purging embeddings...")
+            known_title = str(paper.title) if paper.title else None
+            known_abstract = str(paper.abstract) if paper.abstract else None
 
         _progress("converting")
         _set_progress(paper_uuid, "Converting...")
@@ -156,30 +212,30 @@ def ingest_paper(self, paper_id: str) -> dict[str, Any]:
                 f"Docling returned empty content for {source_path}"
             )
 
-        _progress("chunking")
-        _set_progress(paper_uuid, "Chunking...")
-        chunk_result = _chunker().chunk(content, paper_id)
-        chunks = chunk_result["chunks"]
-        parent_ids = chunk_result["parent_ids"]
-        parent_chunks = chunk_result["parent_chunks"]
+        paper_meta = _backfill_metadata(grobid_raw)
 
+        # chunking streams into embedding: sections are embedded while
+        # later ones are still being split
         _progress("embedding")
-        total_chunks = len(chunks)
 
-        def _embed_progress(done: int, total: int) -> None:
-            pct = done * 100 // total if total else 0
-            _set_progress(paper_uuid, f"Embedding ({pct}%)...")
+        def _embed_progress(done: int, total: int, rate: float) -> None:
+            _set_progress(
+                paper_uuid,
+                f"Embedding ({done} new chunks, {rate:.1f} chunks/s)...",
+            )
 
-        _set_progress(paper_uuid, "Embedding (0%)...")
-        asyncio.run(
-            _retriever().apopulate(
-                chunks=chunks,
+        _set_progress(paper_uuid, "Chunking and embedding...")
+        diff = asyncio.run(
+            _retriever().aupdate_document_stream(
+                paper_id,
+                _chunker().achunk_stream(content, paper_id),
                 metadata={"document_id": paper_id},
-                parent_ids=parent_ids,
-                parent_chunks=parent_chunks,
                 progress_callback=_embed_progress,
+                title=paper_meta.get("title") or known_title,
+                abstract=paper_meta.get("abstract") or known_abstract,
             )
         )
+        total_chunks = diff["added"] + diff["unchanged"]
 
         with SyncSessionFactory() as session:
             paper = session.get(Paper, paper_uuid)
@@ -195,13 +251,24 @@ def ingest_paper(self, paper_id: str) -> dict[str, Any]:
             em.pop("progress", None)
             paper.extra_metadata = em  # ty: ignore[invalid-assignment]
 
-            for field, value in _backfill_metadata(grobid_raw).items():
+            for field, value in paper_meta.items():
                 setattr(paper, field, value)
 
             session.commit()
 
-        logger.info("Ingested paper %s — %d chunks", paper_id, total_chunks)
-        return {"paper_id": paper_id, "chunk_count": total_chunks}
+        logger.info(
+            "Ingested paper %s — %d chunks (%d added, %d deleted)",
+            paper_id,
+            total_chunks,
+            diff["added"],
+            diff["deleted"],
+        )
+        return {
+            "paper_id": paper_id,
+            "chunk_count": total_chunks,
+            "chunks_added": diff["added"],
+            "chunks_deleted": diff["deleted"],
+        }
 
     except Exception as exc:
         logger.exception("Ingestion failed for paper %s: %s", paper_id, exc)
@@ -41,9 +41,14 @@ async def lifespan(app: FastAPI):
         model_embeddings, batch_size, CACHE_FOLDER / "embeds_db"
     )
 
-    topk = config.get("retriever", dict()).get("topk", 3)
+    retriever_config = config.get("retriever", dict())
     base_retriever = retrievers.Retriever(
-        vector_db=vector_db, docstore=docstore, topk=topk
+        vector_db=vector_db,
+        docstore=docstore,
+        topk=retriever_config.get("topk", 3),
+        max_distance=retriever_config.get("max_distance"),
+        relative_gap=retriever_config.get("relative_gap"),
+        fanout_concurrency=retriever_config.get("fanout_concurrency", 4),
     )
     reranker = init_reranker(**config.get("reranker", dict()))
     app.state.retriever = retrievers.MultiStepsRetriever.init(
@@ -52,6 +57,7 @@ async def lifespan(app: FastAPI):
         reranker=reranker,
         use_extractor=False,
         think_mode=False,
+        stage_budgets=retriever_config.get("stage_budgets"),
     )
     yield
 
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+DocSeer Retrieval Latency Benchmark
+====================================
+Compares ChromaVectorDB.aquery latency with the sync Chroma client wrapped
+in asyncio.to_thread ("thread") against the native async HTTP client
+("async") at several levels of concurrent requests.  When
+BENCH_CHROMA_PATH is set, the embedded PersistentClient ("embedded") is
+measured too, which needs no Chroma server at all.
+
+The query embedding is computed once and then served from the
+QueryEmbeddingCache, so only the vector-search path is measured.
+
+Usage:
+    uv run python scripts/benchmark_retrieval.py
+
+Env vars:
+    DOCSEER_CHROMA_HOST       default: localhost
+    DOCSEER_CHROMA_PORT       default: 8000
+    BENCH_CHROMA_PATH         embedded store to benchmark (optional)
+    DOCSEER_OLLAMA_BASE_URL   default: http://localhost:11434
+    DOCSEER_EMBEDDING_MODEL   default: nomic-embed-text
+    BENCH_QUERY               query text to search
+    BENCH_CONCURRENCY         comma-separated levels (default: 1,10,50)
+    BENCH_ROUNDS              rounds per level (default: 20)
+    BENCH_TOPK                n_results per query (default: 5)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import time
+
+from langchain_ollama import OllamaEmbeddings
+
+from docseer.databases import ChromaVectorDB, QueryEmbeddingCache
+
+# ── Config ────────────────────────────────────────────────────────────────────
+
+CHROMA_HOST = os.getenv("DOCSEER_CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("DOCSEER_CHROMA_PORT", "8000"))
+CHROMA_PATH = os.getenv("BENCH_CHROMA_PATH")
+OLLAMA_URL = os.getenv("DOCSEER_OLLAMA_BASE_URL", "http://localhost:11434")
+EMBEDDING_MODEL = os.getenv("DOCSEER_EMBEDDING_MODEL", "nomic-embed-text")
+QUERY = os.getenv("BENCH_QUERY", "What is the main contribution?")
+LEVELS = [int(c) for c in os.getenv("BENCH_CONCURRENCY", "1,10,50").split(",")]
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+TOPK = int(os.getenv("BENCH_TOPK", "5"))
+
+BOLD = "\033[1m"
+RESET = "\033[0m"
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+
+def _fmt(seconds: float) -> str:
+    return f"{seconds * 1000:8.1f} ms"
+
+
+async def _timed_query(vector_db: ChromaVectorDB) -> float:
+    t0 = time.monotonic()
+    await vector_db.aquery(QUERY, TOPK)
+    return time.monotonic() - t0
+
+
+async def bench(vector_db: ChromaVectorDB, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    for _ in range(ROUNDS):
+        latencies += await asyncio.gather(
+            *(_timed_query(vector_db) for _ in range(concurrency))
+        )
+    return latencies
+
+
+async def main() -> None:
+    embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL, base_url=OLLAMA_URL)
+    query_cache = QueryEmbeddingCache()
+
+    print(f"{BOLD}{'mode':<8}{'conc.':>6}{'p50':>12}{'p99':>12}{RESET}")
+    modes = ["thread", "async"] + (["embedded"] if CHROMA_PATH else [])
+    for mode in modes:
+        vector_db = ChromaVectorDB(
+            model_embeddings=embeddings,
+            path_db=CHROMA_PATH if mode == "embedded" else None,
+            chroma_host=CHROMA_HOST,
+            chroma_port=CHROMA_PORT,
+            query_cache=query_cache,
+            use_async_client=mode == "async",
+        )
+        await vector_db.aquery(QUERY, TOPK)  # warm cache + connection
+
+        for concurrency in LEVELS:
+            latencies = await bench(vector_db, concurrency)
+            print(
+                f"{mode:<8}{concurrency:>6}"
+                f"{_fmt(statistics.median(latencies)):>12}"
+                f"{_fmt(_percentile(latencies, 99)):>12}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
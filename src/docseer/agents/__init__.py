@@ -1,4 +1,5 @@
 from .basic_agent import BasicAgent
+from .answer_cache import SemanticAnswerCache
 
 
-__all__ = ["BasicAgent"]
+__all__ = ["BasicAgent", "SemanticAnswerCache"]
@@ -0,0 +1,86 @@
+import json
+import time
+import hashlib
+import threading
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of final answers looked up by query-embedding similarity.
+
+    Entries live in a preallocated ``(maxsize, dim)`` float32 matrix of
+    L2-normalized query embeddings used as a ring buffer, so a lookup is one
+    matrix-vector product.  Each row also records a partition hash (paper
+    ids, models, index versions, ...) and a timestamp; a hit needs the same
+    partition, a live entry and cosine similarity >= *threshold*.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        maxsize: int = 1024,
+        ttl: float = 86400.0,
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reset(0)
+
+    def _reset(self, dim: int) -> None:
+        self._matrix = np.zeros((self.maxsize, dim), dtype=np.float32)
+        self._partitions = np.zeros(self.maxsize, dtype=np.int64)
+        self._created = np.full(self.maxsize, -np.inf)
+        self._answers: list[str | None] = [None] * self.maxsize
+        self._next = 0
+
+    @staticmethod
+    def partition(*parts) -> int:
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "little", signed=True)
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, embedding: list[float], partition: int) -> str | None:
+        vec = self._normalize(embedding)
+        with self._lock:
+            if self._matrix.shape[1] != len(vec):
+                self.misses += 1
+                return None
+            sims = self._matrix @ vec
+            live = (self._partitions == partition) & (
+                self._created > time.time() - self.ttl
+            )
+            sims[~live] = -np.inf
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._answers[best]
+
+    def set(self, embedding: list[float], partition: int, answer: str):
+        vec = self._normalize(embedding)
+        with self._lock:
+            if self._matrix.shape[1] != len(vec):
+                # first entry, or the embedding model changed dimension
+                self._reset(len(vec))
+            row = self._next
+            self._matrix[row] = vec
+            self._partitions[row] = partition
+            self._created[row] = time.time()
+            self._answers[row] = answer
+            self._next = (row + 1) % self.maxsize
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(self._matrix.shape[1])
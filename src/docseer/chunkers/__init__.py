@@ -1,3 +1,4 @@
 from .parent_child_chunker import ParentChildChunker
+from .token_length import TokenCounter
 
-__all__ = ["ParentChildChunker"]
+__all__ = ["ParentChildChunker", "TokenCounter"]
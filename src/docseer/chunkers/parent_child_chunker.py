@@ -1,5 +1,8 @@
 import asyncio
-from typing import TypedDict
+import hashlib
+import io
+from collections import Counter
+from typing import AsyncIterator, Callable, Iterator, TypedDict
 
 from langchain_core.documents import Document
 from langchain_text_splitters import (
@@ -8,12 +11,76 @@ from langchain_text_splitters import (
 )
 
 
+# a parent section and its child chunks
+Section = tuple[Document, list[Document]]
+
+
 class ChunkResult(TypedDict):
     parent_ids: list[str]
     parent_chunks: list[Document]
     chunks: list[Document]
 
 
+def _content_id(prefix: str, content: str, seen: Counter[str]) -> str:
+    """Deterministic id from *content*; repeated content gets a ``-n`` tail."""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    base = f"{prefix}-{digest}"
+    seen[base] += 1
+    return base if seen[base] == 1 else f"{base}-{seen[base] - 1}"
+
+
+def _top_sections(
+    text: str, headers_to_split_on: list[tuple[str, str]]
+) -> Iterator[str]:
+    """
+    Lazily cut markdown *text* into pieces that ``MarkdownHeaderTextSplitter``
+    splits exactly as it splits the whole text.  A cut is made only before
+    a header (outside code fences) at least as shallow as every header seen
+    so far: it closes all open sections, so no header metadata crosses the
+    cut.  The text before the first header stays with it, and a header
+    repeating the name and title of the one before it is not cut at, since
+    the splitter may merge the two.
+    """
+    shallowest: int | None = None
+    last_header: tuple[str, str] | None = None
+    lines: list[str] = []
+    fence = ""
+    for line in io.StringIO(text, newline="\n"):
+        stripped = "".join(filter(str.isprintable, line.strip()))
+        if not fence:
+            if stripped.startswith("```") and stripped.count("```") == 1:
+                fence = "```"
+            elif stripped.startswith("~~~"):
+                fence = "~~~"
+        elif stripped.startswith(fence):
+            fence = ""
+        header = None
+        if not fence:
+            header = next(
+                (
+                    (sep, name)
+                    for sep, name in headers_to_split_on
+                    if stripped.startswith(sep)
+                    and (
+                        len(stripped) == len(sep) or stripped[len(sep)] == " "
+                    )
+                ),
+                None,
+            )
+        if header is not None:
+            sep, name = header
+            key = (name, stripped[len(sep) :].strip())
+            if shallowest is None or len(sep) <= shallowest:
+                if shallowest is not None and key != last_header:
+                    yield "".join(lines)
+                    lines = []
+                shallowest = len(sep)
+            last_header = key
+        lines.append(line)
+    if lines:
+        yield "".join(lines)
+
+
 class ParentChildChunker:
     def __init__(
         self,
@@ -21,6 +88,7 @@ class ParentChildChunker:
         child_chunk_size: int = 800,
         child_chunk_overlap: int = 80,
         parent_overlap_chars: int = 120,
+        length_function: Callable[[str], int] | None = None,
     ):
         if parent_headers_to_split_on is None:
             self.parent_headers_to_split_on: list[tuple[str, str]] = [
@@ -34,46 +102,93 @@ class ParentChildChunker:
             strip_headers=False,
         )
 
+        # child sizes in e.g. embedding-model tokens (a TokenCounter)
+        # instead of characters; chunks then record their own length in
+        # "tokens" and their parent's in "parent_tokens"
+        self.length_function = length_function
         self.child_splitter = RecursiveCharacterTextSplitter(
             chunk_size=child_chunk_size,
             chunk_overlap=child_chunk_overlap,
+            length_function=length_function or len,
         )
         self.parent_overlap_chars = parent_overlap_chars
 
-    def chunk(self, document_content: str, document_id: str) -> ChunkResult:
-        parent_chunks = self.parent_splitter.split_text(document_content)
-        parent_ids = []
-        child_chunks = []
+    def iter_parents(self, document_content: str) -> Iterator[Document]:
+        """
+        ``parent_splitter.split_text`` one top-level section at a time, so a
+        large document never holds all of its parents at once.
+        """
+        splitter = self.parent_splitter
+        for text in _top_sections(
+            document_content, splitter.headers_to_split_on
+        ):
+            yield from splitter.split_text(text)
+
+    def iter_sections(
+        self, document_content: str, document_id: str
+    ) -> Iterator[Section]:
+        """
+        Yield every parent section with its child chunks as soon as the
+        section is split, so consumers can embed early sections while later
+        ones are still being chunked.
+        """
+        seen: Counter[str] = Counter()
+        prev: str | None = None
 
-        for i, parent_doc in enumerate(parent_chunks):
-            if i > 0 and self.parent_overlap_chars > 0:
-                prev = parent_chunks[i - 1].page_content
+        for parent_doc in self.iter_parents(document_content):
+            if prev is not None and self.parent_overlap_chars > 0:
                 tail = (
                     prev[-self.parent_overlap_chars :]
                     if len(prev) > self.parent_overlap_chars
                     else prev
                 )
                 parent_doc.page_content = tail + "\n" + parent_doc.page_content
+            prev = parent_doc.page_content
 
-            parent_id = f"{document_id}-{i}"
+            parent_id = _content_id(document_id, parent_doc.page_content, seen)
             parent_doc.id = parent_id
-            parent_ids.append(parent_id)
             parent_metadata = parent_doc.metadata | {
                 "parent_id": parent_id,
                 "document_id": document_id,
             }
+            if self.length_function is not None:
+                parent_metadata["parent_tokens"] = self.length_function(
+                    parent_doc.page_content
+                )
 
             small_chunks = self.child_splitter.split_text(
                 parent_doc.page_content
             )
 
-            for j, child_chunk in enumerate(small_chunks):
-                child_doc = Document(
-                    page_content=child_chunk,
-                    id=f"{parent_id}-{j}",
-                    metadata=parent_metadata,
-                )
-                child_chunks.append(child_doc)
+            yield (
+                parent_doc,
+                [
+                    Document(
+                        page_content=child_chunk,
+                        id=_content_id(parent_id, child_chunk, seen),
+                        metadata=(
+                            parent_metadata
+                            if self.length_function is None
+                            else parent_metadata
+                            | {"tokens": self.length_function(child_chunk)}
+                        ),
+                    )
+                    for child_chunk in small_chunks
+                ],
+            )
+
+    def chunk(self, document_content: str, document_id: str) -> ChunkResult:
+        parent_ids: list[str] = []
+        parent_chunks = []
+        child_chunks = []
+        for parent_doc, children in self.iter_sections(
+            document_content, document_id
+        ):
+            # iter_sections gives every parent its content id
+            assert parent_doc.id is not None
+            parent_ids.append(parent_doc.id)
+            parent_chunks.append(parent_doc)
+            child_chunks.extend(children)
 
         return dict(
             parent_ids=parent_ids,
@@ -87,3 +202,50 @@ class ParentChildChunker:
         return await asyncio.to_thread(
             self.chunk, document_content, document_id
         )
+
+    async def achunk_stream(
+        self, document_content: str, document_id: str, max_pending: int = 8
+    ) -> AsyncIterator[Section]:
+        """
+        ``iter_sections`` run in a worker thread.  At most *max_pending*
+        sections wait for the consumer, which bounds memory on very large
+        documents.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        done = object()
+        cancelled = False
+
+        def _put(item) -> None:
+            # once the consumer has stopped nothing takes from the queue:
+            # only the put already in flight (woken by the drain) may land
+            if not cancelled:
+                asyncio.run_coroutine_threadsafe(
+                    queue.put(item), loop
+                ).result()
+
+        def _produce() -> None:
+            try:
+                for section in self.iter_sections(
+                    document_content, document_id
+                ):
+                    if cancelled:
+                        return
+                    _put(section)
+                _put(done)
+            except Exception as exc:
+                _put(exc)
+
+        producer = loop.run_in_executor(None, _produce)
+        try:
+            while (item := await queue.get()) is not done:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled = True
+            # unblock a producer waiting on a full queue; its next put is
+            # skipped, so it cannot block again before returning
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
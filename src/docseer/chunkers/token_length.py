@@ -0,0 +1,34 @@
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """
+    Token length of texts under the embedding model's tokenizer, memoized:
+    ``RecursiveCharacterTextSplitter`` measures the same pieces again and
+    again while merging splits.
+
+    *tokenizer* is a ``tokenizer.json`` path or a Hugging Face hub id
+    (e.g. ``nomic-ai/nomic-embed-text-v1.5`` for ``nomic-embed-text``).
+    """
+
+    def __init__(self, tokenizer: str, cache_size: int = 65536):
+        from tokenizers import Tokenizer
+
+        if Path(tokenizer).is_file():
+            self.tokenizer = Tokenizer.from_file(tokenizer)
+        else:
+            self.tokenizer = Tokenizer.from_pretrained(tokenizer)
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+        self.name = tokenizer
+        self._count = lru_cache(maxsize=cache_size)(self._uncached)
+
+    def _uncached(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def __call__(self, text: str) -> int:
+        return self._count(text)
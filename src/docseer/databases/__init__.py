@@ -1,5 +1,21 @@
 from .chroma import ChromaVectorDB
+from .chunk_codec import ChunkCodec
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_scheduler import EmbeddingScheduler
+from .lexical_index import BM25Index
 from .localfilestore import LocalFileStoreDB
+from .parent_cache import ParentCache
+from .segment_store import SegmentStoreDB
 
 
-__all__ = ["ChromaVectorDB", "LocalFileStoreDB"]
+__all__ = [
+    "BM25Index",
+    "ChromaVectorDB",
+    "ChunkCodec",
+    "EmbeddingCache",
+    "EmbeddingScheduler",
+    "LocalFileStoreDB",
+    "ParentCache",
+    "QueryEmbeddingCache",
+    "SegmentStoreDB",
+]
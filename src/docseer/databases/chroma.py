@@ -1,10 +1,15 @@
 import asyncio
-import collections.abc
+from collections import defaultdict
 from itertools import batched
+from typing import AsyncIterable, Sequence
 
 import chromadb
+import numpy as np
 from langchain_core.documents import Document
 
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_scheduler import EmbeddingScheduler, ProgressCallback
+
 
 def _documents_to_dict(batch: list[Document], doc_metadata: dict) -> dict:
     d_batch: dict[str, list] = dict(ids=[], documents=[], metadatas=[])
@@ -15,18 +20,56 @@ def _documents_to_dict(batch: list[Document], doc_metadata: dict) -> dict:
     return d_batch
 
 
-def _chroma_results_to_documents(results) -> list[Document]:
+def _chroma_results_to_documents(results, i: int = 0) -> list[Document]:
+    ids = results.get("ids", [[]])[i]
+    distances = [None] * len(ids)
+    if results.get("distances"):
+        distances = results["distances"][i]
     docs = []
-    for doc, meta in zip(
-        results.get("documents", [[]])[0],
-        results.get("metadatas", [[]])[0],
+    for doc_id, doc, meta, distance in zip(
+        ids,
+        results.get("documents", [[]])[i],
+        results.get("metadatas", [[]])[i],
+        distances,
     ):
-        docs.append(Document(page_content=doc, metadata=meta))
+        meta = dict(meta or {})
+        if distance is not None:
+            meta["distance"] = distance
+        docs.append(Document(page_content=doc, metadata=meta, id=doc_id))
+    return docs
+
+
+def _merge_chroma_results(per_query: list[list[Document]]) -> list[Document]:
+    """Interleave per-query hits rank by rank, keeping each chunk id once."""
+    seen: set[str | None] = set()
+    docs = []
+    for rank in range(max(map(len, per_query), default=0)):
+        for hits in per_query:
+            if rank < len(hits) and hits[rank].id not in seen:
+                seen.add(hits[rank].id)
+                docs.append(hits[rank])
     return docs
 
 
+def _chroma_results_embeddings(results, i: int = 0) -> list:
+    embeddings = results["embeddings"]
+    assert embeddings is not None, "query did not include embeddings"
+    return list(embeddings[i])
+
+
+def _ranked_papers(results, n_papers: int) -> list[str]:
+    metadatas = (results.get("metadatas") or [[]])[0]
+    papers = dict.fromkeys(
+        (meta or {}).get("document_id") for meta in metadatas
+    )
+    return [p for p in papers if p is not None][:n_papers]
+
+
 class ChromaVectorDB:
     COLLECTION_NAME = "vector_db"
+    # a few vectors per paper (title, abstract, one centroid per section)
+    # used to pick candidate papers before the chunk search
+    PAPER_COLLECTION_NAME = "papers"
 
     def __init__(
         self,
@@ -35,68 +78,409 @@ class ChromaVectorDB:
         path_db=None,
         chroma_host: str = "localhost",
         chroma_port: int = 8010,
+        embedding_cache: EmbeddingCache | None = None,
+        max_concurrency: int = 4,
+        target_latency: float = 10.0,
+        query_cache: QueryEmbeddingCache | None = None,
+        use_async_client: bool = False,
     ):
         self.model_embeddings = model_embeddings
         self.batch_size = batch_size
+        self.embedding_cache = embedding_cache
+        self.query_cache = query_cache
+        self.scheduler = EmbeddingScheduler(
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            target_latency=target_latency,
+        )
 
-        self.client = chromadb.HttpClient(host=chroma_host, port=chroma_port)
+        self.chroma_host = chroma_host
+        self.chroma_port = chroma_port
+        self.path_db = path_db
+        if path_db is not None:
+            # embedded mode: in-process store, no HTTP hop / JSON floats
+            self.client = chromadb.PersistentClient(path=str(path_db))
+        else:
+            self.client = chromadb.HttpClient(
+                host=chroma_host, port=chroma_port
+            )
         self.collection = self.client.get_or_create_collection(
             name=self.COLLECTION_NAME
         )
+        self.paper_collection = self.client.get_or_create_collection(
+            name=self.PAPER_COLLECTION_NAME
+        )
+
+        # queries run on chromadb's native async HTTP client; writes stay on
+        # the sync client so Celery's per-task event loops never share it.
+        self.use_async_client = use_async_client and path_db is None
+        self._async_collection: asyncio.Future | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+
+    async def _connect_async(self) -> dict:
+        client = await chromadb.AsyncHttpClient(
+            host=self.chroma_host, port=self.chroma_port
+        )
+        return {
+            name: await client.get_or_create_collection(name=name)
+            for name in (self.COLLECTION_NAME, self.PAPER_COLLECTION_NAME)
+        }
+
+    async def _get_async_collection(self, name: str = COLLECTION_NAME):
+        loop = asyncio.get_running_loop()
+        if self._async_collection is None or self._async_loop is not loop:
+            self._async_loop = loop
+            self._async_collection = asyncio.ensure_future(
+                self._connect_async()
+            )
+        try:
+            collections = await asyncio.shield(self._async_collection)
+        except Exception:
+            self._async_collection = None
+            raise
+        return collections[name]
+
+    async def _acollection_query(
+        self, collection_name: str = COLLECTION_NAME, **kwargs
+    ):
+        if not self.use_async_client:
+            collection = (
+                self.paper_collection
+                if collection_name == self.PAPER_COLLECTION_NAME
+                else self.collection
+            )
+            return await asyncio.to_thread(collection.query, **kwargs)
+        collection = await self._get_async_collection(collection_name)
+        return await collection.query(**kwargs)
+
+    @property
+    def model_name(self) -> str:
+        return getattr(
+            self.model_embeddings,
+            "model",
+            type(self.model_embeddings).__name__,
+        )
+
+    def _embed_documents(self, texts: list[str]) -> list[Sequence[float]]:
+        if self.embedding_cache is None:
+            return self.model_embeddings.embed_documents(texts)
+
+        cached = self.embedding_cache.mget(self.model_name, texts)
+        miss_texts = [t for t, e in zip(texts, cached) if e is None]
+        if not miss_texts:
+            return [e for e in cached if e is not None]
+
+        new_embeds = self.model_embeddings.embed_documents(miss_texts)
+        self.embedding_cache.mset(self.model_name, miss_texts, new_embeds)
+        it_new = iter(new_embeds)
+        return [e if e is not None else next(it_new) for e in cached]
+
+    def _embed_query(self, text: str) -> list[float]:
+        if self.query_cache is not None:
+            embeds = self.query_cache.get(self.model_name, text)
+            if embeds is not None:
+                return embeds
+        embeds = self.model_embeddings.embed_query(text)
+        if self.query_cache is not None:
+            self.query_cache.set(self.model_name, text, embeds)
+        return embeds
+
+    async def _acached_query(self, text: str) -> list[float] | None:
+        # the in-memory tier is read on the loop, the store in a thread
+        cache = self.query_cache
+        if cache is None:
+            return None
+        embeds = cache.get_memory(self.model_name, text)
+        if embeds is None and cache.store is not None:
+            embeds = await asyncio.to_thread(cache.get, self.model_name, text)
+        return embeds
+
+    async def _acache_query(self, text: str, embeds: list[float]) -> None:
+        cache = self.query_cache
+        if cache is None:
+            return
+        cache.set(self.model_name, text, embeds, persist=False)
+        if cache.store is not None:
+            await asyncio.to_thread(
+                cache.persist, self.model_name, text, embeds
+            )
+
+    async def _aembed_query(self, text: str) -> list[float]:
+        embeds = await self._acached_query(text)
+        if embeds is not None:
+            return embeds
+        embeds = await self.model_embeddings.aembed_query(text)
+        await self._acache_query(text, embeds)
+        return embeds
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self._aembed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embeddings of *texts*, the uncached ones in one model call."""
+        cache = self.query_cache
+        embeds = [
+            cache.get(self.model_name, t) if cache is not None else None
+            for t in texts
+        ]
+        misses = [t for t, e in zip(texts, embeds) if e is None]
+        if not misses:
+            return [e for e in embeds if e is not None]
+        new_embeds = self.model_embeddings.embed_documents(misses)
+        if cache is not None:
+            for t, e in zip(misses, new_embeds):
+                cache.set(self.model_name, t, e)
+        it_new = iter(new_embeds)
+        return [e if e is not None else list(next(it_new)) for e in embeds]
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        embeds = await asyncio.gather(*map(self._acached_query, texts))
+        misses = [t for t, e in zip(texts, embeds) if e is None]
+        if not misses:
+            return [e for e in embeds if e is not None]
+        new_embeds = await self.model_embeddings.aembed_documents(misses)
+        await asyncio.gather(*map(self._acache_query, misses, new_embeds))
+        it_new = iter(new_embeds)
+        return [e if e is not None else list(next(it_new)) for e in embeds]
 
     def add(self, chunks: list[Document], metadata: dict) -> None:
         for batch in batched(chunks, self.batch_size):
             d_batch = _documents_to_dict(list(batch), metadata)
-            embeds = self.model_embeddings.embed_documents(
-                d_batch["documents"]
-            )
-            self.collection.add(embeddings=embeds, **d_batch)
+            embeds = self._embed_documents(d_batch["documents"])
+            self.collection.upsert(embeddings=embeds, **d_batch)
 
     def delete(self, document_id: str) -> None:
         self.collection.delete(where={"document_id": document_id})
+        self.paper_collection.delete(where={"document_id": document_id})
+
+    def update_paper(
+        self,
+        document_id: str,
+        title: str | None = None,
+        abstract: str | None = None,
+    ) -> None:
+        """
+        Rebuild the paper-level vectors of *document_id*: the centroid of
+        the chunk embeddings of each section (parent chunk), plus the title
+        and abstract embeddings when given.
+        """
+        stored = self.collection.get(
+            where={"document_id": document_id},
+            include=["embeddings", "metadatas"],
+        )
+        embeddings, metadatas = stored["embeddings"], stored["metadatas"]
+        assert embeddings is not None and metadatas is not None
+        sections: dict[str, list] = defaultdict(list)
+        for chunk_id, embeds, meta in zip(
+            stored["ids"], embeddings, metadatas
+        ):
+            section = (meta or {}).get("parent_id") or chunk_id
+            sections[str(section)].append(embeds)
+
+        ids = [f"{document_id}#{section}" for section in sections]
+        vectors = [
+            np.mean(np.asarray(e, dtype=np.float32), axis=0).tolist()
+            for e in sections.values()
+        ]
+        kinds = ["section"] * len(ids)
+        texts = {"title": title, "abstract": abstract}
+        texts = {kind: text for kind, text in texts.items() if text}
+        if ids and texts:
+            ids += [f"{document_id}#{kind}" for kind in texts]
+            vectors += self._embed_documents(list(texts.values()))
+            kinds += list(texts)
+
+        old_ids = set(
+            self.paper_collection.get(
+                where={"document_id": document_id}, include=[]
+            )["ids"]
+        )
+        if ids:
+            self.paper_collection.upsert(
+                ids=ids,
+                embeddings=vectors,
+                metadatas=[
+                    {"document_id": document_id, "kind": kind}
+                    for kind in kinds
+                ],
+            )
+        if old_ids - set(ids):
+            self.paper_collection.delete(ids=list(old_ids - set(ids)))
+
+    def _paper_query_kwargs(
+        self,
+        embedding: list[float],
+        n_papers: int,
+        paper_ids: list[str] | None,
+        overfetch: int,
+    ) -> dict:
+        kwargs: dict = dict(
+            query_embeddings=[embedding],
+            n_results=n_papers * overfetch,
+            include=["metadatas"],
+        )
+        if paper_ids:
+            kwargs["where"] = {"document_id": {"$in": paper_ids}}
+        return kwargs
+
+    def query_papers(
+        self,
+        embedding: list[float],
+        n_papers: int,
+        paper_ids: list[str] | None = None,
+        overfetch: int = 4,
+    ) -> list[str]:
+        results = self.paper_collection.query(
+            **self._paper_query_kwargs(
+                embedding, n_papers, paper_ids, overfetch
+            )
+        )
+        return _ranked_papers(results, n_papers)
+
+    async def aquery_papers(
+        self,
+        embedding: list[float],
+        n_papers: int,
+        paper_ids: list[str] | None = None,
+        overfetch: int = 4,
+    ) -> list[str]:
+        """
+        Ids of the *n_papers* papers with the closest paper-level vector,
+        best first.  Each paper has several vectors, so ``n_papers *
+        overfetch`` of them are fetched and grouped by paper.
+        """
+        results = await self._acollection_query(
+            self.PAPER_COLLECTION_NAME,
+            **self._paper_query_kwargs(
+                embedding, n_papers, paper_ids, overfetch
+            ),
+        )
+        return _ranked_papers(results, n_papers)
+
+    def get_ids(self, document_id: str) -> list[str]:
+        return self.collection.get(
+            where={"document_id": document_id}, include=[]
+        )["ids"]
+
+    def delete_ids(self, ids: list[str]) -> None:
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def get_documents(self, ids: list[str]) -> list[Document]:
+        results = self.collection.get(
+            ids=ids, include=["documents", "metadatas"]
+        )
+        documents, metadatas = results["documents"], results["metadatas"]
+        assert documents is not None and metadatas is not None
+        by_id = {
+            doc_id: Document(
+                page_content=doc, metadata=dict(meta or {}), id=doc_id
+            )
+            for doc_id, doc, meta in zip(results["ids"], documents, metadatas)
+        }
+        return [by_id[i] for i in ids if i in by_id]
+
+    def query_with_embeddings(
+        self,
+        text: str,
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+        embedding: list[float] | None = None,
+    ) -> tuple[list[float], list[Document], list]:
+        embeds = embedding or self._embed_query(text)
+        kwargs: dict = dict(
+            query_embeddings=[embeds],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+        if paper_ids:
+            kwargs["where"] = {"document_id": {"$in": paper_ids}}
+        results = self.collection.query(**kwargs)
+        return (
+            embeds,
+            _chroma_results_to_documents(results),
+            _chroma_results_embeddings(results),
+        )
 
     def query(
         self,
         text: str,
         n_results: int = 5,
         paper_ids: list[str] | None = None,
+        embedding: list[float] | None = None,
     ) -> list[Document]:
-        embeds = self.model_embeddings.embed_query(text)
+        embeds = embedding or self._embed_query(text)
         kwargs: dict = dict(query_embeddings=[embeds], n_results=n_results)
         if paper_ids:
             kwargs["where"] = {"document_id": {"$in": paper_ids}}
         results = self.collection.query(**kwargs)
         return _chroma_results_to_documents(results)
 
+    def query_each(
+        self,
+        texts: list[str],
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+        embeddings: list[list[float]] | None = None,
+    ) -> list[list[Document]]:
+        """
+        Search all *texts* in one Chroma request (embedded in one call
+        unless *embeddings* are given); the ranked hits of each text.
+        """
+        if not texts:
+            return []
+        kwargs: dict = dict(
+            query_embeddings=embeddings or self.embed_queries(texts),
+            n_results=n_results,
+        )
+        if paper_ids:
+            kwargs["where"] = {"document_id": {"$in": paper_ids}}
+        results = self.collection.query(**kwargs)
+        return [
+            _chroma_results_to_documents(results, i)
+            for i in range(len(results.get("ids") or []))
+        ]
+
+    def query_many(
+        self,
+        texts: list[str],
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+    ) -> list[Document]:
+        """``query_each`` merged: the union of hits, one per chunk id."""
+        texts = list(dict.fromkeys(texts))
+        return _merge_chroma_results(
+            self.query_each(texts, n_results, paper_ids)
+        )
+
     async def aadd(
         self,
-        chunks: list[Document],
+        chunks: list[Document] | AsyncIterable[Document],
         metadata: dict,
-        progress_callback: collections.abc.Callable[[int, int], None]
-        | None = None,
+        progress_callback: ProgressCallback | None = None,
     ) -> None:
-        batches = list(batched(chunks, self.batch_size))
-        tasks = [
-            self._embed_and_add(list(batch), metadata) for batch in batches
-        ]
-        if progress_callback is None:
-            await asyncio.gather(*tasks)
-        else:
-            total = len(tasks)
-            for i, coro in enumerate(asyncio.as_completed(tasks)):
-                await coro
-                progress_callback(i + 1, total)
+        """
+        Embed and upsert *chunks*; an async iterable is consumed while it is
+        produced, batch by batch.
+        """
+        await self.scheduler.run(
+            chunks,
+            lambda batch: self._embed_and_add(batch, metadata),
+            progress_callback=progress_callback,
+        )
 
     async def _embed_and_add(
         self, batch: list[Document], metadata: dict
     ) -> None:
         d_batch = _documents_to_dict(batch, metadata)
         embeds = await asyncio.to_thread(
-            self.model_embeddings.embed_documents,
-            d_batch["documents"],
+            self._embed_documents, d_batch["documents"]
         )
         await asyncio.to_thread(
-            self.collection.add, embeddings=embeds, **d_batch
+            self.collection.upsert, embeddings=embeds, **d_batch
         )
 
     async def aquery(
@@ -104,10 +488,71 @@ class ChromaVectorDB:
         text: str,
         n_results: int = 5,
         paper_ids: list[str] | None = None,
+        embedding: list[float] | None = None,
     ) -> list[Document]:
-        embeds = await self.model_embeddings.aembed_query(text)
+        embeds = embedding or await self._aembed_query(text)
         kwargs: dict = dict(query_embeddings=[embeds], n_results=n_results)
         if paper_ids:
             kwargs["where"] = {"document_id": {"$in": paper_ids}}
-        results = await asyncio.to_thread(self.collection.query, **kwargs)
+        results = await self._acollection_query(**kwargs)
         return _chroma_results_to_documents(results)
+
+    async def aquery_with_embeddings(
+        self,
+        text: str,
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+        embedding: list[float] | None = None,
+    ) -> tuple[list[float], list[Document], list]:
+        """Like aquery, also returning the query and chunk embeddings."""
+        embeds = embedding or await self._aembed_query(text)
+        kwargs: dict = dict(
+            query_embeddings=[embeds],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+        if paper_ids:
+            kwargs["where"] = {"document_id": {"$in": paper_ids}}
+        results = await self._acollection_query(**kwargs)
+        return (
+            embeds,
+            _chroma_results_to_documents(results),
+            _chroma_results_embeddings(results),
+        )
+
+    async def aquery_each(
+        self,
+        texts: list[str],
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+        embeddings: list[list[float]] | None = None,
+    ) -> list[list[Document]]:
+        """Async ``query_each``."""
+        if not texts:
+            return []
+        kwargs: dict = dict(
+            query_embeddings=embeddings or await self.aembed_queries(texts),
+            n_results=n_results,
+        )
+        if paper_ids:
+            kwargs["where"] = {"document_id": {"$in": paper_ids}}
+        results = await self._acollection_query(**kwargs)
+        return [
+            _chroma_results_to_documents(results, i)
+            for i in range(len(results.get("ids") or []))
+        ]
+
+    async def aquery_many(
+        self,
+        texts: list[str],
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+    ) -> list[Document]:
+        """
+        Embed all *texts* in one call, search them in one Chroma request and
+        return the union of hits, deduplicated by chunk id.
+        """
+        texts = list(dict.fromkeys(texts))
+        return _merge_chroma_results(
+            await self.aquery_each(texts, n_results, paper_ids)
+        )
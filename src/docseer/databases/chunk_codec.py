@@ -0,0 +1,221 @@
+import os
+import zlib
+import struct
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import zstandard
+
+logger = logging.getLogger(__name__)
+
+# 0xFF never starts UTF-8 text: marker, codec, dictionary id
+_PREFIX = struct.Struct("<BBI")
+_MAGIC = 0xFF
+_CODECS = {"zlib": 1, "zstd": 2}
+# zlib only looks back 32 KiB, so a larger preset dictionary is wasted
+_ZLIB_DICT_SIZE = 32 << 10
+
+
+def _zlib_dictionary(samples: list[bytes], size: int) -> bytes:
+    """
+    Lines, then words, that recur across samples (headers, table rules,
+    LaTeX macros), the most frequent last since zlib favours close matches.
+    """
+    lines = Counter(
+        line
+        for sample in samples
+        for line in set(sample.splitlines(keepends=True))
+        if 1 < len(line) <= 256
+    )
+    words = Counter(
+        word + b" "
+        for sample in samples
+        for word in set(sample.split())
+        if len(word) > 3
+    )
+    picked, total = [], 0
+    for counts in (lines, words):
+        for piece, n in counts.most_common():
+            if n < 2 or total + len(piece) > size:
+                break
+            picked.append(piece)
+            total += len(piece)
+    return b"".join(reversed(picked))
+
+
+class ChunkCodec:
+    """
+    Compression of docstore values with a dictionary trained on the
+    library's own parent chunks.
+
+    Compressed values carry their codec and dictionary id; anything else is
+    plain UTF-8, so values written before compression was enabled (or
+    before the dictionary was trained) are read as they are.  The first
+    *train_samples* values are stored plain and kept as training samples;
+    the dictionary trained from them is saved as ``<id>.dict`` under *path*
+    and ``CURRENT`` names the one new values are compressed with.
+
+    *method* is ``"zstd"`` (needs the ``zstandard`` package, the ``zstd``
+    extra; falls back to ``"zlib"`` without it), ``"zlib"`` or ``None`` to write plain values.
+    """
+
+    def __init__(
+        self,
+        path,
+        method: str | None = "zstd",
+        dict_size: int = 64 << 10,
+        train_samples: int = 256,
+        level: int = 3,
+    ):
+        if method == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                logger.warning("zstandard is not installed, using zlib")
+                method = "zlib"
+        if method is not None and method not in _CODECS:
+            raise ValueError(f"Unknown docstore compression {method!r}")
+
+        self.path = Path(path)
+        self.method = method
+        self.dict_size = dict_size
+        self.train_samples = train_samples
+        self.level = level
+
+        self._dicts: dict[int, bytes] = {}
+        self._compressors: dict[int, "zstandard.ZstdCompressor"] = {}
+        self._decompressors: dict[int, "zstandard.ZstdDecompressor"] = {}
+        self._current: int | None = None
+        self._samples: list[bytes] = []
+        self._lock = threading.Lock()
+        # zstandard (de)compressor objects are not safe for concurrent use
+        self._zstd_lock = threading.Lock()
+
+    # ── dictionaries ─────────────────────────────────────────────────────────
+
+    def _dictionary(self, dict_id: int) -> bytes:
+        data = self._dicts.get(dict_id)
+        if data is None:
+            data = (self.path / f"{dict_id:08x}.dict").read_bytes()
+            self._dicts[dict_id] = data
+        return data
+
+    def _current_id(self) -> int | None:
+        if self._current is None:
+            try:
+                self._current = int((self.path / "CURRENT").read_text(), 16)
+            except FileNotFoundError:
+                return None
+        return self._current
+
+    def train(self, samples: list[bytes]) -> int | None:
+        """
+        Train a dictionary on *samples*, save it and use it for new values.
+        Returns its id, or None when the samples share too little.
+        """
+        if self.method == "zstd":
+            import zstandard
+
+            try:
+                data = zstandard.train_dictionary(
+                    self.dict_size,
+                    samples,  # ty: ignore[invalid-argument-type]
+                ).as_bytes()
+            except zstandard.ZstdError as exc:
+                logger.debug("Dictionary training failed: %s", exc)
+                return None
+        else:
+            data = _zlib_dictionary(
+                samples, min(self.dict_size, _ZLIB_DICT_SIZE)
+            )
+        if not data:
+            return None
+
+        dict_id = zlib.crc32(data)
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name, content in (
+            (f"{dict_id:08x}.dict", data),
+            ("CURRENT", f"{dict_id:08x}".encode()),
+        ):
+            tmp = self.path / f"{name}.tmp"
+            tmp.write_bytes(content)
+            os.replace(tmp, self.path / name)
+        self._dicts[dict_id] = data
+        self._current = dict_id
+        logger.info(
+            "Trained %d-byte %s docstore dictionary %08x on %d chunks",
+            len(data),
+            self.method,
+            dict_id,
+            len(samples),
+        )
+        return dict_id
+
+    def _sample(self, raw: bytes) -> None:
+        with self._lock:
+            self._samples.append(raw)
+            if len(self._samples) < self.train_samples:
+                return
+            samples, self._samples = self._samples, []
+            # another writer may have trained one meanwhile
+            if self._current_id() is None and self.train(samples) is None:
+                self.train_samples *= 2
+
+    # ── values ───────────────────────────────────────────────────────────────
+
+    def encode(self, text: str) -> bytes:
+        raw = text.encode("utf-8")
+        if self.method is None:
+            return raw
+        dict_id = self._current_id()
+        if dict_id is None:
+            self._sample(raw)
+            return raw
+
+        codec = _CODECS[self.method]
+        if codec == _CODECS["zstd"]:
+            compressor = self._compressors.get(dict_id)
+            if compressor is None:
+                import zstandard
+
+                compressor = zstandard.ZstdCompressor(
+                    level=self.level,
+                    dict_data=zstandard.ZstdCompressionDict(
+                        self._dictionary(dict_id)
+                    ),
+                )
+                self._compressors[dict_id] = compressor
+            with self._zstd_lock:
+                payload = compressor.compress(raw)
+        else:
+            c = zlib.compressobj(self.level, zdict=self._dictionary(dict_id))
+            payload = c.compress(raw) + c.flush()
+        if len(payload) + _PREFIX.size >= len(raw):
+            return raw
+        return _PREFIX.pack(_MAGIC, codec, dict_id) + payload
+
+    def decode(self, value: bytes) -> str:
+        if not value or value[0] != _MAGIC:
+            return value.decode("utf-8")
+        _, codec, dict_id = _PREFIX.unpack_from(value)
+        payload = value[_PREFIX.size :]
+        if codec == _CODECS["zstd"]:
+            decompressor = self._decompressors.get(dict_id)
+            if decompressor is None:
+                import zstandard
+
+                decompressor = zstandard.ZstdDecompressor(
+                    dict_data=zstandard.ZstdCompressionDict(
+                        self._dictionary(dict_id)
+                    )
+                )
+                self._decompressors[dict_id] = decompressor
+            with self._zstd_lock:
+                raw = decompressor.decompress(payload)
+            return raw.decode("utf-8")
+        d = zlib.decompressobj(zdict=self._dictionary(dict_id))
+        return (d.decompress(payload) + d.flush()).decode("utf-8")
@@ -0,0 +1,146 @@
+import re
+import time
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+from langchain_core.stores import ByteStore
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _model_prefix(model_name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.\-]", "_", model_name)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache on top of any LangChain ``ByteStore``
+    (``LocalFileStore`` on a shared volume, ``RedisStore``, ...).
+
+    Keys are ``<model>/<sha256 of whitespace-normalized text>`` so the cache
+    is shared by every worker embedding with the same model, and vectors are
+    stored as raw float64 bytes.
+    """
+
+    def __init__(self, store: ByteStore):
+        self.store = store
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+        return f"{_model_prefix(model_name)}/{digest}"
+
+    def mget(
+        self, model_name: str, texts: list[str]
+    ) -> list[list[float] | None]:
+        values = self.store.mget([self.key(model_name, t) for t in texts])
+        return [None if v is None else array("d", v).tolist() for v in values]
+
+    def mset(
+        self,
+        model_name: str,
+        texts: list[str],
+        embeddings: list[list[float]],
+    ) -> None:
+        self.store.mset(
+            [
+                (self.key(model_name, t), array("d", e).tobytes())
+                for t, e in zip(texts, embeddings)
+            ]
+        )
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU + TTL cache of query embeddings keyed by (model, text).
+
+    An optional ``ByteStore`` persists entries (with their timestamp) so the
+    cache survives API restarts; memory misses fall through to it.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        store: ByteStore | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _fresh(self, created: float) -> bool:
+        return time.time() - created < self.ttl
+
+    def _remember(self, key: str, created: float, embedding: list[float]):
+        with self._lock:
+            self._entries[key] = (created, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_memory(self, model_name: str, text: str) -> list[float] | None:
+        """``get`` without falling through to the store: no I/O."""
+        key = EmbeddingCache.key(model_name, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+        return None
+
+    def get(self, model_name: str, text: str) -> list[float] | None:
+        embedding = self.get_memory(model_name, text)
+        if embedding is not None or self.store is None:
+            return embedding
+        key = EmbeddingCache.key(model_name, text)
+        (value,) = self.store.mget([key])
+        if value is None:
+            return None
+        created, *embedding = array("d", value).tolist()
+        if not self._fresh(created):
+            self.store.mdelete([key])
+            return None
+        self._remember(key, created, embedding)
+        return embedding
+
+    def set(
+        self,
+        model_name: str,
+        text: str,
+        embedding: list[float],
+        persist: bool = True,
+    ):
+        """
+        Cache *embedding*; with ``persist=False`` only in memory, leaving
+        the store write to ``persist`` (e.g. off an event loop).
+        """
+        key = EmbeddingCache.key(model_name, text)
+        self._remember(key, time.time(), list(embedding))
+        if persist:
+            self.persist(model_name, text, embedding)
+
+    def persist(self, model_name: str, text: str, embedding: list[float]):
+        if self.store is None:
+            return
+        key = EmbeddingCache.key(model_name, text)
+        self.store.mset(
+            [(key, array("d", [time.time(), *embedding]).tobytes())]
+        )
+
+    def invalidate(self, model_name: str) -> None:
+        prefix = f"{_model_prefix(model_name)}/"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+        if self.store is not None:
+            self.store.mdelete(list(self.store.yield_keys(prefix=prefix)))
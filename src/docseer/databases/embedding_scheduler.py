@@ -0,0 +1,198 @@
+import time
+import asyncio
+import collections.abc
+from collections import deque
+from typing import Any
+
+ProgressCallback = collections.abc.Callable[[int, int, float], None]
+
+
+class EmbeddingScheduler:
+    """
+    Bounded-concurrency, AIMD-adaptive batch scheduler for embedding calls.
+
+    Batches are cut lazily from the input so at most ``concurrency`` of them
+    are in flight (and in memory) at once.  After every batch:
+
+    - fast success (latency <= target): concurrency += 1, batch size += step
+    - slow success: halve concurrency, or halve the batch size once
+      concurrency is already 1
+    - error: halve both, re-queue the failed batch split at the new size
+
+    The learned concurrency / batch size persist across ``run`` calls.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 128,
+        min_batch_size: int = 8,
+        max_batch_size: int = 512,
+        batch_size_step: int = 16,
+        max_concurrency: int = 4,
+        target_latency: float = 10.0,
+        max_retries: int = 3,
+    ):
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max(max_batch_size, min_batch_size)
+        self.batch_size = min(
+            max(batch_size, self.min_batch_size), self.max_batch_size
+        )
+        self.batch_size_step = batch_size_step
+        self.max_concurrency = max(max_concurrency, 1)
+        self.concurrency = 1
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+
+    def _on_success(self, latency: float) -> None:
+        if latency <= self.target_latency:
+            self.concurrency = min(self.concurrency + 1, self.max_concurrency)
+            self.batch_size = min(
+                self.batch_size + self.batch_size_step, self.max_batch_size
+            )
+        elif self.concurrency > 1:
+            self.concurrency = max(self.concurrency // 2, 1)
+        else:
+            self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+
+    def _on_error(self) -> None:
+        self.concurrency = max(self.concurrency // 2, 1)
+        self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+
+    async def _timed(
+        self,
+        process: collections.abc.Callable[
+            [list[Any]], collections.abc.Awaitable[None]
+        ],
+        batch: list[Any],
+    ) -> float:
+        t0 = time.monotonic()
+        await process(batch)
+        return time.monotonic() - t0
+
+    async def run(
+        self,
+        items: list[Any] | collections.abc.AsyncIterable[Any],
+        process: collections.abc.Callable[
+            [list[Any]], collections.abc.Awaitable[None]
+        ],
+        progress_callback: ProgressCallback | None = None,
+    ) -> float:
+        """
+        Feed *items* to *process* in adaptive batches.
+
+        *items* may be an async iterable (e.g. a chunker still splitting
+        the document): batches are cut as items arrive, and the stream is
+        read ahead by at most one batch per concurrent slot.
+
+        *progress_callback* receives ``(done, total, chunks_per_second)``
+        after each completed batch; for a stream, ``total`` counts the
+        items received so far.  Returns the overall throughput.
+        """
+        if isinstance(items, list):
+            buffer: deque[Any] = deque(items)
+            total = len(items)
+            pump = None
+        else:
+            buffer = deque()
+            total = 0
+            arrived = asyncio.Event()
+            room = asyncio.Event()
+            room.set()
+
+            async def _pump() -> None:
+                nonlocal total
+                try:
+                    async for item in items:
+                        buffer.append(item)
+                        total += 1
+                        arrived.set()
+                        if len(buffer) >= self.batch_size * self.concurrency:
+                            room.clear()
+                            await room.wait()
+                finally:
+                    arrived.set()
+
+            pump = asyncio.create_task(_pump())
+
+        done = 0
+        retries: deque[tuple[list[Any], int]] = deque()
+        in_flight: dict[asyncio.Future, tuple[list[Any], int]] = {}
+        t_start = time.monotonic()
+
+        def _ready() -> bool:
+            if pump is None or pump.done():
+                return bool(buffer)
+            # while the stream is open, cut full batches; an idle
+            # scheduler starts on a smaller one
+            return len(buffer) >= self.batch_size or (
+                not in_flight and len(buffer) >= self.min_batch_size
+            )
+
+        try:
+            while True:
+                while len(in_flight) < self.concurrency and (
+                    retries or _ready()
+                ):
+                    if retries:
+                        batch, attempt = retries.popleft()
+                    else:
+                        batch = [
+                            buffer.popleft()
+                            for _ in range(min(self.batch_size, len(buffer)))
+                        ]
+                        attempt = 0
+                        if pump is not None:
+                            room.set()
+                    task = asyncio.create_task(self._timed(process, batch))
+                    in_flight[task] = (batch, attempt)
+
+                streaming = pump is not None and not pump.done()
+                if not (in_flight or retries or buffer or streaming):
+                    break
+
+                waiters: set[asyncio.Future] = set(in_flight)
+                if streaming:
+                    arrived.clear()
+                    waiters.add(asyncio.ensure_future(arrived.wait()))
+                finished, _ = await asyncio.wait(
+                    waiters, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in waiters - set(in_flight):
+                    task.cancel()
+                if pump is not None and pump.done():
+                    pump_error = pump.exception()
+                    if pump_error is not None:
+                        raise pump_error
+
+                for task in finished:
+                    if task not in in_flight:
+                        continue
+                    batch, attempt = in_flight.pop(task)
+                    exc = task.exception()
+                    if exc is not None:
+                        if attempt >= self.max_retries:
+                            raise exc
+                        self._on_error()
+                        for i in range(0, len(batch), self.batch_size):
+                            retries.append(
+                                (batch[i : i + self.batch_size], attempt + 1)
+                            )
+                        continue
+
+                    self._on_success(task.result())
+                    done += len(batch)
+                    if progress_callback is not None:
+                        elapsed = time.monotonic() - t_start
+                        progress_callback(
+                            done, total, done / elapsed if elapsed else 0.0
+                        )
+        finally:
+            pending = list(in_flight)
+            if pump is not None:
+                pending.append(pump)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        elapsed = time.monotonic() - t_start
+        return done / elapsed if elapsed else 0.0
@@ -0,0 +1,441 @@
+import os
+import re
+import sys
+import math
+import fcntl
+import pickle
+import struct
+import argparse
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .. import CACHE_FOLDER
+
+_TOKEN_RE = re.compile(r"\w+(?:[-.]\w+)*")
+# length prefix of each record appended to the log
+_RECORD = struct.Struct("<I")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased word tokens.  Compound identifiers ("GPT-4", "Eq.3") are kept
+    whole *and* split into their parts so both spellings match.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token or "." in token:
+            tokens.extend(re.split(r"[-.]", token))
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over child chunks.
+
+    Each chunk gets an integer slot; a term's postings are two parallel
+    ``array("I")`` of slots and term frequencies.  Deletes tombstone the
+    slot and the postings are compacted once enough of them are dead.
+
+    The index lives under *path_db* so the ingest workers (writers) and the
+    API (reader) can share it through the docstore volume: a pickled
+    snapshot, followed by a log of the adds and deletes made since.  Writers
+    take an exclusive ``flock``, replay what other writers appended and
+    append their own batch, so a write costs O(batch); the snapshot is only
+    rewritten (and the log restarted) once the log outgrows it or the
+    postings need compacting.  Readers replay new records under a shared
+    ``flock`` whenever the files changed.
+    """
+
+    FILENAME = "bm25.idx"
+
+    def __init__(
+        self,
+        path_db=None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_ratio: float = 0.25,
+        min_snapshot_bytes: int = 1 << 20,
+    ):
+        self.path_db = Path(path_db or CACHE_FOLDER / "lexical_index")
+        self.path_db.mkdir(parents=True, exist_ok=True)
+        self.path_index = self.path_db / self.FILENAME
+        self.path_lock = self.path_db / f"{self.FILENAME}.lock"
+
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.min_snapshot_bytes = min_snapshot_bytes
+
+        self._lock = threading.Lock()
+        self._reset()
+        with self._lock:
+            self._refresh()
+
+    def _reset(self) -> None:
+        self.ids: list[str | None] = []
+        self.doc_ids: list[str | None] = []
+        self.lengths = array("I")
+        self.postings: dict[str, tuple[array, array]] = {}
+        self._slot_of: dict[str, int] = {}
+        self._dead: set[int] = set()
+        self._total_length = 0
+        # snapshot (inode, mtime) and generation loaded, and how far its
+        # log has been replayed
+        self._snapshot_id: tuple[int, int] | None = None
+        self._snapshot_bytes = 0
+        self.generation = 0
+        self._log_offset = 0
+
+    # ── persistence ──────────────────────────────────────────────────────────
+
+    def _log_path(self, generation: int) -> Path:
+        return self.path_db / f"{self.FILENAME}.{generation}.log"
+
+    def _stat_snapshot(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path_index)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    @contextmanager
+    def _flock(self, operation: int):
+        with open(self.path_lock, "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Catch up with other processes' writes; callers hold _lock."""
+        try:
+            log_size = os.path.getsize(self._log_path(self.generation))
+        except FileNotFoundError:
+            log_size = 0
+        if (
+            self._stat_snapshot() == self._snapshot_id
+            and log_size <= self._log_offset
+        ):
+            return
+        with self._flock(fcntl.LOCK_SH):
+            self._load()
+
+    def _load(self) -> None:
+        """Load a newer snapshot and replay its log; callers hold a flock."""
+        snapshot_id = self._stat_snapshot()
+        if snapshot_id != self._snapshot_id:
+            self._reset()
+            if snapshot_id is not None:
+                with open(self.path_index, "rb") as f:
+                    state = pickle.load(f)
+                self.generation = state.get("generation", 0)
+                self.ids = state["ids"]
+                self.doc_ids = state["doc_ids"]
+                self.lengths = state["lengths"]
+                self.postings = state["postings"]
+                for slot, chunk_id in enumerate(self.ids):
+                    if chunk_id is None:
+                        self._dead.add(slot)
+                    else:
+                        self._slot_of[chunk_id] = slot
+                        self._total_length += self.lengths[slot]
+                self._snapshot_bytes = os.path.getsize(self.path_index)
+            self._snapshot_id = snapshot_id
+
+        try:
+            with open(self._log_path(self.generation), "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            (size,) = _RECORD.unpack_from(data, pos)
+            end = pos + _RECORD.size + size
+            if end > len(data):
+                # torn by a crashed writer; the next writer truncates it
+                break
+            self._apply(*pickle.loads(data[pos + _RECORD.size : end]))
+            pos = end
+        self._log_offset += pos
+
+    def _append(self, op: str, payload: list) -> None:
+        """Log *op* and apply it; callers hold _lock and the exclusive flock."""
+        if not payload:
+            return
+        record = pickle.dumps((op, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self._log_path(self.generation), "ab") as f:
+            f.truncate(self._log_offset)
+            f.write(_RECORD.pack(len(record)) + record)
+        self._log_offset += _RECORD.size + len(record)
+        self._apply(op, payload)
+
+    def _snapshot(self) -> None:
+        if self._dead:
+            self._compact()
+        old_log = self._log_path(self.generation)
+        self.generation += 1
+        state = dict(
+            generation=self.generation,
+            ids=self.ids,
+            doc_ids=self.doc_ids,
+            lengths=self.lengths,
+            postings=self.postings,
+        )
+        tmp = self.path_index.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path_index)
+        old_log.unlink(missing_ok=True)
+        self._snapshot_id = self._stat_snapshot()
+        self._snapshot_bytes = os.path.getsize(self.path_index)
+        self._log_offset = 0
+
+    @contextmanager
+    def _write(self):
+        with self._lock, self._flock(fcntl.LOCK_EX):
+            try:
+                self._load()
+                yield
+                if len(self._dead) > self.compact_ratio * len(
+                    self.ids
+                ) or self._log_offset > max(
+                    self._snapshot_bytes, self.min_snapshot_bytes
+                ):
+                    self._snapshot()
+            except BaseException:
+                # drop the half-applied in-memory state on the next access
+                self._reset()
+                raise
+
+    # ── mutation ─────────────────────────────────────────────────────────────
+
+    def _apply(self, op: str, payload: list) -> None:
+        if op == "add":
+            for chunk_id, document_id, tf in payload:
+                self._add_slot(chunk_id, document_id, tf)
+        else:
+            for chunk_id in payload:
+                if chunk_id in self._slot_of:
+                    self._remove_slot(self._slot_of[chunk_id])
+
+    def _add_slot(
+        self, chunk_id: str, document_id: str | None, tf: dict[str, int]
+    ) -> None:
+        if chunk_id in self._slot_of:
+            self._remove_slot(self._slot_of[chunk_id])
+        slot = len(self.ids)
+        length = sum(tf.values())
+        self.ids.append(chunk_id)
+        self.doc_ids.append(document_id)
+        self.lengths.append(length)
+        self._slot_of[chunk_id] = slot
+        self._total_length += length
+        for term, n in tf.items():
+            slots, tfs = self.postings.setdefault(
+                term, (array("I"), array("I"))
+            )
+            slots.append(slot)
+            tfs.append(n)
+
+    def _remove_slot(self, slot: int) -> None:
+        chunk_id = self.ids[slot]
+        if chunk_id is None:
+            return
+        del self._slot_of[chunk_id]
+        self.ids[slot] = None
+        self._dead.add(slot)
+        self._total_length -= self.lengths[slot]
+
+    def _compact(self) -> None:
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        alive = [s for s in range(len(self.ids)) if s not in self._dead]
+        remap[alive] = np.arange(len(alive))
+
+        postings = {}
+        for term, (slots, tfs) in self.postings.items():
+            new_slots = remap[np.array(slots, dtype=np.int64)]
+            keep = new_slots >= 0
+            if keep.any():
+                postings[term] = (
+                    array("I", new_slots[keep].astype(np.uint32).tobytes()),
+                    array("I", np.array(tfs, dtype=np.uint32)[keep].tobytes()),
+                )
+
+        self.ids = [self.ids[s] for s in alive]
+        self.doc_ids = [self.doc_ids[s] for s in alive]
+        self.lengths = array("I", (self.lengths[s] for s in alive))
+        self.postings = postings
+        self._slot_of = {c: s for s, c in enumerate(self.ids) if c}
+        self._dead = set()
+
+    def add(self, chunks: list[Document], metadata: dict) -> None:
+        # tokenized before taking the lock
+        entries = [
+            (
+                doc.id,
+                doc.metadata.get("document_id", metadata.get("document_id")),
+                dict(Counter(tokenize(doc.page_content))),
+            )
+            for doc in chunks
+            if doc.id is not None
+        ]
+        if not entries:
+            return
+        with self._write():
+            self._append("add", entries)
+
+    def delete(self, document_id: str) -> None:
+        with self._write():
+            self._append(
+                "delete",
+                [
+                    chunk_id
+                    for chunk_id, doc_id in zip(self.ids, self.doc_ids)
+                    if chunk_id is not None and doc_id == document_id
+                ],
+            )
+
+    def delete_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        with self._write():
+            self._append("delete", [i for i in ids if i in self._slot_of])
+
+    # ── lookup ───────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._slot_of
+
+    @property
+    def is_empty(self) -> bool:
+        with self._lock:
+            self._refresh()
+            return not self._slot_of
+
+    def search(
+        self,
+        text: str,
+        n_results: int = 5,
+        paper_ids: list[str] | None = None,
+    ) -> list[tuple[str, float]]:
+        """
+        Return up to *n_results* ``(chunk_id, bm25_score)``, best first.
+        Only the postings of the query terms are read.
+        """
+        with self._lock:
+            self._refresh()
+            n_live = len(self._slot_of)
+            if not n_live:
+                return []
+
+            avg_length = max(self._total_length / n_live, 1.0)
+            hit_slots: list[np.ndarray] = []
+            hit_scores: list[np.ndarray] = []
+            for term in dict.fromkeys(tokenize(text)):
+                if term not in self.postings:
+                    continue
+                slots, tfs = self.postings[term]
+                df = min(len(slots), n_live)
+                idf = math.log(1 + (n_live - df + 0.5) / (df + 0.5))
+                # copies: a buffer view would keep the arrays from growing
+                slot_arr = np.frombuffer(slots, dtype=np.uint32).astype(
+                    np.int64
+                )
+                tf_arr = np.frombuffer(tfs, dtype=np.uint32).astype(np.float32)
+                lengths = np.frombuffer(self.lengths, dtype=np.uint32)[
+                    slot_arr
+                ]
+                norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+                hit_slots.append(slot_arr)
+                hit_scores.append(
+                    idf * tf_arr * (self.k1 + 1) / (tf_arr + norm)
+                )
+            if not hit_slots:
+                return []
+
+            candidates, inverse = np.unique(
+                np.concatenate(hit_slots), return_inverse=True
+            )
+            scores = np.bincount(inverse, weights=np.concatenate(hit_scores))
+            wanted = set(paper_ids) if paper_ids else None
+            keep = np.fromiter(
+                (
+                    self.ids[s] is not None
+                    and (wanted is None or self.doc_ids[s] in wanted)
+                    for s in candidates
+                ),
+                dtype=bool,
+                count=len(candidates),
+            )
+            keep &= scores > 0
+            candidates, scores = candidates[keep], scores[keep]
+            order = np.argsort(-scores, kind="stable")[:n_results]
+            return [
+                (str(self.ids[candidates[i]]), float(scores[i])) for i in order
+            ]
+
+
+def backfill(index: BM25Index, collection, batch_size: int = 1000) -> int:
+    """
+    Index the chunks of the Chroma *collection* that *index* does not hold
+    yet, e.g. papers ingested before hybrid retrieval was enabled.  Safe to
+    run again.  Returns the number of chunks added.
+    """
+    added = 0
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["documents", "metadatas"],
+            limit=batch_size,
+            offset=offset,
+        )
+        if not page["ids"]:
+            return added
+        offset += len(page["ids"])
+        missing = [
+            Document(page_content=text, metadata=dict(meta or {}), id=chunk_id)
+            for chunk_id, text, meta in zip(
+                page["ids"], page["documents"] or [], page["metadatas"] or []
+            )
+            if chunk_id not in index
+        ]
+        index.add(missing, {})
+        added += len(missing)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        "python -m docseer.databases.lexical_index",
+        description="Add chunks stored in Chroma to the BM25 index.",
+    )
+    parser.add_argument("path", help="BM25Index directory")
+    parser.add_argument("--chroma-host", default="localhost")
+    parser.add_argument("--chroma-port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    from .chroma import ChromaVectorDB
+
+    client = chromadb.HttpClient(host=args.chroma_host, port=args.chroma_port)
+    collection = client.get_or_create_collection(
+        name=ChromaVectorDB.COLLECTION_NAME
+    )
+    added = backfill(BM25Index(args.path), collection)
+    print(f"Indexed {added} chunks into {args.path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,12 +29,24 @@ class LocalFileStoreDB:
             list(zip(ids, (c.page_content.encode("utf-8") for c in chunks)))
         )
 
+    def keys(self, document_id: str) -> list[str]:
+        return [
+            p.name
+            for p in self.path_db.glob(f"{document_id}-*")
+            if p.is_file()
+        ]
+
     def delete(self, document_id: str):
-        self.docstore.mdelete(list(self.docstore.yield_keys(document_id)))
+        self.docstore.mdelete(self.keys(document_id))
 
-    def get(self, ids: list[str]) -> list[str]:
+    def delete_ids(self, ids: list[str]):
+        self.docstore.mdelete(ids)
+
+    def mget(self, ids: list[str]) -> list[str | None]:
         return [
-            content.decode("utf-8")
+            content.decode("utf-8") if content is not None else None
             for content in self.docstore.mget(ids)
-            if content is not None
         ]
+
+    def get(self, ids: list[str]) -> list[str]:
+        return [content for content in self.mget(ids) if content is not None]
@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+from langchain_core.documents import Document
+
+from .segment_store import document_id_of
+
+
+class ParentCache:
+    """
+    In-process LRU of decoded parent texts in front of a docstore, bounded
+    by the UTF-8 size of the texts it holds rather than their number.
+
+    Parent ids are content hashes (``{document_id}-{digest}``), so a cached
+    text cannot go stale when a worker re-ingests the paper: changed
+    sections get new ids.  Deletes through this wrapper drop the entries of
+    the document; ``invalidate`` does the same for writes made elsewhere.
+    """
+
+    def __init__(self, docstore, max_bytes: int = 64 << 20):
+        self.docstore = docstore
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.resident_bytes = 0
+        self._entries: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._by_document: dict[str, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "entries": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    # ── LRU bookkeeping (callers hold _lock) ─────────────────────────────────
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.resident_bytes -= entry[1]
+        document_id = document_id_of(key)
+        self._by_document[document_id].discard(key)
+        if not self._by_document[document_id]:
+            del self._by_document[document_id]
+
+    def _remember(self, key: str, content: str) -> None:
+        size = len(content.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (content, size)
+        self._by_document[document_id_of(key)].add(key)
+        self.resident_bytes += size
+        while self.resident_bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, document_id: str) -> None:
+        with self._lock:
+            for key in list(self._by_document.get(document_id, ())):
+                self._drop(key)
+
+    # ── docstore interface ───────────────────────────────────────────────────
+
+    @property
+    def is_empty(self) -> bool:
+        return self.docstore.is_empty
+
+    def add(self, ids: list[str], chunks: list[Document]) -> None:
+        self.docstore.add(ids, chunks)
+        with self._lock:
+            for key in ids:
+                self._drop(key)
+
+    def keys(self, document_id: str) -> list[str]:
+        return self.docstore.keys(document_id)
+
+    def delete(self, document_id: str) -> None:
+        self.invalidate(document_id)
+        self.docstore.delete(document_id)
+
+    def delete_ids(self, ids: list[str]) -> None:
+        with self._lock:
+            for key in ids:
+                self._drop(key)
+        self.docstore.delete_ids(ids)
+
+    def cached(self, ids: list[str]) -> dict[str, str]:
+        """
+        The texts of *ids* held in memory, without touching the docstore:
+        cheap enough to call on an event loop before offloading the rest.
+        """
+        found: dict[str, str] = {}
+        with self._lock:
+            for key in ids:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+            self.hits += len(found)
+        return found
+
+    def mget(self, ids: list[str]) -> list[str | None]:
+        found = self.cached(ids)
+        missing = [key for key in dict.fromkeys(ids) if key not in found]
+        with self._lock:
+            self.misses += len(missing)
+        if missing:
+            loaded = self.docstore.mget(missing)
+            with self._lock:
+                for key, content in zip(missing, loaded):
+                    if content is not None:
+                        found[key] = content
+                        self._remember(key, content)
+        return [found.get(key) for key in ids]
+
+    def get(self, ids: list[str]) -> list[str]:
+        return [content for content in self.mget(ids) if content is not None]
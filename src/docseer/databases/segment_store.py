@@ -0,0 +1,447 @@
+import os
+import re
+import sys
+import json
+import mmap
+import zlib
+import fcntl
+import struct
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import groupby
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from .. import CACHE_FOLDER
+from .chunk_codec import ChunkCodec
+
+logger = logging.getLogger(__name__)
+
+# record: op, key length, value length, crc32(key + value), key, value
+_HEADER = struct.Struct("<BHII")
+_PUT = 1
+_DELETE = 2
+# parent ids are "{document_id}-{16 hex digest}", "-n" for repeated content
+_PARENT_ID_RE = re.compile(r"^(.*)-[0-9a-f]{16}(?:-\d+)?$")
+
+
+def document_id_of(key: str) -> str:
+    """Paper id of a parent id ``{document_id}-{digest}[-n]``."""
+    match = _PARENT_ID_RE.match(key)
+    return match.group(1) if match else key.rsplit("-", 1)[0]
+
+
+def _record(op: int, key: bytes, value: bytes = b"") -> bytes:
+    crc = zlib.crc32(value, zlib.crc32(key))
+    return _HEADER.pack(op, len(key), len(value), crc) + key + value
+
+
+class SegmentStoreDB:
+    """
+    Parent-chunk store in a few append-only segment files.
+
+    Puts and deletes are appended as records to the active segment (a new
+    one is started past *segment_size*); ``MANIFEST`` lists the segments.
+    Every process keeps an in-memory index of key -> record offset, built
+    by scanning record headers and kept current by scanning only what was
+    appended since (one ``stat`` of the manifest and of the active segment
+    per call).  Values are read through ``mmap``; with *compression* they
+    are stored compressed with a dictionary trained on the library (see
+    ``ChunkCodec``).
+
+    Writers (ingest workers) serialize through an exclusive ``flock``.  Once
+    more than *compact_ratio* of the bytes are dead, live records are copied
+    into a fresh segment in a background thread and the old segments are
+    dropped; readers notice the new manifest and rebuild their index.
+    """
+
+    MANIFEST = "MANIFEST"
+
+    def __init__(
+        self,
+        path_db=None,
+        segment_size: int = 64 << 20,
+        compact_ratio: float = 0.5,
+        min_compact_bytes: int = 16 << 20,
+        compression: str | None = None,
+    ):
+        self.path_db = Path(path_db or CACHE_FOLDER / "docstore_segments")
+        self.path_db.mkdir(parents=True, exist_ok=True)
+        self.path_manifest = self.path_db / self.MANIFEST
+        self.path_lock = self.path_db / "LOCK"
+
+        self.segment_size = segment_size
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        # values are read back whatever codec wrote them
+        self.codec = ChunkCodec(self.path_db / "dictionaries", compression)
+
+        self._lock = threading.RLock()
+        self._compaction: threading.Thread | None = None
+        self._maps: dict[int, mmap.mmap] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        for m in self._maps.values():
+            m.close()
+        self._manifest_id: tuple[int, int] | None = None
+        self._segments: list[int] = []
+        self._sealed: set[int] = set()
+        self._maps = {}
+        self._scanned: dict[int, int] = {}
+        # key -> (segment, record offset, key length, value length)
+        self._index: dict[str, tuple[int, int, int, int]] = {}
+        self._by_document: dict[str, set[str]] = defaultdict(set)
+        self._total_bytes = 0
+        self._live_bytes = 0
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.path_db / f"{segment:08d}.seg"
+
+    # ── index maintenance ────────────────────────────────────────────────────
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self.path_manifest)
+        except FileNotFoundError:
+            if self._segments:
+                self._reset()
+            return
+
+        if (stat.st_ino, stat.st_mtime_ns) != self._manifest_id:
+            with open(self.path_manifest, "rb") as f:
+                fstat = os.fstat(f.fileno())
+                segments = json.load(f)["segments"]
+            if segments[: len(self._segments)] != self._segments:
+                # compacted: the segments we indexed are gone
+                self._reset()
+            self._segments = segments
+            self._manifest_id = (fstat.st_ino, fstat.st_mtime_ns)
+
+        for segment in self._segments:
+            if segment in self._sealed:
+                continue
+            self._scan(segment)
+            if segment != self._segments[-1]:
+                # only the last segment is ever appended to
+                self._sealed.add(segment)
+
+    def _refresh_or_reload(self) -> None:
+        try:
+            self._refresh()
+        except FileNotFoundError:
+            # a segment was compacted away between two reads
+            self._reset()
+            self._refresh()
+
+    def _map(self, segment: int, size: int) -> mmap.mmap:
+        m = self._maps.get(segment)
+        if m is None or len(m) < size:
+            if m is not None:
+                m.close()
+            with open(self._segment_path(segment), "rb") as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = m
+        return m
+
+    def _scan(self, segment: int) -> None:
+        size = os.path.getsize(self._segment_path(segment))
+        start = pos = self._scanned.get(segment, 0)
+        if size <= start:
+            return
+        m = self._map(segment, size)
+        while pos + _HEADER.size <= size:
+            op, key_len, value_len, _ = _HEADER.unpack_from(m, pos)
+            end = pos + _HEADER.size + key_len + value_len
+            if op not in (_PUT, _DELETE) or end > size:
+                break  # record still being written, or a torn write
+            key_start = pos + _HEADER.size
+            key = m[key_start : key_start + key_len].decode("utf-8")
+            self._apply(op, key, (segment, pos, key_len, value_len))
+            pos = end
+        self._total_bytes += pos - start
+        self._scanned[segment] = pos
+
+    def _apply(self, op: int, key: str, entry: tuple) -> None:
+        document_id = document_id_of(key)
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._live_bytes -= _HEADER.size + old[2] + old[3]
+            self._by_document[document_id].discard(key)
+        if op == _PUT:
+            self._index[key] = entry
+            self._live_bytes += _HEADER.size + entry[2] + entry[3]
+            self._by_document[document_id].add(key)
+        elif not self._by_document[document_id]:
+            del self._by_document[document_id]
+
+    # ── writes ───────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def _locked(self):
+        # flock before the thread lock, in every writer and in compaction
+        with open(self.path_lock, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    self._refresh_or_reload()
+                    yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, segments: list[int]) -> None:
+        tmp = self.path_manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"segments": segments}))
+        os.replace(tmp, self.path_manifest)
+
+    def _active_segment(self) -> int:
+        if (
+            not self._segments
+            or self._scanned.get(self._segments[-1], 0) >= self.segment_size
+        ):
+            segment = self._segments[-1] + 1 if self._segments else 0
+            self._segment_path(segment).touch()
+            self._write_manifest(self._segments + [segment])
+            self._refresh()
+        return self._segments[-1]
+
+    def _append(self, records: list[bytes]) -> None:
+        if not records:
+            return
+        segment = self._active_segment()
+        path = self._segment_path(segment)
+        scanned = self._scanned.get(segment, 0)
+        if os.path.getsize(path) > scanned:
+            # left behind by a writer that died mid-record
+            os.truncate(path, scanned)
+        with open(path, "ab") as f:
+            f.write(b"".join(records))
+        self._scan(segment)
+
+    def add(self, ids: list[str], chunks: list[Document]) -> None:
+        assert len(ids) == len(chunks)
+        records = [
+            _record(
+                _PUT, key.encode("utf-8"), self.codec.encode(c.page_content)
+            )
+            for key, c in zip(ids, chunks)
+        ]
+        with self._locked():
+            self._append(records)
+        self._maybe_compact()
+
+    def delete_ids(self, ids: list[str]) -> None:
+        with self._locked():
+            self._append(
+                [
+                    _record(_DELETE, key.encode("utf-8"))
+                    for key in dict.fromkeys(ids)
+                    if key in self._index
+                ]
+            )
+        self._maybe_compact()
+
+    def delete(self, document_id: str) -> None:
+        with self._locked():
+            self._append(
+                [
+                    _record(_DELETE, key.encode("utf-8"))
+                    for key in self._by_document.get(document_id, ())
+                ]
+            )
+        self._maybe_compact()
+
+    # ── compaction ───────────────────────────────────────────────────────────
+
+    def _needs_compaction(self) -> bool:
+        dead = self._total_bytes - self._live_bytes
+        return (
+            self._total_bytes >= self.min_compact_bytes
+            and dead > self.compact_ratio * self._total_bytes
+        )
+
+    def _maybe_compact(self) -> None:
+        with self._lock:
+            if not self._needs_compaction() or (
+                self._compaction is not None and self._compaction.is_alive()
+            ):
+                return
+            self._compaction = threading.Thread(
+                target=self.compact, name="docstore-compaction", daemon=True
+            )
+            self._compaction.start()
+
+    def compact(self, force: bool = False) -> None:
+        """Rewrite the live records into a single new segment."""
+        with open(self.path_lock, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    self._refresh_or_reload()
+                    if not self._segments or not (
+                        force or self._needs_compaction()
+                    ):
+                        return
+                    segments = list(self._segments)
+                    records = sorted(
+                        (seg, off, _HEADER.size + key_len + value_len)
+                        for seg, off, key_len, value_len in self._index.values()
+                    )
+
+                # copy without the thread lock so readers are not blocked;
+                # the flock keeps every writer out meanwhile
+                target = segments[-1] + 1
+                tmp = self._segment_path(target).with_suffix(".tmp")
+                with open(tmp, "wb") as out:
+                    for segment, group in groupby(records, key=lambda r: r[0]):
+                        with (
+                            open(self._segment_path(segment), "rb") as f,
+                            mmap.mmap(
+                                f.fileno(), 0, access=mmap.ACCESS_READ
+                            ) as m,
+                        ):
+                            for _, off, length in group:
+                                out.write(m[off : off + length])
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp, self._segment_path(target))
+                self._write_manifest([target])
+                for segment in segments:
+                    self._segment_path(segment).unlink(missing_ok=True)
+
+                with self._lock:
+                    self._reset()
+                    self._refresh()
+                logger.info(
+                    "Compacted docstore %s: %d segments -> 1 (%d records)",
+                    self.path_db,
+                    len(segments),
+                    len(records),
+                )
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ── reads ────────────────────────────────────────────────────────────────
+
+    @property
+    def is_empty(self) -> bool:
+        with self._lock:
+            self._refresh_or_reload()
+            return not self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_or_reload()
+            return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._refresh_or_reload()
+            return key in self._index
+
+    def keys(self, document_id: str) -> list[str]:
+        with self._lock:
+            self._refresh_or_reload()
+            return sorted(self._by_document.get(document_id, ()))
+
+    def _read(self, entry: tuple[int, int, int, int]) -> bytes | None:
+        segment, off, key_len, value_len = entry
+        start = off + _HEADER.size
+        end = start + key_len + value_len
+        m = self._map(segment, end)
+        crc = _HEADER.unpack_from(m, off)[3]
+        value = m[start + key_len : end]
+        if zlib.crc32(value, zlib.crc32(m[start : start + key_len])) != crc:
+            logger.warning("Corrupt docstore record in segment %d", segment)
+            return None
+        return value
+
+    def _mget(self, ids: list[str]) -> list[bytes | None]:
+        return [
+            self._read(self._index[k]) if k in self._index else None
+            for k in ids
+        ]
+
+    def mget(self, ids: list[str]) -> list[str | None]:
+        with self._lock:
+            self._refresh_or_reload()
+            try:
+                values = self._mget(ids)
+            except FileNotFoundError:
+                self._reset()
+                self._refresh()
+                values = self._mget(ids)
+        return [
+            self.codec.decode(v) if v is not None else None for v in values
+        ]
+
+    def get(self, ids: list[str]) -> list[str]:
+        return [value for value in self.mget(ids) if value is not None]
+
+
+def migrate_local_file_store(
+    source, store: SegmentStoreDB, batch_size: int = 1000
+) -> int:
+    """
+    Copy the parent chunks of a ``LocalFileStoreDB`` directory (one file
+    per key) into *store*.  Keys already in *store* are skipped, so an
+    interrupted migration can simply be run again.  Returns the number of
+    chunks copied.
+    """
+    copied = 0
+    ids: list[str] = []
+    chunks: list[Document] = []
+
+    def _flush() -> None:
+        nonlocal copied
+        store.add(ids, chunks)
+        copied += len(ids)
+        ids.clear()
+        chunks.clear()
+
+    with os.scandir(source) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name in store:
+                continue
+            with open(entry.path, "rb") as f:
+                content = f.read().decode("utf-8")
+            ids.append(entry.name)
+            chunks.append(Document(page_content=content))
+            if len(ids) >= batch_size:
+                _flush()
+    if ids:
+        _flush()
+    return copied
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        "python -m docseer.databases.segment_store",
+        description="Migrate a file-per-chunk docstore to a segment store.",
+    )
+    parser.add_argument("source", help="LocalFileStoreDB directory")
+    parser.add_argument(
+        "--compression",
+        choices=["zstd", "zlib"],
+        help="compress parent chunks with a trained dictionary",
+    )
+    parser.add_argument(
+        "target",
+        nargs="?",
+        help="segment store directory (default: SOURCE/segments)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    target = args.target or Path(args.source) / "segments"
+    store = SegmentStoreDB(target, compression=args.compression)
+    copied = migrate_local_file_store(args.source, store)
+    print(f"Copied {copied} parent chunks into {target}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
-from .retriever import Retriever
+from .retriever import (
+    Retriever,
+    approx_tokens,
+    doc_tokens,
+    interleave_papers,
+)
 from .mutli_query import One2ManyQueriesRetriever
 from .multi_steps_retriever import MultiStepsRetriever
 from .async_flashrankrerank import AsyncFlashrankRerank
+from .result_cache import IndexVersions, RetrievalCache
+from .deadlines import StageBudget
 
 __all__ = [
     "Retriever",
     "One2ManyQueriesRetriever",
     "MultiStepsRetriever",
     "AsyncFlashrankRerank",
+    "IndexVersions",
+    "RetrievalCache",
+    "StageBudget",
+    "approx_tokens",
+    "doc_tokens",
+    "interleave_papers",
 ]
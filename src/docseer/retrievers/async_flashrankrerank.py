@@ -1,17 +1,189 @@
 import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Sequence, Optional
+
+import numpy as np
+from pydantic import PrivateAttr
 from langchain_core.documents import Document
 from langchain_core.callbacks import Callbacks
 from langchain_community.document_compressors import FlashrankRerank
 
 
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class AsyncFlashrankRerank(FlashrankRerank):
+    # reranking runs on its own pool so a slow batch never starves the
+    # default executor that Chroma / docstore calls go through
+    max_workers: int = 1
+    # (query, passage) pairs from concurrent requests queued within
+    # batch_window seconds are scored in one ONNX call
+    batch_window: float = 0.005
+    max_batch_pairs: int = 64
+    # LRU of scores keyed by (model, query hash, passage hash): the passage
+    # may be a parent section standing in for the chunk it was found by
+    score_cache_size: int = 4096
+
+    _executor: ThreadPoolExecutor | None = PrivateAttr(default=None)
+    _pending: list = PrivateAttr(default_factory=list)
+    _flush_handle: asyncio.TimerHandle | None = PrivateAttr(default=None)
+    _scores: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _scores_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="flashrank"
+            )
+        return self._executor
+
+    def warmup(self) -> None:
+        """Run one tiny rerank so the ONNX session is ready."""
+        self.compress_documents([Document(page_content="warmup")], "warmup")
+
+    # ── scoring ──────────────────────────────────────────────────────────────
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """
+        Cross-encoder scores for (query, passage) pairs that may belong to
+        different queries — the pairwise path of ``flashrank.Ranker.rerank``
+        without its one-query-per-call restriction.
+        """
+        encoded = self.client.tokenizer.encode_batch(
+            [list(pair) for pair in pairs]
+        )
+        onnx_input = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encoded], dtype=np.int64
+            ),
+        }
+        token_type_ids = np.array(
+            [e.type_ids for e in encoded], dtype=np.int64
+        )
+        if np.any(token_type_ids):
+            onnx_input["token_type_ids"] = token_type_ids
+
+        logits = np.asarray(self.client.session.run(None, onnx_input)[0])
+        if logits.shape[1] == 1:
+            scores = 1 / (1 + np.exp(-logits.flatten()))
+        else:
+            exp_logits = np.exp(logits)
+            scores = exp_logits[:, 1] / np.sum(exp_logits, axis=1)
+        return scores.tolist()
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        def _done(task: asyncio.Future) -> None:
+            error = (
+                asyncio.CancelledError()
+                if task.cancelled()
+                else task.exception()
+            )
+            for i, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(task.result()[i])
+
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(
+            self.executor, self.score_pairs, [pair for pair, _ in batch]
+        ).add_done_callback(_done)
+
+    async def _ascore(self, pairs: list[tuple[str, str]]) -> list[float]:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for pair in pairs:
+            future = loop.create_future()
+            self._pending.append((pair, future))
+            futures.append(future)
+        if len(self._pending) >= self.max_batch_pairs:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.batch_window, self._flush
+            )
+        return list(await asyncio.gather(*futures))
+
+    # ── score cache ──────────────────────────────────────────────────────────
+
+    def _score_key(self, query_digest: str, doc: Document) -> str:
+        return f"{self.model}:{query_digest}:{_digest(doc.page_content)}"
+
+    def _cached_scores(self, keys: list[str]) -> list[float | None]:
+        with self._scores_lock:
+            scores = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            return scores
+
+    def _cache_scores(self, keys: list[str], scores: list[float]) -> None:
+        with self._scores_lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.score_cache_size:
+                self._scores.popitem(last=False)
+
+    # ── compressor API ───────────────────────────────────────────────────────
+
     async def acompress_documents(
         self,
         documents: Sequence[Document],
         query: str,
         callbacks: Optional[Callbacks] = None,
     ) -> Sequence[Document]:
-        return await asyncio.to_thread(
-            self.compress_documents, documents, query, callbacks
+        if getattr(self.client, "llm_model", None) is not None:
+            # listwise (LLM) rankers rank whole lists; no pair batching
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                partial(self.compress_documents, documents, query, callbacks),
+            )
+
+        query_digest = _digest(query)
+        keys = [self._score_key(query_digest, doc) for doc in documents]
+        scores = self._cached_scores(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            new_scores = await self._ascore(
+                [(query, documents[i].page_content) for i in missing]
+            )
+            self._cache_scores([keys[i] for i in missing], new_scores)
+            for i, score in zip(missing, new_scores):
+                scores[i] = score
+        final = [score or 0.0 for score in scores]
+
+        ranked = sorted(
+            enumerate(documents), key=lambda p: final[p[0]], reverse=True
         )
+        return [
+            Document(
+                page_content=doc.page_content,
+                metadata={
+                    self.prefix_metadata + "id": i,
+                    self.prefix_metadata + "relevance_score": final[i],
+                    **doc.metadata,
+                },
+                id=doc.id,
+            )
+            for i, doc in ranked[: self.top_n]
+            if final[i] >= self.score_threshold
+        ]
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_RAISE: Any = object()
+
+
+class StageBudget:
+    """
+    Time budgets for the stages of one retrieval (``embed``, ``papers``,
+    ``search``, ``lexical``, ``expand``, ``rerank``, ``summarize``) and the
+    time spent in each of them.
+
+    A stage that runs over its budget or fails is recorded in ``degraded``
+    and returns its *fallback* when one is given, so the work of the stages
+    that already finished is kept.  Stages without a budget never time out
+    unless they run inside a ``deadline``.
+    """
+
+    def __init__(self, budgets: dict[str, float | None] | None = None):
+        self.budgets = dict(budgets or {})
+        self.timings: dict[str, float] = {}
+        self.degraded: dict[str, str] = {}
+        self._deadline: float | None = None
+
+    @contextmanager
+    def deadline(self, seconds: float | None) -> Iterator[None]:
+        """
+        Cap the stages run inside the block at *seconds* in total: each
+        stage gets at most what is left, so a late stage falls back instead
+        of the whole block being thrown away.
+        """
+        previous = self._deadline
+        if seconds is not None:
+            self._deadline = time.monotonic() + seconds
+        try:
+            yield
+        finally:
+            self._deadline = previous
+
+    def _budget(self, stage: str) -> float | None:
+        budget = self.budgets.get(stage)
+        if self._deadline is None:
+            return budget
+        left = max(self._deadline - time.monotonic(), 0.0)
+        return left if budget is None else min(budget, left)
+
+    async def run(self, stage: str, awaitable: Awaitable, fallback=_RAISE):
+        start = time.perf_counter()
+        budget = self._budget(stage)
+        try:
+            return await asyncio.wait_for(awaitable, budget)
+        except TimeoutError:
+            self.degraded[stage] = "timeout"
+            if budget is None:
+                logger.warning("Stage %r timed out", stage)
+            else:
+                logger.warning(
+                    "Stage %r exceeded its %.2fs budget", stage, budget
+                )
+            if fallback is _RAISE:
+                raise
+            return fallback
+        except Exception as exc:
+            self.degraded[stage] = "error"
+            logger.warning("Stage %r failed: %s", stage, exc)
+            if fallback is _RAISE:
+                raise
+            return fallback
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            # stages run once per variant in a fan-out add up
+            self.timings[stage] = round(
+                self.timings.get(stage, 0.0) + elapsed, 1
+            )
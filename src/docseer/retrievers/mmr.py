@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def mmr(
+    query_embedding,
+    embeddings,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> list[int]:
+    """
+    Maximal marginal relevance over cosine similarity.
+
+    Returns the indices of up to *k* rows of *embeddings*, picked greedily
+    to maximize ``lambda * sim(query, d) - (1 - lambda) * max sim(d, picked)``.
+    The pairwise similarities are one matrix product; each step is a single
+    vectorized update of the running max-similarity to the picked set.
+    """
+    candidates = _normalize(np.asarray(embeddings, dtype=np.float32))
+    if candidates.ndim != 2 or not len(candidates) or k <= 0:
+        return []
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
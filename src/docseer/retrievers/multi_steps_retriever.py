@@ -1,16 +1,24 @@
-from typing import Any
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator
 from pydantic import ConfigDict, Field, PrivateAttr
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import BasePromptTemplate
 from langchain_core.callbacks import (
     AsyncCallbackManagerForRetrieverRun,
     CallbackManagerForRetrieverRun,
 )
-from langchain_classic.retrievers.multi_query import MultiQueryRetriever
+from langchain_classic.retrievers.multi_query import DEFAULT_QUERY_PROMPT
 from langchain_classic.retrievers.document_compressors import LLMChainExtractor
 from .async_flashrankrerank import AsyncFlashrankRerank
+from .deadlines import StageBudget
 from .retriever import Retriever
 
+logger = logging.getLogger(__name__)
+
 
 class MultiStepsRetriever(BaseRetriever):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -19,10 +27,21 @@ class MultiStepsRetriever(BaseRetriever):
     llm: Any = Field(None)
     reranker: AsyncFlashrankRerank | None = Field(None)
     extractor: LLMChainExtractor | None = Field(None)
-    multi_query: MultiQueryRetriever | None = Field(None)
+    # think mode: the llm rewrites the query into variants (one per line)
+    # that are searched as they stream in and merged by rank fusion
+    query_prompt: BasePromptTemplate = DEFAULT_QUERY_PROMPT
+    include_original: bool = True
+    variant_cache_size: int = 256
     summarizer_llm: Any = Field(None)
     max_summary_tokens: int = 2048
+    # seconds per stage (embed, search, lexical, expand, rerank, summarize);
+    # a late expand, rerank or summarize keeps the previous stage's output
+    stage_budgets: dict[str, float | None] = Field(default_factory=dict)
     _think_mode: bool = PrivateAttr(default=False)
+    _variants: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _variants_lock: threading.Lock = PrivateAttr(
+        default_factory=threading.Lock
+    )
 
     @classmethod
     def init(
@@ -34,26 +53,22 @@ class MultiStepsRetriever(BaseRetriever):
         summarizer_llm=None,
         max_summary_tokens=2048,
         think_mode=False,
+        stage_budgets: dict[str, float | None] | None = None,
     ) -> "MultiStepsRetriever":
-        if llm is not None:
-            multi = MultiQueryRetriever.from_llm(
-                retriever=base_retriever, llm=llm
-            )
-            extractor = (
-                LLMChainExtractor.from_llm(llm) if use_extractor else None
-            )
-        else:
-            multi = None
-            extractor = None
+        extractor = (
+            LLMChainExtractor.from_llm(llm)
+            if llm is not None and use_extractor
+            else None
+        )
 
         obj = cls(
             base_retriever=base_retriever,
             llm=llm,
             reranker=reranker,
             extractor=extractor,
-            multi_query=multi,
             summarizer_llm=summarizer_llm,
             max_summary_tokens=max_summary_tokens,
+            stage_budgets=stage_budgets or {},
         )
         obj._think_mode = (llm is not None) and think_mode
         return obj
@@ -72,9 +87,11 @@ class MultiStepsRetriever(BaseRetriever):
         metadata: dict[str, str],
         parent_ids: list[str] | None,
         parent_chunks: list[Document] | None,
+        title: str | None = None,
+        abstract: str | None = None,
     ) -> None:
         self.base_retriever.populate(
-            chunks, metadata, parent_ids, parent_chunks
+            chunks, metadata, parent_ids, parent_chunks, title, abstract
         )
 
     async def apopulate(
@@ -83,14 +100,93 @@ class MultiStepsRetriever(BaseRetriever):
         metadata: dict[str, str],
         parent_ids: list[str] | None,
         parent_chunks: list[Document] | None,
+        title: str | None = None,
+        abstract: str | None = None,
     ) -> None:
         await self.base_retriever.apopulate(
-            chunks, metadata, parent_ids, parent_chunks
+            chunks,
+            metadata,
+            parent_ids,
+            parent_chunks,
+            title=title,
+            abstract=abstract,
         )
 
     def delete_document(self, document_id: str) -> None:
         self.base_retriever.delete_document(document_id)
 
+    # ── query variants ───────────────────────────────────────────────────────
+
+    def _variant_key(self, query: str) -> tuple[str, str]:
+        # variants of another model (e.g. after a model switch) differ
+        model = getattr(self.llm, "model", None) or getattr(
+            self.llm, "model_name", type(self.llm).__name__
+        )
+        return str(model), query
+
+    def _cached_variants(self, query: str) -> list[str] | None:
+        key = self._variant_key(query)
+        with self._variants_lock:
+            variants = self._variants.get(key)
+            if variants is not None:
+                self._variants.move_to_end(key)
+            return variants
+
+    def _cache_variants(self, query: str, variants: list[str]) -> None:
+        key = self._variant_key(query)
+        with self._variants_lock:
+            self._variants[key] = variants
+            self._variants.move_to_end(key)
+            while len(self._variants) > self.variant_cache_size:
+                self._variants.popitem(last=False)
+
+    def _with_original(self, query: str, variants: list[str]) -> list[str]:
+        if self.include_original or not variants:
+            return [query, *variants]
+        return variants
+
+    def generate_queries(self, query: str) -> list[str]:
+        variants = self._cached_variants(query)
+        if variants is None:
+            chain = self.query_prompt | self.llm | StrOutputParser()
+            text = chain.invoke({"question": query})
+            variants = [v.strip() for v in text.split("\n") if v.strip()]
+            self._cache_variants(query, variants)
+        return self._with_original(query, variants)
+
+    async def agenerate_queries(self, query: str) -> AsyncIterator[str]:
+        """
+        Yield the query variants, each one as soon as its line is complete
+        in the llm output, so retrieval can start before generation ends.
+        """
+        if self.include_original:
+            yield query
+
+        variants = self._cached_variants(query)
+        if variants is not None:
+            for variant in variants:
+                yield variant
+            if not variants and not self.include_original:
+                yield query
+            return
+
+        variants = []
+        buffer = ""
+        chain = self.query_prompt | self.llm | StrOutputParser()
+        async for piece in chain.astream({"question": query}):
+            buffer += piece
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if line.strip():
+                    variants.append(line.strip())
+                    yield variants[-1]
+        if buffer.strip():
+            variants.append(buffer.strip())
+            yield variants[-1]
+        self._cache_variants(query, variants)
+        if not variants and not self.include_original:
+            yield query
+
     def retrieve(self, text: str) -> list[Document]:
         return self.invoke(text)
 
@@ -100,8 +196,10 @@ class MultiStepsRetriever(BaseRetriever):
         *,
         run_manager: CallbackManagerForRetrieverRun,
     ) -> list[Document]:
-        if self._think_mode and self.multi_query is not None:
-            docs = list(self.multi_query.invoke(query))
+        if self._think_mode:
+            docs = self.base_retriever.retrieve_many(
+                self.generate_queries(query)
+            )
         else:
             docs = list(self.base_retriever.invoke(query))
 
@@ -125,10 +223,19 @@ class MultiStepsRetriever(BaseRetriever):
         *,
         run_manager: AsyncCallbackManagerForRetrieverRun,
     ) -> list[Document]:
-        if self._think_mode and self.multi_query is not None:
-            docs = list(await self.multi_query.ainvoke(query))
+        stages = StageBudget(self.stage_budgets)
+        variants = self._cached_variants(query) if self._think_mode else None
+        if variants is not None:
+            # all known up front: one embedding call and one search
+            docs = await self.base_retriever.aretrieve_many(
+                self._with_original(query, variants), stages=stages
+            )
+        elif self._think_mode:
+            docs = await self.base_retriever.aretrieve_stream(
+                self.agenerate_queries(query), stages=stages
+            )
         else:
-            docs = list(await self.base_retriever.ainvoke(query))
+            docs = await self.base_retriever.aretrieve(query, stages=stages)
 
         if self.extractor is not None:
             docs = list(
@@ -137,12 +244,21 @@ class MultiStepsRetriever(BaseRetriever):
 
         if self.reranker is not None:
             docs = list(
-                await self.reranker.acompress_documents(docs, query=query)
+                await stages.run(
+                    "rerank",
+                    self.reranker.acompress_documents(docs, query=query),
+                    fallback=docs[: self.reranker.top_n],
+                )
             )
 
         if self.summarizer_llm:
-            docs = await self._async_summarize_if_needed(docs)
+            docs = await stages.run(
+                "summarize",
+                self._async_summarize_if_needed(docs),
+                fallback=docs,
+            )
 
+        logger.debug("Stage timings (ms) for %r: %s", query, stages.timings)
         return docs
 
     def _summarize_if_needed(self, docs: list[Document]) -> list[Document]:
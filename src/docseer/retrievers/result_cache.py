@@ -0,0 +1,121 @@
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain_core.documents import Document
+from langchain_core.stores import ByteStore, InMemoryByteStore
+
+ALL_DOCUMENTS = "_all"
+
+
+class IndexVersions:
+    """
+    Per-document index version tokens.
+
+    Every write to a document's chunks stores a fresh random token for it
+    (and for ``ALL_DOCUMENTS``), so cache keys built from the tokens change
+    only for the papers that were actually touched.  Use a shared
+    ``ByteStore`` (``LocalFileStore`` on the docstore volume, ``RedisStore``)
+    so bumps made by ingest workers are seen by the API.
+    """
+
+    def __init__(self, store: ByteStore | None = None):
+        self.store = store if store is not None else InMemoryByteStore()
+
+    def get(self, document_ids: list[str]) -> list[str]:
+        values = self.store.mget(document_ids)
+        return [v.decode() if v is not None else "0" for v in values]
+
+    def bump(self, document_id: str) -> None:
+        token = uuid.uuid4().hex.encode()
+        self.store.mset([(document_id, token), (ALL_DOCUMENTS, token)])
+
+
+def _dump(docs: list[Document]) -> bytes:
+    return json.dumps(
+        [[d.id, d.page_content, d.metadata] for d in docs]
+    ).encode("utf-8")
+
+
+def _load(value: bytes) -> list[Document]:
+    return [
+        Document(page_content=content, metadata=metadata, id=doc_id)
+        for doc_id, content, metadata in json.loads(value)
+    ]
+
+
+class RetrievalCache:
+    """
+    In-process LRU + TTL cache of retrieval results.
+
+    Keys hash the query, sorted paper ids, topk, embedding model and the
+    index versions of the papers searched, so an ingest invalidates only the
+    entries over the papers it touched.  An optional ``ByteStore`` (e.g.
+    ``RedisStore`` with a TTL) is a second tier shared by API workers.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: float = 600.0,
+        store: ByteStore | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        text: str,
+        paper_ids: list[str] | None,
+        topk: int,
+        model_name: str,
+        versions: list[str],
+        per_paper_quota: int | None = None,
+    ) -> str:
+        payload = json.dumps(
+            [
+                text,
+                sorted(paper_ids or []),
+                topk,
+                model_name,
+                versions,
+                per_paper_quota,
+            ]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, created: float, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (created, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> list[Document] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.time() - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    return _load(entry[1])
+                del self._entries[key]
+
+        if self.store is None:
+            return None
+        (value,) = self.store.mget([key])
+        if value is None:
+            return None
+        self._remember(key, time.time(), value)
+        return _load(value)
+
+    def set(self, key: str, docs: list[Document]) -> None:
+        value = _dump(docs)
+        self._remember(key, time.time(), value)
+        if self.store is not None:
+            self.store.mset([(key, value)])
@@ -1,6 +1,16 @@
 import asyncio
 import collections.abc
-from typing import Any, Optional
+import itertools
+import logging
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Iterable,
+    Optional,
+)
 from pydantic import ConfigDict, Field
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
@@ -9,6 +19,13 @@ from langchain_core.callbacks import (
     CallbackManagerForRetrieverRun,
 )
 
+from ..databases.parent_cache import ParentCache
+from .deadlines import StageBudget
+from .mmr import mmr
+from .result_cache import ALL_DOCUMENTS, RetrievalCache
+
+logger = logging.getLogger(__name__)
+
 
 class Retriever(BaseRetriever):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -16,6 +33,31 @@ class Retriever(BaseRetriever):
     vector_db: Any = Field(...)
     docstore: Optional[Any] = Field(None)
     topk: int = 5
+    # drop chunks farther than max_distance from the query, or whose
+    # distance exceeds the best hit's by more than relative_gap (0.25 = 25%)
+    max_distance: Optional[float] = None
+    relative_gap: Optional[float] = None
+    # absolute floor of that gap, so an exact match (distance 0) does not
+    # drop every other hit
+    min_gap: float = 0.05
+    # optional BM25Index; lexical and dense hits are merged with reciprocal
+    # rank fusion, rrf_k damping the weight of the top ranks
+    lexical_index: Optional[Any] = Field(None)
+    rrf_k: int = 60
+    # RetrievalCache in front of aretrieve, keyed on IndexVersions tokens
+    # that every write below bumps for the document it touched
+    result_cache: Optional[Any] = Field(None)
+    index_versions: Optional[Any] = Field(None)
+    # maximal marginal relevance over a pool of mmr_fetch_k dense hits;
+    # 1.0 is pure relevance, lower values favour diversity (None disables)
+    mmr_lambda: Optional[float] = None
+    mmr_fetch_k: int = 20
+    # query variants searched at once by aretrieve_many
+    fanout_concurrency: int = 4
+    # two-stage retrieval: pick the paper_fetch_n closest papers from the
+    # paper-level index, then search chunks of those papers only (None
+    # disables; scopes of at most paper_fetch_n papers are searched as is)
+    paper_fetch_n: Optional[int] = None
 
     def populate(
         self,
@@ -23,8 +65,17 @@ class Retriever(BaseRetriever):
         metadata: dict[str, str],
         parent_ids: list[str] | None,
         parent_chunks: list[Document] | None,
+        title: str | None = None,
+        abstract: str | None = None,
     ) -> None:
         self.vector_db.add(chunks, metadata)
+        if self.lexical_index is not None:
+            self.lexical_index.add(chunks, metadata)
+        if "document_id" in metadata:
+            self.vector_db.update_paper(
+                metadata["document_id"], title, abstract
+            )
+        self._bump_version(metadata)
 
         if not (
             self.docstore is None
@@ -39,12 +90,24 @@ class Retriever(BaseRetriever):
         metadata: dict[str, str],
         parent_ids: list[str] | None,
         parent_chunks: list[Document] | None,
-        progress_callback: collections.abc.Callable[[int, int], None]
+        progress_callback: collections.abc.Callable[[int, int, float], None]
         | None = None,
+        title: str | None = None,
+        abstract: str | None = None,
     ) -> None:
         await self.vector_db.aadd(
             chunks, metadata, progress_callback=progress_callback
         )
+        if self.lexical_index is not None:
+            await asyncio.to_thread(self.lexical_index.add, chunks, metadata)
+        if "document_id" in metadata:
+            await asyncio.to_thread(
+                self.vector_db.update_paper,
+                metadata["document_id"],
+                title,
+                abstract,
+            )
+        await asyncio.to_thread(self._bump_version, metadata)
 
         if not (
             self.docstore is None
@@ -55,11 +118,207 @@ class Retriever(BaseRetriever):
                 self.docstore.add, parent_ids, parent_chunks
             )
 
+    async def aupdate_document(
+        self,
+        document_id: str,
+        chunks: list[Document],
+        metadata: dict[str, str],
+        parent_ids: list[str] | None,
+        parent_chunks: list[Document] | None,
+        progress_callback: collections.abc.Callable[[int, int, float], None]
+        | None = None,
+        title: str | None = None,
+        abstract: str | None = None,
+    ) -> dict[str, int]:
+        """
+        Incremental re-ingest: diff the (content-addressed) chunk ids against
+        what is stored for *document_id*, write only new chunks / parents,
+        then delete the vanished ones.  The document stays queryable
+        throughout instead of being purged first.  The paper-level vectors
+        are rebuilt from the stored chunk embeddings, *title* and *abstract*.
+        """
+        stored_ids = set(
+            await asyncio.to_thread(self.vector_db.get_ids, document_id)
+        )
+        new_chunks = [c for c in chunks if c.id not in stored_ids]
+        stale_ids = stored_ids - {c.id for c in chunks}
+
+        stale_parents: list[str] = []
+        if not (
+            self.docstore is None
+            or parent_ids is None
+            or parent_chunks is None
+        ):
+            stored_parents = set(
+                await asyncio.to_thread(self.docstore.keys, document_id)
+            )
+            new_parents = [
+                (p_id, p)
+                for p_id, p in zip(parent_ids, parent_chunks)
+                if p_id not in stored_parents
+            ]
+            if new_parents:
+                await asyncio.to_thread(
+                    self.docstore.add,
+                    [p_id for p_id, _ in new_parents],
+                    [p for _, p in new_parents],
+                )
+            stale_parents = list(stored_parents - set(parent_ids))
+
+        await self.vector_db.aadd(
+            new_chunks, metadata, progress_callback=progress_callback
+        )
+        await self._afinish_update(
+            document_id,
+            metadata,
+            new_chunks,
+            stale_ids,
+            stale_parents,
+            title,
+            abstract,
+            changed=bool(new_chunks or stale_ids),
+        )
+        return {
+            "added": len(new_chunks),
+            "deleted": len(stale_ids),
+            "unchanged": len(chunks) - len(new_chunks),
+        }
+
+    async def aupdate_document_stream(
+        self,
+        document_id: str,
+        sections: AsyncIterable[tuple[Document, list[Document]]],
+        metadata: dict[str, str],
+        progress_callback: collections.abc.Callable[[int, int, float], None]
+        | None = None,
+        title: str | None = None,
+        abstract: str | None = None,
+        parent_batch_size: int = 16,
+    ) -> dict[str, int]:
+        """
+        ``aupdate_document`` fed section by section, e.g. from
+        ``ParentChildChunker.achunk_stream``: new child chunks are embedded
+        while later sections are still being split, and new parents and
+        lexical entries are written every *parent_batch_size* sections
+        along the way, so only the ids of the document are kept throughout.
+        """
+        docstore = self.docstore
+        lexical_index = self.lexical_index
+        stored_ids = set(
+            await asyncio.to_thread(self.vector_db.get_ids, document_id)
+        )
+        stored_parents: set[str] = set()
+        if docstore is not None:
+            stored_parents = set(
+                await asyncio.to_thread(docstore.keys, document_id)
+            )
+
+        seen_ids: set[str] = set()
+        seen_parents: set[str] = set()
+        pending_parents: list[Document] = []
+        pending_chunks: list[Document] = []
+        sections_since_flush = 0
+        added = 0
+
+        async def _flush() -> None:
+            if pending_parents and docstore is not None:
+                await asyncio.to_thread(
+                    docstore.add,
+                    [p.id for p in pending_parents],
+                    list(pending_parents),
+                )
+            if pending_chunks and lexical_index is not None:
+                await asyncio.to_thread(
+                    lexical_index.add, list(pending_chunks), metadata
+                )
+            pending_parents.clear()
+            pending_chunks.clear()
+
+        async def _new_chunks() -> AsyncIterator[Document]:
+            nonlocal added, sections_since_flush
+            async for parent, children in sections:
+                # the chunker gives every section and chunk a content id
+                assert parent.id is not None
+                seen_parents.add(parent.id)
+                if docstore is not None and parent.id not in stored_parents:
+                    pending_parents.append(parent)
+                for child in children:
+                    assert child.id is not None
+                    seen_ids.add(child.id)
+                    if child.id in stored_ids:
+                        continue
+                    added += 1
+                    if lexical_index is not None:
+                        pending_chunks.append(child)
+                    yield child
+                sections_since_flush += 1
+                if sections_since_flush >= parent_batch_size:
+                    sections_since_flush = 0
+                    await _flush()
+            await _flush()
+
+        await self.vector_db.aadd(
+            _new_chunks(), metadata, progress_callback=progress_callback
+        )
+        stale_ids = stored_ids - seen_ids
+        await self._afinish_update(
+            document_id,
+            metadata,
+            [],
+            stale_ids,
+            list(stored_parents - seen_parents),
+            title,
+            abstract,
+            changed=bool(added or stale_ids),
+        )
+        return {
+            "added": added,
+            "deleted": len(stale_ids),
+            "unchanged": len(seen_ids) - added,
+        }
+
+    async def _afinish_update(
+        self,
+        document_id: str,
+        metadata: dict[str, str],
+        new_chunks: list[Document],
+        stale_ids: set[str],
+        stale_parents: list[str],
+        title: str | None,
+        abstract: str | None,
+        changed: bool,
+    ) -> None:
+        """Drop what vanished, index the lexical side, refresh the paper."""
+        await asyncio.to_thread(self.vector_db.delete_ids, list(stale_ids))
+        if self.lexical_index is not None:
+            await asyncio.to_thread(
+                self.lexical_index.add, new_chunks, metadata
+            )
+            await asyncio.to_thread(
+                self.lexical_index.delete_ids, list(stale_ids)
+            )
+        if stale_parents and self.docstore is not None:
+            await asyncio.to_thread(self.docstore.delete_ids, stale_parents)
+        await asyncio.to_thread(
+            self.vector_db.update_paper, document_id, title, abstract
+        )
+        if changed:
+            await asyncio.to_thread(
+                self._bump_version, {"document_id": document_id}
+            )
+
     def delete_document(self, document_id: str):
         self.vector_db.delete(document_id)
+        if self.lexical_index is not None:
+            self.lexical_index.delete(document_id)
+        self._bump_version({"document_id": document_id})
         if self.docstore is not None and not self.docstore.is_empty:
             self.docstore.delete(document_id)
 
+    def _bump_version(self, metadata: dict[str, str]) -> None:
+        if self.index_versions is not None and "document_id" in metadata:
+            self.index_versions.bump(metadata["document_id"])
+
     def retrieve(self, text: str) -> list[Document]:
         return self.invoke(text)
 
@@ -69,59 +328,547 @@ class Retriever(BaseRetriever):
         *,
         run_manager: CallbackManagerForRetrieverRun,
     ) -> list[Document]:
-        chunks: list[Document] = self.vector_db.query(query, self.topk)
-        if self.docstore is not None and not self.docstore.is_empty:
-            parent_ids = [
-                p_id
-                for p_id in {
-                    doc.metadata.get("parent_id", None) for doc in chunks
-                }
-                if p_id is not None
-            ]
-            if not parent_ids:
-                return chunks
-            context = self.docstore.get(parent_ids)
-            chunks = [
-                Document(page_content=c, metadata=doc.metadata)
-                for (c, doc) in zip(context, chunks)
-            ]
+        chunks: list[Document] = self._query(query, self.topk)
+        return self._expand_parents(chunks)
 
-        return chunks
+    def _expand_parents(self, chunks: list[Document]) -> list[Document]:
+        if self.docstore is None or self.docstore.is_empty:
+            return chunks
+        parent_ids = _parent_ids(chunks)
+        if not parent_ids:
+            return chunks
+        parents = self.docstore.mget(parent_ids)
+        return _merge_parents(chunks, dict(zip(parent_ids, parents)))
 
     async def aretrieve(
         self,
         text: str,
         paper_ids: list[str] | None = None,
         topk: int | None = None,
+        stages: StageBudget | None = None,
+        per_paper_quota: int | None = None,
     ) -> list[Document]:
-        if paper_ids is not None:
-            return await self._fetch(text, paper_ids, topk=topk)
-        return await self.ainvoke(text)
+        """
+        Retrieve the context for *text*.  *stages* holds the per-stage
+        deadlines and collects the time spent in each stage; results of a
+        degraded (timed out / failed) stage are returned but not cached.
+
+        With *per_paper_quota* and several *paper_ids*, every paper is
+        searched on its own for up to that many chunks and the hits are
+        merged round-robin within the *topk* budget, so no single paper
+        takes every slot.
+        """
+        stages = stages if stages is not None else StageBudget()
+        if per_paper_quota is None or paper_ids is None or len(paper_ids) < 2:
+            per_paper_quota = None
+        cache = self.result_cache
+        if cache is None:
+            return await self._aretrieve(
+                text, paper_ids, topk, stages, per_paper_quota
+            )
+
+        # index versions and the shared (Redis) tier are blocking I/O
+        key, docs = await asyncio.to_thread(
+            self._cached, cache, text, paper_ids, topk, per_paper_quota
+        )
+        if docs is None:
+            docs = await self._aretrieve(
+                text, paper_ids, topk, stages, per_paper_quota
+            )
+            if not stages.degraded:
+                await asyncio.to_thread(cache.set, key, docs)
+        return docs
+
+    async def _aretrieve(
+        self,
+        text: str,
+        paper_ids: list[str] | None,
+        topk: int | None,
+        stages: StageBudget,
+        per_paper_quota: int | None = None,
+    ) -> list[Document]:
+        if paper_ids is None:
+            # the whole library is searched with self.topk, see _cache_key
+            topk = None
+        elif per_paper_quota is not None:
+            return await self._fetch_per_paper(
+                text, paper_ids, topk, per_paper_quota, stages
+            )
+        return await self._fetch(text, paper_ids, topk, stages)
+
+    def _cached(
+        self,
+        cache,
+        text: str,
+        paper_ids: list[str] | None,
+        topk: int | None,
+        per_paper_quota: int | None = None,
+    ) -> tuple[str, list[Document] | None]:
+        key = self._cache_key(text, paper_ids, topk, per_paper_quota)
+        return key, cache.get(key)
+
+    def _cache_key(
+        self,
+        text: str,
+        paper_ids: list[str] | None,
+        topk: int | None,
+        per_paper_quota: int | None = None,
+    ) -> str:
+        if paper_ids is None or topk is None:
+            topk = self.topk
+        versions: list[str] = []
+        if self.index_versions is not None:
+            versions = self.index_versions.get(
+                sorted(paper_ids) if paper_ids is not None else [ALL_DOCUMENTS]
+            )
+        return RetrievalCache.key(
+            text,
+            paper_ids,
+            topk,
+            self.vector_db.model_name,
+            versions,
+            per_paper_quota,
+        )
+
+    def retrieve_many(
+        self,
+        texts: Iterable[str],
+        paper_ids: list[str] | None = None,
+        topk: int | None = None,
+    ) -> list[Document]:
+        k = topk if topk is not None else self.topk
+        queries = list(dict.fromkeys(texts))
+        if not self._batchable(paper_ids):
+            results = [self._query(text, k, paper_ids) for text in queries]
+        else:
+            dense = self.vector_db.query_each(queries, k, paper_ids)
+            results = [
+                self._with_lexical(
+                    text, k, paper_ids, self._apply_cutoff(hits)
+                )
+                for text, hits in zip(queries, dense)
+            ]
+        return self._expand_parents(self._fuse(results, k))
+
+    async def aretrieve_many(
+        self,
+        texts: Iterable[str],
+        paper_ids: list[str] | None = None,
+        topk: int | None = None,
+        stages: StageBudget | None = None,
+    ) -> list[Document]:
+        """
+        Search every query in *texts* and merge the hits by chunk id with
+        reciprocal rank fusion, keeping the *topk* best.  The queries are
+        embedded in one call and searched in one Chroma request when
+        possible, else at most ``fanout_concurrency`` at a time.
+        """
+        k = topk if topk is not None else self.topk
+        stages = stages if stages is not None else StageBudget()
+        queries = list(dict.fromkeys(texts))
+        if not self._batchable(paper_ids):
+            semaphore = asyncio.Semaphore(self.fanout_concurrency)
+
+            async def _search(text: str) -> list[Document]:
+                async with semaphore:
+                    return await self._aquery(text, k, paper_ids, stages)
+
+            results = await asyncio.gather(*map(_search, queries))
+            return await self._aexpand_parents(self._fuse(results, k), stages)
+
+        dense = asyncio.ensure_future(
+            self._adense_each(queries, k, paper_ids, stages)
+        )
+
+        async def _dense(i: int) -> list[Document]:
+            return (await dense)[i]
+
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._awith_lexical(text, k, paper_ids, stages, _dense(i))
+                    for i, text in enumerate(queries)
+                )
+            )
+        finally:
+            dense.cancel()
+        return await self._aexpand_parents(self._fuse(results, k), stages)
+
+    async def aretrieve_stream(
+        self,
+        texts: AsyncIterable[str],
+        paper_ids: list[str] | None = None,
+        topk: int | None = None,
+        stages: StageBudget | None = None,
+    ) -> list[Document]:
+        """
+        ``aretrieve_many`` over queries that are still being generated:
+        each one is searched as soon as it is produced.
+        """
+        k = topk if topk is not None else self.topk
+        stages = stages if stages is not None else StageBudget()
+        semaphore = asyncio.Semaphore(self.fanout_concurrency)
+
+        async def _search(text: str) -> list[Document]:
+            async with semaphore:
+                return await self._aquery(text, k, paper_ids, stages)
+
+        tasks: dict[str, asyncio.Task] = {}
+        try:
+            async for text in texts:
+                if text not in tasks:
+                    tasks[text] = asyncio.create_task(_search(text))
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return await self._aexpand_parents(self._fuse(results, k), stages)
+
+    def _fuse(self, results: list[list[Document]], k: int) -> list[Document]:
+        """The *k* best chunks of all *results* by reciprocal rank fusion."""
+        by_id: dict[str | None, Document] = {}
+        for docs in results:
+            for doc in docs:
+                by_id.setdefault(doc.id, doc)
+        ranked = self._rrf(
+            *[[doc.id for doc in docs] for docs in results], k=k
+        )
+        return [by_id[i] for i in ranked]
 
     async def _fetch(
-        self, text: str, paper_ids: list[str], topk: int | None = None
+        self,
+        text: str,
+        paper_ids: list[str] | None,
+        topk: int | None = None,
+        stages: StageBudget | None = None,
     ) -> list[Document]:
         k = topk if topk is not None else self.topk
-        chunks: list[Document] = await self.vector_db.aquery(
-            text, k, paper_ids=paper_ids
+        stages = stages if stages is not None else StageBudget()
+        chunks = await self._aquery(text, k, paper_ids, stages)
+        return await self._aexpand_parents(chunks, stages)
+
+    async def _fetch_per_paper(
+        self,
+        text: str,
+        paper_ids: list[str],
+        topk: int | None,
+        quota: int,
+        stages: StageBudget,
+    ) -> list[Document]:
+        k = topk if topk is not None else self.topk
+        embedding = await stages.run(
+            "embed", self.vector_db.aembed_query(text)
         )
-        if self.docstore is not None and not self.docstore.is_empty:
-            parent_ids = [
-                p_id
-                for p_id in {
-                    doc.metadata.get("parent_id", None) for doc in chunks
-                }
-                if p_id is not None
-            ]
-            if parent_ids:
-                context = await asyncio.to_thread(
-                    self.docstore.get, parent_ids
+        semaphore = asyncio.Semaphore(self.fanout_concurrency)
+
+        async def _search(paper_id: str) -> list[Document]:
+            async with semaphore:
+                return await self._aquery(
+                    text, quota, [paper_id], stages, embedding=embedding
+                )
+
+        searches = await asyncio.gather(
+            *map(_search, paper_ids), return_exceptions=True
+        )
+        results: list[list[Document]] = []
+        errors: list[Exception] = []
+        for paper_id, result in zip(paper_ids, searches):
+            if isinstance(result, Exception):
+                # the other papers still answer; not cached as degraded
+                logger.warning(
+                    "Search of paper %s failed: %s", paper_id, result
+                )
+                stages.degraded["search"] = "error"
+                errors.append(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                results.append(result)
+        if errors and not results:
+            raise errors[0]
+        # papers whose best chunk is closest come first in every round
+        results.sort(key=_best_distance)
+        chunks = interleave_papers([doc for docs in results for doc in docs])
+        return await self._aexpand_parents(chunks[:k], stages)
+
+    def _batchable(self, paper_ids: list[str] | None) -> bool:
+        # MMR needs each query's chunk embeddings and the paper stage picks
+        # papers per query: both search the queries one by one
+        return self.mmr_lambda is None and not self._paper_stage(paper_ids)
+
+    def _query(
+        self, text: str, k: int, paper_ids: list[str] | None = None
+    ) -> list[Document]:
+        return self._with_lexical(
+            text, k, paper_ids, self._dense(text, k, paper_ids)
+        )
+
+    def _with_lexical(
+        self,
+        text: str,
+        k: int,
+        paper_ids: list[str] | None,
+        chunks: list[Document],
+    ) -> list[Document]:
+        """The dense *chunks* of *text* fused with its BM25 hits."""
+        if self.lexical_index is None:
+            return chunks
+        lexical = self.lexical_index.search(text, k, paper_ids)
+        ranked = self._rrf(
+            [doc.id for doc in chunks], [i for i, _ in lexical], k=k
+        )
+        by_id = {doc.id: doc for doc in chunks}
+        missing = [i for i in ranked if i not in by_id]
+        if missing:
+            by_id |= {
+                doc.id: doc for doc in self.vector_db.get_documents(missing)
+            }
+        return [by_id[i] for i in ranked if i in by_id]
+
+    async def _aquery(
+        self,
+        text: str,
+        k: int,
+        paper_ids: list[str] | None = None,
+        stages: StageBudget | None = None,
+        embedding: list[float] | None = None,
+    ) -> list[Document]:
+        stages = stages if stages is not None else StageBudget()
+        return await self._awith_lexical(
+            text,
+            k,
+            paper_ids,
+            stages,
+            self._adense(text, k, paper_ids, stages, embedding),
+        )
+
+    async def _awith_lexical(
+        self,
+        text: str,
+        k: int,
+        paper_ids: list[str] | None,
+        stages: StageBudget,
+        dense: Awaitable[list[Document]],
+    ) -> list[Document]:
+        """Async ``_with_lexical``, searching BM25 while *dense* runs."""
+        if self.lexical_index is None:
+            return await dense
+
+        chunks, lexical = await asyncio.gather(
+            dense,
+            # a late or failed BM25 search leaves the dense hits
+            stages.run(
+                "lexical",
+                asyncio.to_thread(
+                    self.lexical_index.search, text, k, paper_ids
+                ),
+                fallback=[],
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(lexical, BaseException):
+            raise lexical
+        if isinstance(chunks, BaseException):
+            if not isinstance(chunks, Exception) or not lexical:
+                raise chunks
+            # the dense stages ran out of budget: keep the lexical hits
+            chunks = []
+        ranked = self._rrf(
+            [doc.id for doc in chunks], [i for i, _ in lexical], k=k
+        )
+        by_id = {doc.id: doc for doc in chunks}
+        missing = [i for i in ranked if i not in by_id]
+        if missing:
+            lexical_only = await stages.run(
+                "lexical",
+                asyncio.to_thread(self.vector_db.get_documents, missing),
+                fallback=[],
+            )
+            by_id |= {doc.id: doc for doc in lexical_only}
+        return [by_id[i] for i in ranked if i in by_id]
+
+    def _dense(
+        self, text: str, k: int, paper_ids: list[str] | None = None
+    ) -> list[Document]:
+        embedding = None
+        if self._paper_stage(paper_ids):
+            embedding = self.vector_db.embed_query(text)
+            paper_ids = (
+                self.vector_db.query_papers(
+                    embedding, self.paper_fetch_n, paper_ids
                 )
-                chunks = [
-                    Document(page_content=c, metadata=doc.metadata)
-                    for c, doc in zip(context, chunks)
-                ]
-        return chunks
+                or paper_ids
+            )
+        if self.mmr_lambda is None:
+            chunks = self.vector_db.query(
+                text, k, paper_ids=paper_ids, embedding=embedding
+            )
+            return self._apply_cutoff(chunks)
+        return self._mmr(
+            *self.vector_db.query_with_embeddings(
+                text,
+                max(k, self.mmr_fetch_k),
+                paper_ids=paper_ids,
+                embedding=embedding,
+            ),
+            k=k,
+        )
+
+    async def _adense_each(
+        self,
+        texts: list[str],
+        k: int,
+        paper_ids: list[str] | None,
+        stages: StageBudget,
+    ) -> list[list[Document]]:
+        """``_adense`` of every text, in one embedding call and one search."""
+        embeddings = await stages.run(
+            "embed", self.vector_db.aembed_queries(texts)
+        )
+        results = await stages.run(
+            "search",
+            self.vector_db.aquery_each(
+                texts, k, paper_ids=paper_ids, embeddings=embeddings
+            ),
+        )
+        return [self._apply_cutoff(chunks) for chunks in results]
+
+    def _paper_stage(self, paper_ids: list[str] | None) -> bool:
+        return self.paper_fetch_n is not None and (
+            paper_ids is None or len(paper_ids) > self.paper_fetch_n
+        )
+
+    async def _acandidate_papers(
+        self,
+        embedding: list[float],
+        paper_ids: list[str] | None,
+        stages: StageBudget,
+    ) -> list[str] | None:
+        if not self._paper_stage(paper_ids):
+            return paper_ids
+        candidates = await stages.run(
+            "papers",
+            self.vector_db.aquery_papers(
+                embedding, self.paper_fetch_n, paper_ids
+            ),
+            fallback=[],
+        )
+        # empty paper index (not built yet) or late stage: full scope
+        return candidates or paper_ids
+
+    async def _adense(
+        self,
+        text: str,
+        k: int,
+        paper_ids: list[str] | None = None,
+        stages: StageBudget | None = None,
+        embedding: list[float] | None = None,
+    ) -> list[Document]:
+        stages = stages if stages is not None else StageBudget()
+        if embedding is None:
+            embedding = await stages.run(
+                "embed", self.vector_db.aembed_query(text)
+            )
+        paper_ids = await self._acandidate_papers(embedding, paper_ids, stages)
+        if self.mmr_lambda is None:
+            chunks = await stages.run(
+                "search",
+                self.vector_db.aquery(
+                    text, k, paper_ids=paper_ids, embedding=embedding
+                ),
+            )
+            return self._apply_cutoff(chunks)
+        return self._mmr(
+            *await stages.run(
+                "search",
+                self.vector_db.aquery_with_embeddings(
+                    text,
+                    max(k, self.mmr_fetch_k),
+                    paper_ids=paper_ids,
+                    embedding=embedding,
+                ),
+            ),
+            k=k,
+        )
+
+    def _mmr(
+        self,
+        query_embeds: list[float],
+        chunks: list[Document],
+        embeds: list,
+        k: int,
+    ) -> list[Document]:
+        kept = {id(doc) for doc in self._apply_cutoff(chunks)}
+        pool = [(doc, e) for doc, e in zip(chunks, embeds) if id(doc) in kept]
+        order = mmr(
+            query_embeds,
+            [e for _, e in pool],
+            k,
+            lambda_mult=self.mmr_lambda or 0.0,
+        )
+        return [pool[i][0] for i in order]
+
+    def _rrf(
+        self, *rankings: list[str | None], k: int | None = None
+    ) -> list[str | None]:
+        """Reciprocal rank fusion of ranked lists of chunk ids."""
+        scores: dict[str | None, float] = defaultdict(float)
+        for ranking in rankings:
+            for rank, chunk_id in enumerate(ranking):
+                scores[chunk_id] += 1 / (self.rrf_k + rank + 1)
+        return sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+
+    def _apply_cutoff(self, chunks: list[Document]) -> list[Document]:
+        if self.max_distance is None and self.relative_gap is None:
+            return chunks
+        distances = [doc.metadata.get("distance") for doc in chunks]
+        known = [d for d in distances if d is not None]
+        if not known:
+            return chunks
+
+        limit = float("inf")
+        if self.max_distance is not None:
+            limit = self.max_distance
+        if self.relative_gap is not None:
+            best = min(known)
+            gap = max(best * self.relative_gap, self.min_gap)
+            limit = min(limit, best + gap)
+        return [
+            doc for doc, d in zip(chunks, distances) if d is None or d <= limit
+        ]
+
+    async def _aexpand_parents(
+        self, chunks: list[Document], stages: StageBudget | None = None
+    ) -> list[Document]:
+        if stages is None:
+            return await self._aload_parents(chunks)
+        # out of budget: answer from the child chunks already retrieved
+        return await stages.run(
+            "expand", self._aload_parents(chunks), fallback=chunks
+        )
+
+    async def _aload_parents(self, chunks: list[Document]) -> list[Document]:
+        if self.docstore is None:
+            return chunks
+        parent_ids = _parent_ids(chunks)
+        if not parent_ids:
+            return chunks
+        # parents held in memory are merged on the loop; only the misses
+        # (and the docstore's own is_empty check) go to a thread
+        parents: dict[str, str | None] = {}
+        if isinstance(self.docstore, ParentCache):
+            parents.update(self.docstore.cached(parent_ids))
+        missing = [key for key in parent_ids if key not in parents]
+        if missing:
+            loaded = await asyncio.to_thread(self._mget_parents, missing)
+            parents.update(zip(missing, loaded))
+        return _merge_parents(chunks, parents)
+
+    def _mget_parents(self, ids: list[str]) -> list[str | None]:
+        if self.docstore is None or self.docstore.is_empty:
+            return [None] * len(ids)
+        return self.docstore.mget(ids)
 
     async def _aget_relevant_documents(
         self,
@@ -129,21 +876,87 @@ class Retriever(BaseRetriever):
         *,
         run_manager: AsyncCallbackManagerForRetrieverRun,
     ) -> list[Document]:
-        chunks: list[Document] = await self.vector_db.aquery(query, self.topk)
-        if self.docstore is not None and not self.docstore.is_empty:
-            parent_ids = [
-                p_id
-                for p_id in {
-                    doc.metadata.get("parent_id", None) for doc in chunks
-                }
-                if p_id is not None
-            ]
-            if not parent_ids:
-                return chunks
-            context = await asyncio.to_thread(self.docstore.get, parent_ids)
-            chunks = [
-                Document(page_content=c, metadata=doc.metadata)
-                for (c, doc) in zip(context, chunks)
-            ]
+        chunks = await self._aquery(query, self.topk)
+        return await self._aexpand_parents(chunks)
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count of *text* (~4 characters per token)."""
+    return len(text) // 4
+
+
+def doc_tokens(doc: Document) -> int:
+    """Token count recorded by the chunker, estimated when there is none."""
+    tokens = doc.metadata.get("tokens")
+    return tokens if tokens is not None else approx_tokens(doc.page_content)
+
+
+def _parent_ids(chunks: list[Document]) -> list[str]:
+    """Distinct parent ids of *chunks*, in rank order."""
+    return list(
+        dict.fromkeys(
+            doc.metadata["parent_id"]
+            for doc in chunks
+            if doc.metadata.get("parent_id") is not None
+        )
+    )
+
+
+def _merge_parents(
+    chunks: list[Document], parents: dict[str, str | None]
+) -> list[Document]:
+    """
+    Replace child *chunks* by their parent sections.  Each parent appears
+    once, at the rank of its best child, whose metadata it keeps; ``hits``
+    counts the children it stands for.  A child without a parent, or whose
+    parent is missing from the docstore, is kept as it is.
+    """
+    merged: dict[str, Document] = {}
+    expanded: list[Document] = []
+    for doc in chunks:
+        parent_id = doc.metadata.get("parent_id")
+        content = parents.get(parent_id) if parent_id is not None else None
+        if parent_id is None or content is None:
+            expanded.append(doc)
+        elif parent_id in merged:
+            merged[parent_id].metadata["hits"] += 1
+        else:
+            metadata = {**doc.metadata, "hits": 1}
+            # the child's own count does not describe the parent
+            metadata.pop("tokens", None)
+            if "parent_tokens" in metadata:
+                metadata["tokens"] = metadata["parent_tokens"]
+            merged[parent_id] = Document(
+                page_content=content, metadata=metadata, id=parent_id
+            )
+            expanded.append(merged[parent_id])
+    logger.debug(
+        "Expanded %d chunks into %d context blocks (~%d tokens)",
+        len(chunks),
+        len(expanded),
+        sum(doc_tokens(doc) for doc in expanded),
+    )
+    return expanded
+
+
+def interleave_papers(docs: list[Document]) -> list[Document]:
+    """
+    Round-robin *docs* over their papers: the first chunk of every paper (in
+    order of first appearance), then the second of every paper, and so on.
+    Chunk order within a paper is kept.
+    """
+    by_paper: dict[str | None, list[Document]] = defaultdict(list)
+    for doc in docs:
+        by_paper[doc.metadata.get("document_id")].append(doc)
+    return [
+        doc
+        for hits in itertools.zip_longest(*by_paper.values())
+        for doc in hits
+        if doc is not None
+    ]
+
 
-        return chunks
+def _best_distance(docs: list[Document]) -> float:
+    distances = [d.metadata.get("distance") for d in docs]
+    known = [d for d in distances if d is not None]
+    return min(known, default=float("inf"))
@@ -354,6 +354,8 @@ class ChatbotWidget(Static):
         self._response_buffer = ""
         self._flush_task: asyncio.Task[None] | None = None
         self._pending_macro: tuple[str, str] | None = None
+        # per-paper retrieval limits from GET /settings/chat, fetched once
+        self._chat_limits: tuple[int | None, int] | None = None
 
     def compose(self) -> ComposeResult:
         with Vertical(id="chat-container"):
@@ -716,6 +718,31 @@ class ChatbotWidget(Static):
         if self.agent_worker and not self.agent_worker.is_finished:
             self.agent_worker.cancel()
 
+    async def _per_paper_quota(
+        self, paper_ids: list[str] | None
+    ) -> int | None:
+        """
+        Chunks to search per paper, so each of a few selected papers is
+        represented in the answer.  The limits are the server's; while they
+        cannot be read, one search over all papers is used.
+        """
+        if not paper_ids or len(paper_ids) < 2:
+            return None
+        if self._chat_limits is None:
+            try:
+                resp = await self._requester.request(
+                    method="GET", url=f"{API_URL}/settings/chat", stream=False
+                )
+                limits = resp.json()
+                self._chat_limits = (
+                    limits["per_paper_quota"],
+                    limits["per_paper_max_papers"],
+                )
+            except Exception:
+                return None
+        quota, max_papers = self._chat_limits
+        return quota if len(paper_ids) <= max_papers else None
+
     async def _stream(self, prompt: str) -> None:
         self._bot_bubble = BotChatMessage()
         self._response_buffer = ""
@@ -744,6 +771,7 @@ class ChatbotWidget(Static):
                     "query": prompt,
                     "think_mode": self.think_mode,
                     "paper_ids": paper_ids,
+                    "per_paper_quota": await self._per_paper_quota(paper_ids),
                 },
             ) as response:
                 async for raw_line in response.aiter_lines():
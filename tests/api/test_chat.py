@@ -32,6 +32,219 @@ async def test_stream_response_content(async_client):
     assert response_text == "Hello world."
 
 
+async def test_stream_reports_kept_context_chunks(
+    async_client, mock_retriever
+):
+    from langchain_core.documents import Document
+
+    mock_retriever.aretrieve.return_value = [
+        Document(page_content="relevant", metadata={"distance": 0.2})
+    ]
+    resp = await async_client.post(
+        "/chat/stream",
+        json={"query": "What is RAG?", "think_mode": False, "topk": 5},
+    )
+    events = _parse_sse(resp.text)
+    meta = [e for e in events if e.get("content") == "context-chunks"]
+    assert meta == [
+        {
+            "type": "meta",
+            "content": "context-chunks",
+            "kept": 1,
+            "topk": 5,
+            "tokens": 2,
+        }
+    ]
+
+
+async def test_stream_semantic_cache_replays_answer(
+    async_client, test_app, mock_retriever, mock_chain
+):
+    from unittest.mock import AsyncMock
+
+    from docseer.agents import SemanticAnswerCache
+
+    test_app.state.answer_cache = SemanticAnswerCache()
+    mock_retriever.index_versions = None
+    mock_retriever.vector_db.model_name = "nomic-embed-text"
+    mock_retriever.vector_db.aembed_query = AsyncMock(return_value=[1.0, 0.0])
+
+    first = _parse_sse(
+        (
+            await async_client.post(
+                "/chat/stream", json={"query": "Main idea?"}
+            )
+        ).text
+    )
+    mock_chain.astream = None  # a second generation would fail
+    second = _parse_sse(
+        (
+            await async_client.post(
+                "/chat/stream", json={"query": "Main idea?"}
+            )
+        ).text
+    )
+
+    def _cache_meta(events):
+        return next(e for e in events if e.get("content") == "semantic-cache")
+
+    assert _cache_meta(first)["hit"] is False
+    assert _cache_meta(second) == {
+        "type": "meta",
+        "content": "semantic-cache",
+        "hit": True,
+        "hits": 1,
+        "misses": 1,
+    }
+    replay = "".join(e["content"] for e in second if e["type"] == "response")
+    assert replay == "Hello world."
+    assert second[-1]["type"] == "done"
+
+
+async def test_stream_semantic_cache_embed_timeout_is_a_miss(
+    async_client, test_app, mock_retriever, monkeypatch
+):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    from backend.app.config import get_settings
+    from docseer.agents import SemanticAnswerCache
+
+    monkeypatch.setattr(get_settings(), "chat_embed_timeout_seconds", 0.01)
+
+    async def _slow_embed(text):
+        await asyncio.sleep(1)
+
+    test_app.state.answer_cache = SemanticAnswerCache()
+    mock_retriever.vector_db.aembed_query = AsyncMock(side_effect=_slow_embed)
+
+    events = _parse_sse(
+        (
+            await async_client.post(
+                "/chat/stream", json={"query": "Main idea?"}
+            )
+        ).text
+    )
+
+    meta = next(e for e in events if e.get("content") == "semantic-cache")
+    assert meta["hit"] is False
+    assert meta["misses"] == 1
+    mock_retriever.aretrieve.assert_awaited_once()
+    assert events[-1]["type"] == "done"
+
+
+def _docs(*texts: str) -> list:
+    from langchain_core.documents import Document
+
+    return [Document(page_content=t) for t in texts]
+
+
+async def test_stream_reranks_overfetched_context(
+    async_client, test_app, mock_retriever
+):
+    from unittest.mock import AsyncMock, MagicMock
+
+    mock_retriever.aretrieve.return_value = _docs("a", "b", "c")
+    reranker = MagicMock()
+    reranker.acompress_documents = AsyncMock(return_value=_docs("c", "a"))
+    test_app.state.reranker = reranker
+
+    resp = await async_client.post(
+        "/chat/stream", json={"query": "q", "topk": 1}
+    )
+    events = _parse_sse(resp.text)
+
+    assert mock_retriever.aretrieve.call_args.kwargs["topk"] == 20
+    reranker.acompress_documents.assert_awaited_once()
+    meta = next(e for e in events if e.get("content") == "context-chunks")
+    assert meta["kept"] == 1
+    assert not any(e.get("content") == "rerank-skipped" for e in events)
+
+
+async def test_stream_rerank_timeout_keeps_retriever_order(
+    async_client, test_app, mock_retriever, monkeypatch
+):
+    import asyncio
+    from unittest.mock import MagicMock
+
+    from backend.app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "reranker_timeout_seconds", 0.01)
+    mock_retriever.aretrieve.return_value = _docs("a", "b", "c")
+
+    async def _slow(documents, query):
+        await asyncio.sleep(1)
+
+    reranker = MagicMock()
+    reranker.acompress_documents = _slow
+    test_app.state.reranker = reranker
+
+    resp = await async_client.post(
+        "/chat/stream", json={"query": "q", "topk": 2}
+    )
+    events = _parse_sse(resp.text)
+
+    skipped = next(e for e in events if e.get("content") == "rerank-skipped")
+    assert skipped["reason"] == "timeout"
+    meta = next(e for e in events if e.get("content") == "context-chunks")
+    assert meta["kept"] == 2
+    assert events[-1]["type"] == "done"
+
+
+async def test_stream_reports_stage_timings(
+    async_client, test_app, mock_retriever
+):
+    from unittest.mock import AsyncMock, MagicMock
+
+    mock_retriever.aretrieve.return_value = _docs("a", "b")
+    reranker = MagicMock()
+    reranker.acompress_documents = AsyncMock(side_effect=RuntimeError)
+    test_app.state.reranker = reranker
+
+    resp = await async_client.post(
+        "/chat/stream", json={"query": "q", "topk": 1}
+    )
+    events = _parse_sse(resp.text)
+
+    stages = mock_retriever.aretrieve.call_args.kwargs["stages"]
+    assert stages.budgets["expand"] > 0
+    meta = next(e for e in events if e.get("content") == "stage-timings")
+    assert "rerank" in meta["timings"]
+    assert meta["degraded"] == {"rerank": "error"}
+
+
+async def test_stream_per_paper_quota_skips_overfetch(
+    async_client, test_app, mock_retriever
+):
+    from unittest.mock import AsyncMock, MagicMock
+
+    from langchain_core.documents import Document
+
+    mock_retriever.aretrieve.return_value = [
+        Document(page_content=c, metadata={"document_id": p})
+        for p, c in [("a", "a1"), ("b", "b1"), ("a", "a2")]
+    ]
+    reranker = MagicMock()
+    reranker.acompress_documents = AsyncMock(
+        side_effect=lambda docs, query: list(reversed(docs))
+    )
+    test_app.state.reranker = reranker
+
+    await async_client.post(
+        "/chat/stream",
+        json={
+            "query": "compare",
+            "paper_ids": ["a", "b"],
+            "topk": 3,
+            "per_paper_quota": 2,
+        },
+    )
+
+    kwargs = mock_retriever.aretrieve.call_args.kwargs
+    assert kwargs["topk"] == 3
+    assert kwargs["per_paper_quota"] == 2
+
+
 async def test_stream_think_mode_binds_model(async_client, mock_agent):
     resp = await async_client.post(
         "/chat/stream", json={"query": "Think hard", "think_mode": True}
@@ -235,7 +235,7 @@ async def test_delete_paper_no_embeddings(async_client, mock_session):
 
 
 async def test_delete_paper_with_embeddings_queues_cleanup(
-    async_client, mock_session
+    async_client, mock_session, test_app
 ):
     paper = make_paper(status=PaperStatus.done)
     mock_session._store[paper.id] = paper
@@ -246,7 +246,7 @@ async def test_delete_paper_with_embeddings_queues_cleanup(
         resp = await async_client.delete(f"/papers/{paper.id}")
 
     assert resp.status_code == 204
-    mock_del.assert_called_once_with(str(paper.id))
+    mock_del.assert_called_once_with(str(paper.id), test_app.state.retriever)
 
 
 async def test_delete_paper_not_found(async_client):
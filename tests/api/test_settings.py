@@ -0,0 +1,17 @@
+"""API tests for /settings router."""
+
+from __future__ import annotations
+
+
+async def test_chat_limits_follow_the_server_settings(
+    async_client, monkeypatch
+):
+    from backend.app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "chat_per_paper_quota", 3)
+    monkeypatch.setattr(get_settings(), "chat_per_paper_max_papers", 5)
+
+    resp = await async_client.get("/settings/chat")
+
+    assert resp.status_code == 200
+    assert resp.json() == {"per_paper_quota": 3, "per_paper_max_papers": 5}
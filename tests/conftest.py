@@ -20,7 +20,12 @@ from httpx import ASGITransport, AsyncClient
 
 from backend.app.dependencies import get_db
 from backend.app.models.paper import Paper, PaperStatus
-from backend.app.routers import chat_router, papers_router, tasks_router
+from backend.app.routers import (
+    chat_router,
+    papers_router,
+    settings_router,
+    tasks_router,
+)
 
 
 # ── MockAsyncSession ──────────────────────────────────────────────────────────
@@ -183,6 +188,7 @@ def test_app(
     app.include_router(papers_router)
     app.include_router(chat_router)
     app.include_router(tasks_router)
+    app.include_router(settings_router)
 
     async def _override_db():
         yield mock_session
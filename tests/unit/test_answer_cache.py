@@ -0,0 +1,62 @@
+"""Unit tests for docseer.agents.answer_cache.SemanticAnswerCache."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from docseer.agents import SemanticAnswerCache
+
+PART = SemanticAnswerCache.partition(["p1"], "qwen", "nomic", ["v1"])
+
+
+def test_near_duplicate_hits():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.set([1.0, 0.0, 0.1], PART, "answer")
+    assert cache.get([0.9, 0.0, 0.1], PART) == "answer"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_dissimilar_query_misses():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.set([1.0, 0.0, 0.0], PART, "answer")
+    assert cache.get([0.0, 1.0, 0.0], PART) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_partition_must_match():
+    cache = SemanticAnswerCache()
+    cache.set([1.0, 0.0], PART, "answer")
+    other = SemanticAnswerCache.partition(["p1"], "qwen", "nomic", ["v2"])
+    assert cache.get([1.0, 0.0], other) is None
+
+
+def test_best_match_wins():
+    cache = SemanticAnswerCache(threshold=0.5)
+    cache.set([1.0, 0.0], PART, "x")
+    cache.set([0.8, 0.6], PART, "diagonal")
+    assert cache.get([0.7, 0.7], PART) == "diagonal"
+
+
+def test_ring_buffer_evicts_oldest():
+    cache = SemanticAnswerCache(maxsize=2)
+    cache.set([1.0, 0.0, 0.0], PART, "a")
+    cache.set([0.0, 1.0, 0.0], PART, "b")
+    cache.set([0.0, 0.0, 1.0], PART, "c")
+    assert cache.get([1.0, 0.0, 0.0], PART) is None
+    assert cache.get([0.0, 1.0, 0.0], PART) == "b"
+
+
+def test_ttl_expiry():
+    cache = SemanticAnswerCache(ttl=10)
+    with patch("docseer.agents.answer_cache.time.time", return_value=0):
+        cache.set([1.0], PART, "answer")
+    with patch("docseer.agents.answer_cache.time.time", return_value=11):
+        assert cache.get([1.0], PART) is None
+
+
+def test_dimension_change_resets():
+    cache = SemanticAnswerCache()
+    cache.set([1.0, 0.0], PART, "old")
+    assert cache.get([1.0, 0.0, 0.0], PART) is None
+    cache.set([1.0, 0.0, 0.0], PART, "new")
+    assert cache.get([1.0, 0.0, 0.0], PART) == "new"
@@ -0,0 +1,184 @@
+"""Unit tests for docseer.databases.chroma.ChromaVectorDB query paths."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+from docseer.databases import ChromaVectorDB, QueryEmbeddingCache
+
+
+def _vector_db(use_async_client: bool = False, **kwargs) -> ChromaVectorDB:
+    embeddings = MagicMock()
+    embeddings.model = "nomic-embed-text"
+    embeddings.aembed_documents = AsyncMock(
+        side_effect=lambda texts: [[float(i)] for i, _ in enumerate(texts)]
+    )
+    with patch("docseer.databases.chroma.chromadb.HttpClient") as client:
+        client.return_value.get_or_create_collection.return_value = MagicMock()
+        return ChromaVectorDB(
+            embeddings, use_async_client=use_async_client, **kwargs
+        )
+
+
+def _results(*per_query: list[str]) -> dict:
+    return {
+        "ids": [list(ids) for ids in per_query],
+        "documents": [[f"text {i}" for i in ids] for ids in per_query],
+        "metadatas": [
+            [{"parent_id": f"p-{i}"} for i in ids] for ids in per_query
+        ],
+    }
+
+
+# ── aquery_many ───────────────────────────────────────────────────────────────
+
+
+async def test_aquery_many_single_embed_and_search_call():
+    db = _vector_db()
+    db.collection.query.return_value = _results(["a", "b"], ["c", "a"])
+
+    docs = await db.aquery_many(["q1", "q2"], n_results=2)
+
+    db.model_embeddings.aembed_documents.assert_awaited_once_with(["q1", "q2"])
+    db.collection.query.assert_called_once()
+    kwargs = db.collection.query.call_args.kwargs
+    assert kwargs["query_embeddings"] == [[0.0], [1.0]]
+    assert [d.id for d in docs] == ["a", "c", "b"]
+
+
+async def test_aquery_many_applies_paper_filter():
+    db = _vector_db()
+    db.collection.query.return_value = _results(["a"])
+
+    await db.aquery_many(["q"], paper_ids=["p1", "p2"])
+
+    where = db.collection.query.call_args.kwargs["where"]
+    assert where == {"document_id": {"$in": ["p1", "p2"]}}
+
+
+async def test_aquery_many_dedups_query_texts():
+    db = _vector_db()
+    db.collection.query.return_value = _results(["a"])
+
+    await db.aquery_many(["same", "same"])
+
+    db.model_embeddings.aembed_documents.assert_awaited_once_with(["same"])
+
+
+async def test_aquery_many_only_embeds_uncached_queries():
+    cache = QueryEmbeddingCache()
+    cache.set("nomic-embed-text", "cached", [9.0])
+    db = _vector_db(query_cache=cache)
+    db.collection.query.return_value = _results(["a"], ["b"])
+
+    await db.aquery_many(["cached", "fresh"])
+
+    db.model_embeddings.aembed_documents.assert_awaited_once_with(["fresh"])
+    kwargs = db.collection.query.call_args.kwargs
+    assert kwargs["query_embeddings"] == [[9.0], [0.0]]
+    assert cache.get("nomic-embed-text", "fresh") == [0.0]
+
+
+def test_query_many_single_embed_and_search_call():
+    db = _vector_db()
+    db.model_embeddings.embed_documents = MagicMock(
+        return_value=[[0.0], [1.0]]
+    )
+    db.collection.query.return_value = _results(["a", "b"], ["c", "a"])
+
+    docs = db.query_many(["q1", "q2", "q1"], n_results=2)
+
+    db.model_embeddings.embed_documents.assert_called_once_with(["q1", "q2"])
+    db.collection.query.assert_called_once()
+    assert [d.id for d in docs] == ["a", "c", "b"]
+
+
+async def test_aquery_many_empty_input():
+    db = _vector_db()
+    assert await db.aquery_many([]) == []
+    db.collection.query.assert_not_called()
+
+
+# ── native async client ───────────────────────────────────────────────────────
+
+
+def _async_client_mock(results: dict) -> tuple[AsyncMock, AsyncMock]:
+    collection = AsyncMock()
+    collection.query.return_value = results
+    client = AsyncMock()
+    client.get_or_create_collection.return_value = collection
+    return AsyncMock(return_value=client), collection
+
+
+async def test_aquery_uses_async_client():
+    db = _vector_db(use_async_client=True)
+    db.model_embeddings.aembed_query = AsyncMock(return_value=[0.5])
+    factory, collection = _async_client_mock(_results(["a", "b"]))
+
+    with patch("docseer.databases.chroma.chromadb.AsyncHttpClient", factory):
+        docs = await db.aquery("q", n_results=2)
+        await db.aquery_many(["q1", "q2"])
+
+    assert [d.id for d in docs] == ["a", "b"]
+    assert collection.query.await_count == 2
+    db.collection.query.assert_not_called()
+    factory.assert_awaited_once()
+
+
+async def test_async_client_reconnects_after_failure():
+    db = _vector_db(use_async_client=True)
+    db.model_embeddings.aembed_query = AsyncMock(return_value=[0.5])
+    factory, _ = _async_client_mock(_results(["a"]))
+    factory.side_effect = [
+        ConnectionError("chroma down"),
+        factory.return_value,
+    ]
+
+    with patch("docseer.databases.chroma.chromadb.AsyncHttpClient", factory):
+        with pytest.raises(ConnectionError):
+            await db.aquery("q")
+        docs = await db.aquery("q")
+
+    assert [d.id for d in docs] == ["a"]
+    assert factory.await_count == 2
+
+
+# ── embedded mode ─────────────────────────────────────────────────────────────
+
+
+class _HashEmbeddings:
+    model = "hash"
+
+    def _embed(self, text: str) -> list[float]:
+        return [float(text.count(c)) for c in "abcdefgh"]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+async def test_embedded_mode_roundtrip(tmp_path):
+    db = ChromaVectorDB(_HashEmbeddings(), path_db=tmp_path / "embeds_db")
+    assert not db.use_async_client
+
+    chunks = [
+        Document(page_content="aaaa", id="d1-0-0"),
+        Document(page_content="hhhh", id="d2-0-0"),
+    ]
+    db.add(chunks[:1], {"document_id": "d1"})
+    await db.aadd(chunks[1:], {"document_id": "d2"})
+
+    assert [d.id for d in db.query("aaa", n_results=1)] == ["d1-0-0"]
+    docs = await db.aquery("hh", n_results=2, paper_ids=["d2"])
+    assert [d.id for d in docs] == ["d2-0-0"]
+
+    db.delete("d1")
+    assert db.collection.count() == 1
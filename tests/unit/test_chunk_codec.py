@@ -0,0 +1,61 @@
+"""Unit tests for docseer.databases.chunk_codec.ChunkCodec."""
+
+from __future__ import annotations
+
+import pytest
+from langchain_core.documents import Document
+
+from docseer.databases import ChunkCodec, SegmentStoreDB
+
+
+def _section(i: int) -> str:
+    return (
+        f"## Results {i}\n\n"
+        "| Model | BLEU | Params |\n"
+        "| --- | --- | --- |\n"
+        f"| Transformer-{i} | {20 + i % 9}.{i % 7} | {i * 13}M |\n\n"
+        "We report $\\mathrm{BLEU}$ on newstest2014 with beam size 4.\n"
+        f"Section {i} discusses ablations of attention heads.\n"
+    )
+
+
+@pytest.mark.parametrize("method", ["zlib", "zstd"])
+def test_trains_then_compresses(tmp_path, method):
+    codec = ChunkCodec(tmp_path, method, dict_size=4096, train_samples=64)
+    plain = [codec.encode(_section(i)) for i in range(64)]
+    assert plain == [_section(i).encode() for i in range(64)]
+    assert (tmp_path / "CURRENT").exists()
+
+    text = _section(1000)
+    value = codec.encode(text)
+    assert value[0] == 0xFF
+    assert len(value) < len(text.encode()) / 2
+    # a fresh process reads it with the saved dictionary
+    assert ChunkCodec(tmp_path, None).decode(value) == text
+    assert codec.decode(plain[3]) == _section(3)
+
+
+def test_plain_when_disabled(tmp_path):
+    codec = ChunkCodec(tmp_path, None, train_samples=1)
+    assert codec.encode("é") == "é".encode()
+    assert not (tmp_path / "CURRENT").exists()
+
+
+def test_segment_store_mixes_plain_and_compressed(tmp_path):
+    plain = SegmentStoreDB(tmp_path)
+    plain.add(["p0-0000000000000000"], [Document(page_content=_section(0))])
+
+    store = SegmentStoreDB(tmp_path, compression="zlib")
+    store.codec.train_samples = 16
+    ids = [f"p1-{i:016x}" for i in range(40)]
+    store.add(ids, [Document(page_content=_section(i)) for i in range(40)])
+    store.add(["p2-0000000000000000"], [Document(page_content=_section(99))])
+
+    reader = SegmentStoreDB(tmp_path)
+    assert reader.get(
+        ["p0-0000000000000000", *ids, "p2-0000000000000000"]
+    ) == [
+        _section(0),
+        *(_section(i) for i in range(40)),
+        _section(99),
+    ]
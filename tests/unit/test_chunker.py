@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+
 from docseer.chunkers.parent_child_chunker import ParentChildChunker
 
 SAMPLE_MD = """\
@@ -42,14 +44,17 @@ def test_chunk_returns_all_keys():
 
 def test_parent_ids_format():
     result = _chunker().chunk(SAMPLE_MD, "doc-1")
-    for i, pid in enumerate(result["parent_ids"]):
-        assert pid == f"doc-1-{i}"
+    for pid in result["parent_ids"]:
+        # id format: doc-1-{content digest}
+        assert pid.startswith("doc-1-")
+        assert len(pid.removeprefix("doc-1-")) == 16
 
 
 def test_child_ids_format():
     result = _chunker().chunk(SAMPLE_MD, "doc-1")
     for child in result["chunks"]:
-        # id format: doc-1-{parent_idx}-{child_idx}
+        # id format: {parent_id}-{content digest}
+        assert child.id.startswith(child.metadata["parent_id"] + "-")
         parts = child.id.split("-")
         assert parts[0] == "doc"
         assert parts[1] == "1"
@@ -93,6 +98,32 @@ def test_child_content_nonempty():
         assert child.page_content.strip()
 
 
+# ── content-addressed ids ────────────────────────────────────────────────────
+
+
+def test_ids_are_deterministic():
+    r1 = _chunker().chunk(SAMPLE_MD, "doc-1")
+    r2 = _chunker().chunk(SAMPLE_MD, "doc-1")
+    assert r1["parent_ids"] == r2["parent_ids"]
+    assert [c.id for c in r1["chunks"]] == [c.id for c in r2["chunks"]]
+
+
+def test_ids_are_unique():
+    md = "# A\n\nsame text\n\n# A\n\nsame text\n"
+    result = ParentChildChunker(parent_overlap_chars=0).chunk(md, "dup")
+    ids = [c.id for c in result["chunks"]]
+    assert len(ids) == len(set(ids))
+    assert len(set(result["parent_ids"])) == len(result["parent_ids"])
+
+
+def test_local_edit_keeps_unrelated_ids():
+    edited = SAMPLE_MD.replace("Finally we evaluate", "Lastly we evaluate")
+    before = {c.id for c in _chunker().chunk(SAMPLE_MD, "doc-1")["chunks"]}
+    after = {c.id for c in _chunker().chunk(edited, "doc-1")["chunks"]}
+    assert before != after
+    assert before & after
+
+
 # ── small chunk size forces splitting ─────────────────────────────────────────
 
 
@@ -116,6 +147,35 @@ async def test_achunk_matches_sync():
     assert len(async_result["chunks"]) == len(sync_result["chunks"])
 
 
+async def test_achunk_stream_yields_the_same_sections():
+    c = _chunker()
+    sync_result = c.chunk(SAMPLE_MD, "doc-stream")
+    sections = [s async for s in c.achunk_stream(SAMPLE_MD, "doc-stream", 1)]
+
+    assert [p.id for p, _ in sections] == sync_result["parent_ids"]
+    assert [c.id for _, children in sections for c in children] == [
+        c.id for c in sync_result["chunks"]
+    ]
+
+
+async def test_achunk_stream_can_stop_early():
+    c = _chunker()
+    stream = c.achunk_stream(SAMPLE_MD, "doc-stream", 1)
+    first = await anext(stream)
+    await stream.aclose()
+    assert first[0].id == c.chunk(SAMPLE_MD, "doc-stream")["parent_ids"][0]
+
+
+async def test_achunk_stream_closes_with_a_put_pending():
+    c = _chunker()
+    text = "# A\n\none\n\n# B\n\ntwo\n\n# C\n\nthree\n"
+    stream = c.achunk_stream(text, "doc-stream", 1)
+    await anext(stream)
+    # let the producer fill the queue and block on the last section
+    await asyncio.sleep(0.1)
+    await asyncio.wait_for(stream.aclose(), timeout=5)
+
+
 # ── edge cases ────────────────────────────────────────────────────────────────
 
 
@@ -133,3 +193,42 @@ def test_different_doc_ids_are_isolated():
     ids_a = {ch.id for ch in r1["chunks"]}
     ids_b = {ch.id for ch in r2["chunks"]}
     assert ids_a.isdisjoint(ids_b)
+
+
+def test_iter_parents_matches_splitter():
+    text = (
+        "Preamble line.\r\n\r\n# Title\n## Bare header\n### Deeper\n"
+        "text under deeper\n\n```\n# not a header\n```\n"
+        "## Sibling\nmore\n\n\nafter blank\n# Next\n#NoSpace\n~~~\n## x\n~~~\n"
+    )
+    nested = ParentChildChunker(
+        parent_headers_to_split_on=[("#", "h1"), ("##", "h2"), ("###", "h3")]
+    )
+    for chunker in (_chunker(), nested):
+        expected = chunker.parent_splitter.split_text(text)
+        parents = list(chunker.iter_parents(text))
+        assert [(p.page_content, p.metadata) for p in parents] == [
+            (p.page_content, p.metadata) for p in expected
+        ]
+    assert list(nested.iter_parents(SAMPLE_MD)) == (
+        nested.parent_splitter.split_text(SAMPLE_MD)
+    )
+
+
+def test_iter_parents_keeps_the_splitter_merges_across_sections():
+    texts = [
+        # a preamble ending in a header-like line merges into the header
+        "intro\n#hashtag\n## A\ntext a\n## B\ntext b\n",
+        # the same header twice in a row is one section
+        "## Results\none\n## Results\ntwo\n# Results\nthree\n",
+        # only ## sections: every one is a cut
+        "## A\na\n### A1\na1\n## B\nb\n```\n## C\n```\n## D\n",
+    ]
+    nested = ParentChildChunker(
+        parent_headers_to_split_on=[("#", "h1"), ("##", "h2"), ("###", "h3")]
+    )
+    for chunker in (_chunker(), nested):
+        for text in texts:
+            assert list(chunker.iter_parents(text)) == (
+                chunker.parent_splitter.split_text(text)
+            )
@@ -0,0 +1,122 @@
+"""Unit tests for backend.app.services.docstore."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from backend.app.config import Settings
+from backend.app.services.docstore import (
+    PostgresDocstore,
+    RedisDocstore,
+    open_docstore,
+)
+from docseer.databases import LocalFileStoreDB, SegmentStoreDB
+
+
+def _settings(tmp_path, backend: str = "segment") -> Settings:
+    return Settings(docstore_path=str(tmp_path), docstore_backend=backend)
+
+
+# ── backend selection ─────────────────────────────────────────────────────────
+
+
+def test_file_store_by_default(tmp_path):
+    (tmp_path / "p1-0000000000000000").write_text("parent")
+    store = open_docstore(Settings(docstore_path=str(tmp_path)))
+    assert isinstance(store, LocalFileStoreDB)
+
+
+def test_segment_store(tmp_path):
+    store = open_docstore(_settings(tmp_path))
+    assert isinstance(store, SegmentStoreDB)
+    assert store.path_db == tmp_path / "segments"
+
+
+def test_unmigrated_file_store_is_refused(tmp_path):
+    (tmp_path / "p1-0000000000000000").write_text("parent")
+    with pytest.raises(RuntimeError, match="migrate-docstore"):
+        open_docstore(_settings(tmp_path))
+    assert isinstance(
+        open_docstore(_settings(tmp_path, "files")), LocalFileStoreDB
+    )
+
+    SegmentStoreDB(tmp_path / "segments").add(
+        ["p1-0000000000000000"], [Document(page_content="parent")]
+    )
+    assert isinstance(open_docstore(_settings(tmp_path)), SegmentStoreDB)
+
+
+def test_network_backends(tmp_path):
+    assert isinstance(
+        open_docstore(_settings(tmp_path, "postgres")), PostgresDocstore
+    )
+    assert isinstance(
+        open_docstore(_settings(tmp_path, "redis")), RedisDocstore
+    )
+
+
+# ── PostgresDocstore ──────────────────────────────────────────────────────────
+
+
+def _postgres() -> tuple[PostgresDocstore, MagicMock, MagicMock]:
+    cur = MagicMock()
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    engine = MagicMock()
+    engine.raw_connection.return_value = conn
+    return PostgresDocstore(engine), conn, cur
+
+
+def test_postgres_add_copies_unique_rows():
+    store, conn, cur = _postgres()
+    loaded = []
+    cur.copy_expert.side_effect = lambda sql, f: loaded.append(f.read())
+
+    store.add(
+        ["p1-0000000000000000", "p1-0000000000000001", "p1-0000000000000000"],
+        [
+            Document(page_content="old"),
+            Document(page_content='a "quoted",\nmultiline\x00 text'),
+            Document(page_content="new"),
+        ],
+    )
+
+    assert loaded == [
+        "p1-0000000000000000,p1,new\r\n"
+        'p1-0000000000000001,p1,"a ""quoted"",\nmultiline text"\r\n'
+    ]
+    assert "ON CONFLICT (id)" in cur.execute.call_args_list[-1].args[0]
+    conn.commit.assert_called_once()
+    conn.close.assert_called_once()
+
+
+def test_postgres_get_keeps_request_order():
+    store, _, cur = _postgres()
+    cur.fetchall.return_value = [("p1-b", "B"), ("p1-a", "A")]
+    assert store.get(["p1-a", "missing", "p1-b"]) == ["A", "B"]
+    assert cur.execute.call_args.args[1] == (["p1-a", "missing", "p1-b"],)
+
+
+def test_postgres_rolls_back_on_error():
+    store, conn, cur = _postgres()
+    cur.execute.side_effect = RuntimeError("boom")
+    try:
+        store.delete("p1")
+    except RuntimeError:
+        pass
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    conn.close.assert_called_once()
+
+
+def test_postgres_non_empty_is_cached():
+    store, conn, cur = _postgres()
+    cur.fetchone.return_value = (False,)
+    assert store.is_empty
+    cur.fetchone.return_value = (True,)
+    assert not store.is_empty
+    assert not store.is_empty
+    assert conn.close.call_count == 2
@@ -0,0 +1,183 @@
+"""Unit tests for docseer.databases.embedding_cache + ChromaVectorDB usage."""
+
+from __future__ import annotations
+
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from langchain_classic.storage import InMemoryByteStore
+from langchain_core.documents import Document
+
+from docseer.databases import (
+    ChromaVectorDB,
+    EmbeddingCache,
+    QueryEmbeddingCache,
+)
+
+
+class FakeEmbeddings:
+    model = "nomic-embed-text:latest"
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+
+def _vector_db(cache: EmbeddingCache | None) -> ChromaVectorDB:
+    with patch("docseer.databases.chroma.chromadb.HttpClient") as client:
+        client.return_value.get_or_create_collection.return_value = MagicMock()
+        return ChromaVectorDB(
+            FakeEmbeddings(),
+            batch_size=2,
+            embedding_cache=cache,
+            use_async_client=False,
+        )
+
+
+def _chunks(*texts: str) -> list[Document]:
+    return [
+        Document(page_content=t, id=f"doc-0-{i}") for i, t in enumerate(texts)
+    ]
+
+
+# ── EmbeddingCache ────────────────────────────────────────────────────────────
+
+
+def test_key_normalizes_whitespace():
+    k1 = EmbeddingCache.key("m", "hello   world\n")
+    k2 = EmbeddingCache.key("m", " hello world")
+    assert k1 == k2
+
+
+def test_key_depends_on_model():
+    assert EmbeddingCache.key("a", "x") != EmbeddingCache.key("b", "x")
+
+
+def test_key_is_valid_local_file_store_key():
+    key = EmbeddingCache.key("nomic-embed-text:latest", "x")
+    assert key.startswith("nomic-embed-text_latest/")
+
+
+def test_roundtrip_preserves_floats():
+    cache = EmbeddingCache(InMemoryByteStore())
+    cache.mset("m", ["a"], [[0.1, -2.5, 3.0]])
+    assert cache.mget("m", ["a", "b"]) == [[0.1, -2.5, 3.0], None]
+
+
+# ── ChromaVectorDB integration ────────────────────────────────────────────────
+
+
+def test_add_only_embeds_cache_misses():
+    cache = EmbeddingCache(InMemoryByteStore())
+    db = _vector_db(cache)
+    db.add(_chunks("alpha", "beta"), {"document_id": "doc"})
+    db.add(_chunks("alpha", "gamma"), {"document_id": "doc"})
+
+    assert db.model_embeddings.calls == [["alpha", "beta"], ["gamma"]]
+    embeds = db.collection.upsert.call_args.kwargs["embeddings"]
+    assert embeds == [[5.0, 0.5], [5.0, 0.5]]
+
+
+async def test_aadd_served_from_cache_on_reingest():
+    cache = EmbeddingCache(InMemoryByteStore())
+    db = _vector_db(cache)
+    chunks = _chunks("one", "two", "three")
+    await db.aadd(chunks, {"document_id": "doc"})
+    n_calls = len(db.model_embeddings.calls)
+
+    await db.aadd(chunks, {"document_id": "doc"})
+    assert len(db.model_embeddings.calls) == n_calls
+
+
+def test_no_cache_always_embeds():
+    db = _vector_db(None)
+    db.add(_chunks("alpha"), {"document_id": "doc"})
+    db.add(_chunks("alpha"), {"document_id": "doc"})
+    assert len(db.model_embeddings.calls) == 2
+
+
+# ── QueryEmbeddingCache ───────────────────────────────────────────────────────
+
+
+def test_query_cache_lru_eviction():
+    cache = QueryEmbeddingCache(maxsize=2)
+    cache.set("m", "a", [1.0])
+    cache.set("m", "b", [2.0])
+    assert cache.get("m", "a") == [1.0]
+    cache.set("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
+    assert cache.get("m", "c") == [3.0]
+
+
+def test_query_cache_ttl_expiry():
+    cache = QueryEmbeddingCache(ttl=60)
+    with patch("docseer.databases.embedding_cache.time.time") as now:
+        now.return_value = 1000.0
+        cache.set("m", "q", [1.0])
+        now.return_value = 1059.0
+        assert cache.get("m", "q") == [1.0]
+        now.return_value = 1061.0
+        assert cache.get("m", "q") is None
+
+
+def test_query_cache_persists_across_instances():
+    store = InMemoryByteStore()
+    QueryEmbeddingCache(store=store).set("m", "q", [0.25, 0.75])
+    assert QueryEmbeddingCache(store=store).get("m", "q") == [0.25, 0.75]
+
+
+def test_query_cache_invalidate_model():
+    store = InMemoryByteStore()
+    cache = QueryEmbeddingCache(store=store)
+    cache.set("old", "q", [1.0])
+    cache.set("new", "q", [2.0])
+    cache.invalidate("old")
+
+    assert cache.get("old", "q") is None
+    assert QueryEmbeddingCache(store=store).get("old", "q") is None
+    assert cache.get("new", "q") == [2.0]
+
+
+async def test_aquery_reuses_cached_query_embedding():
+    db = _vector_db(None)
+    db.query_cache = QueryEmbeddingCache()
+    db.model_embeddings.aembed_query = AsyncMock(return_value=[0.1, 0.2])
+    db.collection.query.return_value = {"documents": [[]], "metadatas": [[]]}
+
+    await db.aquery("what is attention?")
+    await db.aquery("what is attention?")
+
+    db.model_embeddings.aembed_query.assert_awaited_once()
+    assert db.collection.query.call_count == 2
+
+
+async def test_aembed_query_keeps_the_store_off_the_loop():
+    store = InMemoryByteStore()
+    db = _vector_db(None)
+    db.query_cache = QueryEmbeddingCache(store=store)
+    db.model_embeddings.aembed_query = AsyncMock(return_value=[0.1, 0.2])
+    threads: list[int] = []
+    mget, mset = store.mget, store.mset
+    store.mget = lambda keys: (
+        threads.append(threading.get_ident()) or mget(keys)
+    )
+    store.mset = lambda pairs: (
+        threads.append(threading.get_ident()) or mset(pairs)
+    )
+
+    assert await db.aembed_query("q") == [0.1, 0.2]
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+
+    # memory hits never reach the store
+    assert await db.aembed_query("q") == [0.1, 0.2]
+    assert len(threads) == 2
+    assert QueryEmbeddingCache(store=store).get(db.model_name, "q") == [
+        0.1,
+        0.2,
+    ]
@@ -0,0 +1,137 @@
+"""Unit tests for docseer.databases.embedding_scheduler."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from docseer.databases import EmbeddingScheduler
+
+
+def _scheduler(**kwargs) -> EmbeddingScheduler:
+    defaults = dict(
+        batch_size=4, min_batch_size=1, batch_size_step=2, max_concurrency=3
+    )
+    return EmbeddingScheduler(**(defaults | kwargs))
+
+
+async def test_processes_every_item_once():
+    seen: list[int] = []
+
+    async def process(batch):
+        seen.extend(batch)
+
+    await _scheduler().run(list(range(50)), process)
+    assert sorted(seen) == list(range(50))
+
+
+async def test_stream_is_embedded_while_produced():
+    events: list[str] = []
+
+    async def items():
+        for i in range(20):
+            events.append(f"item {i}")
+            await asyncio.sleep(0.001)
+            yield i
+
+    async def process(batch):
+        events.append("batch")
+
+    progress: list[tuple[int, int]] = []
+    await _scheduler().run(
+        items(), process, lambda done, total, _: progress.append((done, total))
+    )
+
+    assert events.index("batch") < events.index("item 19")
+    assert progress[-1] == (20, 20)
+
+
+async def test_stream_errors_propagate():
+    async def items():
+        yield 1
+        raise RuntimeError("chunker failed")
+
+    async def process(batch):
+        pass
+
+    with pytest.raises(RuntimeError, match="chunker failed"):
+        await _scheduler().run(items(), process)
+
+
+async def test_concurrency_is_bounded():
+    in_flight = 0
+    peak = 0
+
+    async def process(batch):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+
+    scheduler = _scheduler(max_concurrency=2)
+    await scheduler.run(list(range(100)), process)
+    assert peak <= 2
+
+
+async def test_fast_batches_grow_concurrency_and_batch_size():
+    async def process(batch):
+        pass
+
+    scheduler = _scheduler(max_batch_size=64)
+    await scheduler.run(list(range(200)), process)
+    assert scheduler.concurrency == scheduler.max_concurrency
+    assert scheduler.batch_size > 4
+
+
+async def test_slow_batches_shrink_batch_size():
+    async def process(batch):
+        await asyncio.sleep(0.01)
+
+    scheduler = _scheduler(max_concurrency=1, target_latency=0.0)
+    await scheduler.run(list(range(20)), process)
+    assert scheduler.batch_size == scheduler.min_batch_size
+
+
+async def test_failed_batch_is_retried_and_backs_off():
+    failures = 1
+    seen: list[int] = []
+    sizes: list[int] = []
+
+    async def process(batch):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise TimeoutError("ollama busy")
+        seen.extend(batch)
+        sizes.append(len(batch))
+
+    await _scheduler(batch_size=8).run(list(range(8)), process)
+    assert sorted(seen) == list(range(8))
+    # the failed batch of 8 is re-queued split at the halved batch size
+    assert sizes == [4, 4]
+
+
+async def test_gives_up_after_max_retries():
+    async def process(batch):
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError, match="down"):
+        await _scheduler(max_retries=2).run(list(range(10)), process)
+
+
+async def test_progress_reports_throughput():
+    calls: list[tuple[int, int, float]] = []
+
+    async def process(batch):
+        pass
+
+    await _scheduler().run(
+        list(range(10)),
+        process,
+        progress_callback=lambda d, t, r: calls.append((d, t, r)),
+    )
+    assert calls[-1][0] == 10
+    assert all(t == 10 for _, t, _ in calls)
+    assert all(r >= 0 for *_, r in calls)
@@ -2,119 +2,85 @@
 
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 
 
 from backend.app.services.ingest import delete_paper_embeddings
 
 
-def _make_chroma_mock(raise_on_delete: Exception | None = None) -> MagicMock:
-    col = MagicMock()
-    if raise_on_delete:
-        col.delete.side_effect = raise_on_delete
-    client = MagicMock()
-    client.get_or_create_collection.return_value = col
-    return client, col
-
-
-def _make_docstore_mock(
+def _make_retriever_mock(
     is_empty: bool = False,
-    raise_on_delete: Exception | None = None,
+    chroma_error: Exception | None = None,
+    docstore_error: Exception | None = None,
 ) -> MagicMock:
-    ds = MagicMock()
-    ds.is_empty = is_empty
-    if raise_on_delete:
-        ds.delete.side_effect = raise_on_delete
-    return ds
+    retriever = MagicMock()
+    if chroma_error:
+        retriever.vector_db.delete.side_effect = chroma_error
+    retriever.docstore.is_empty = is_empty
+    if docstore_error:
+        retriever.docstore.delete.side_effect = docstore_error
+    return retriever
 
 
 # ── happy path ────────────────────────────────────────────────────────────────
 
 
-async def test_delete_calls_chroma_and_docstore():
-    client_mock, col_mock = _make_chroma_mock()
-    ds_mock = _make_docstore_mock(is_empty=False)
+async def test_delete_calls_every_store():
+    retriever = _make_retriever_mock(is_empty=False)
+
+    await delete_paper_embeddings("paper-123", retriever)
+
+    # chunk vectors and paper-level vectors
+    retriever.vector_db.delete.assert_called_once_with("paper-123")
+    retriever.docstore.delete.assert_called_once_with("paper-123")
+    retriever.lexical_index.delete.assert_called_once_with("paper-123")
+    retriever.index_versions.bump.assert_called_once_with("paper-123")
 
-    with (
-        patch(
-            "backend.app.services.ingest.chromadb.HttpClient",
-            return_value=client_mock,
-        ),
-        patch(
-            "backend.app.services.ingest.LocalFileStoreDB",
-            return_value=ds_mock,
-        ),
-    ):
-        await delete_paper_embeddings("paper-123")
 
-    col_mock.delete.assert_called_once_with(where={"document_id": "paper-123"})
-    ds_mock.delete.assert_called_once_with("paper-123")
+async def test_missing_lexical_index_and_versions_are_skipped():
+    retriever = _make_retriever_mock(is_empty=False)
+    retriever.lexical_index = None
+    retriever.index_versions = None
+
+    await delete_paper_embeddings("paper-123", retriever)
+
+    retriever.docstore.delete.assert_called_once_with("paper-123")
 
 
 # ── chroma error is swallowed ─────────────────────────────────────────────────
 
 
 async def test_chroma_error_does_not_raise():
-    client_mock, _ = _make_chroma_mock(
-        raise_on_delete=RuntimeError("chroma down")
+    retriever = _make_retriever_mock(
+        is_empty=False, chroma_error=RuntimeError("chroma down")
     )
-    ds_mock = _make_docstore_mock(is_empty=False)
 
-    with (
-        patch(
-            "backend.app.services.ingest.chromadb.HttpClient",
-            return_value=client_mock,
-        ),
-        patch(
-            "backend.app.services.ingest.LocalFileStoreDB",
-            return_value=ds_mock,
-        ),
-    ):
-        # should not raise
-        await delete_paper_embeddings("paper-err")
+    # should not raise
+    await delete_paper_embeddings("paper-err", retriever)
 
-    ds_mock.delete.assert_called_once()
+    retriever.docstore.delete.assert_called_once()
+    retriever.index_versions.bump.assert_called_once()
 
 
 # ── empty docstore skips delete ───────────────────────────────────────────────
 
 
 async def test_empty_docstore_skips_delete():
-    client_mock, _ = _make_chroma_mock()
-    ds_mock = _make_docstore_mock(is_empty=True)
+    retriever = _make_retriever_mock(is_empty=True)
 
-    with (
-        patch(
-            "backend.app.services.ingest.chromadb.HttpClient",
-            return_value=client_mock,
-        ),
-        patch(
-            "backend.app.services.ingest.LocalFileStoreDB",
-            return_value=ds_mock,
-        ),
-    ):
-        await delete_paper_embeddings("paper-empty")
+    await delete_paper_embeddings("paper-empty", retriever)
 
-    ds_mock.delete.assert_not_called()
+    retriever.docstore.delete.assert_not_called()
 
 
 # ── docstore error is swallowed ───────────────────────────────────────────────
 
 
 async def test_docstore_error_does_not_raise():
-    client_mock, _ = _make_chroma_mock()
-    ds_mock = _make_docstore_mock(
-        is_empty=False, raise_on_delete=OSError("disk full")
+    retriever = _make_retriever_mock(
+        is_empty=False, docstore_error=OSError("disk full")
     )
 
-    with (
-        patch(
-            "backend.app.services.ingest.chromadb.HttpClient",
-            return_value=client_mock,
-        ),
-        patch(
-            "backend.app.services.ingest.LocalFileStoreDB",
-            return_value=ds_mock,
-        ),
-    ):
-        await delete_paper_embeddings("paper-oserr")
+    await delete_paper_embeddings("paper-oserr", retriever)
+
+    retriever.lexical_index.delete.assert_called_once()
@@ -0,0 +1,158 @@
+"""Unit tests for docseer.databases.lexical_index.BM25Index."""
+
+from __future__ import annotations
+
+from langchain_core.documents import Document
+
+from docseer.databases import BM25Index
+from docseer.databases.lexical_index import backfill, tokenize
+
+
+def _chunks(document_id: str, *texts: str) -> list[Document]:
+    return [
+        Document(page_content=t, id=f"{document_id}-{i}")
+        for i, t in enumerate(texts)
+    ]
+
+
+def _index(tmp_path) -> BM25Index:
+    index = BM25Index(tmp_path)
+    index.add(
+        _chunks(
+            "p1",
+            "We fine-tune GPT-4 on the SQuAD dataset.",
+            "Results are reported in Table 3.",
+        ),
+        {"document_id": "p1"},
+    )
+    index.add(
+        _chunks("p2", "BERT-large is evaluated on GLUE and SQuAD."),
+        {"document_id": "p2"},
+    )
+    return index
+
+
+def _ids(hits: list[tuple[str, float]]) -> list[str]:
+    return [chunk_id for chunk_id, _ in hits]
+
+
+def test_tokenize_keeps_compound_identifiers():
+    assert tokenize("GPT-4 beats Eq.3") == [
+        "gpt-4",
+        "gpt",
+        "4",
+        "beats",
+        "eq.3",
+        "eq",
+        "3",
+    ]
+
+
+def test_exact_identifier_ranks_first(tmp_path):
+    index = _index(tmp_path)
+    assert _ids(index.search("gpt-4 results"))[0] == "p1-0"
+    assert _ids(index.search("BERT-large")) == ["p2-0"]
+
+
+def test_scores_are_descending(tmp_path):
+    hits = _index(tmp_path).search("squad dataset", n_results=5)
+    scores = [s for _, s in hits]
+    assert scores == sorted(scores, reverse=True)
+    assert set(_ids(hits)) == {"p1-0", "p2-0"}
+
+
+def test_paper_filter(tmp_path):
+    hits = _index(tmp_path).search("squad", paper_ids=["p2"])
+    assert _ids(hits) == ["p2-0"]
+
+
+def test_no_match(tmp_path):
+    assert _index(tmp_path).search("transformer") == []
+
+
+def test_delete_document(tmp_path):
+    index = _index(tmp_path)
+    index.delete("p1")
+    assert _ids(index.search("squad")) == ["p2-0"]
+    assert len(index) == 1
+
+
+def test_delete_ids_and_readd(tmp_path):
+    index = _index(tmp_path)
+    index.delete_ids(["p1-0"])
+    assert "p1-0" not in _ids(index.search("gpt-4"))
+
+    index.add(_chunks("p1", "GPT-4 again"), {"document_id": "p1"})
+    assert _ids(index.search("gpt-4")) == ["p1-0"]
+
+
+def test_compaction_preserves_results(tmp_path):
+    index = _index(tmp_path)
+    index.compact_ratio = 0.0
+    index.delete_ids(["p1-1"])
+    assert len(index.ids) == 2
+    assert set(_ids(index.search("squad"))) == {"p1-0", "p2-0"}
+    assert _ids(index.search("table")) == []
+
+
+def test_persisted_and_reloaded_by_other_instance(tmp_path):
+    writer = _index(tmp_path)
+    reader = BM25Index(tmp_path)
+    assert _ids(reader.search("glue")) == ["p2-0"]
+
+    writer.add(_chunks("p3", "ImageNet top-1 accuracy"), {"document_id": "p3"})
+    assert _ids(reader.search("imagenet")) == ["p3-0"]
+
+    reader.delete("p3")
+    assert writer.search("imagenet") == []
+    assert len(writer) == 3
+
+
+def test_writes_append_to_the_log_until_it_outgrows_the_snapshot(tmp_path):
+    index = _index(tmp_path)
+    assert not index.path_index.exists()
+    assert index._log_path(0).exists()
+
+    index.min_snapshot_bytes = 0
+    index.add(_chunks("p3", "ImageNet top-1 accuracy"), {"document_id": "p3"})
+    assert index.path_index.exists()
+    assert not index._log_path(0).exists()
+
+    reader = BM25Index(tmp_path)
+    assert reader.generation == 1
+    assert _ids(reader.search("imagenet")) == ["p3-0"]
+    assert len(reader) == 4
+
+
+def test_torn_log_record_is_ignored_and_overwritten(tmp_path):
+    _index(tmp_path)
+    with open(BM25Index(tmp_path)._log_path(0), "ab") as f:
+        f.write(b"\xff\x00\x00\x00partial")
+
+    index = BM25Index(tmp_path)
+    assert len(index) == 3
+    index.add(_chunks("p3", "ImageNet"), {"document_id": "p3"})
+    assert _ids(BM25Index(tmp_path).search("imagenet")) == ["p3-0"]
+
+
+class _Collection:
+    def __init__(self, ids: list[str]):
+        self.ids = ids
+
+    def get(self, include, limit, offset):
+        ids = self.ids[offset : offset + limit]
+        return {
+            "ids": ids,
+            "documents": [f"text of {i}" for i in ids],
+            "metadatas": [{"document_id": i.split("-")[0]} for i in ids],
+        }
+
+
+def test_backfill_indexes_missing_chunks_only(tmp_path):
+    index = _index(tmp_path)
+    collection = _Collection(["p1-0", "p3-0", "p3-1", "p4-0"])
+
+    assert backfill(index, collection, batch_size=3) == 3
+    assert len(index) == 6
+    assert _ids(index.search("text", paper_ids=["p4"])) == ["p4-0"]
+    assert backfill(index, collection) == 0
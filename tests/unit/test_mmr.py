@@ -0,0 +1,25 @@
+"""Unit tests for docseer.retrievers.mmr."""
+
+from __future__ import annotations
+
+from docseer.retrievers.mmr import mmr
+
+QUERY = [1.0, 0.0]
+# two near-duplicates of the best hit and one distinct, slightly worse hit
+POOL = [[1.0, 0.05], [1.0, 0.06], [0.7, 0.7]]
+
+
+def test_pure_relevance_keeps_similarity_order():
+    assert mmr(QUERY, POOL, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_diversity_skips_near_duplicates():
+    assert mmr(QUERY, POOL, k=2, lambda_mult=0.3) == [0, 2]
+
+
+def test_k_larger_than_pool():
+    assert sorted(mmr(QUERY, POOL, k=10)) == [0, 1, 2]
+
+
+def test_empty_pool():
+    assert mmr(QUERY, [], k=3) == []
@@ -0,0 +1,71 @@
+"""Unit tests for docseer.databases.parent_cache.ParentCache."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from docseer.databases import ParentCache, SegmentStoreDB
+
+
+def _key(document_id: str, i: int) -> str:
+    return f"{document_id}-{i:016x}"
+
+
+def _cache(tmp_path, max_bytes: int = 1 << 20) -> ParentCache:
+    store = SegmentStoreDB(tmp_path)
+    for document_id in ("p1", "p2"):
+        store.add(
+            [_key(document_id, i) for i in range(3)],
+            [Document(page_content=f"{document_id}:{i}") for i in range(3)],
+        )
+    return ParentCache(store, max_bytes=max_bytes)
+
+
+def test_hits_skip_the_docstore(tmp_path):
+    cache = _cache(tmp_path)
+    ids = [_key("p1", 0), "missing", _key("p1", 1)]
+    assert cache.mget(ids) == ["p1:0", None, "p1:1"]
+    assert cache.stats()["misses"] == 3
+
+    with patch.object(cache.docstore, "mget") as mget:
+        assert cache.get([_key("p1", 1), _key("p1", 0)]) == ["p1:1", "p1:0"]
+    mget.assert_not_called()
+    assert cache.hits == 2
+    assert cache.hit_rate == 0.4
+    assert cache.resident_bytes == 8
+
+
+def test_cached_only_returns_hits(tmp_path):
+    cache = _cache(tmp_path)
+    cache.mget([_key("p1", 0)])
+    with patch.object(cache.docstore, "mget") as mget:
+        assert cache.cached([_key("p1", 0), _key("p1", 1)]) == {
+            _key("p1", 0): "p1:0"
+        }
+    mget.assert_not_called()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recent_by_bytes(tmp_path):
+    cache = _cache(tmp_path, max_bytes=8)
+    cache.mget([_key("p1", 0), _key("p1", 1)])
+    cache.mget([_key("p1", 0)])  # p1:1 is now least recent
+    cache.mget([_key("p2", 0)])
+    assert list(cache._entries) == [_key("p1", 0), _key("p2", 0)]
+    assert cache.resident_bytes == 8
+
+
+def test_deletes_invalidate_by_document(tmp_path):
+    cache = _cache(tmp_path)
+    cache.mget([_key("p1", 0), _key("p2", 0), _key("p2", 1)])
+
+    cache.delete("p1")
+    assert cache.mget([_key("p1", 0)]) == [None]
+    cache.delete_ids([_key("p2", 0)])
+    assert cache.mget([_key("p2", 0), _key("p2", 1)]) == [None, "p2:1"]
+
+    cache.invalidate("p2")
+    assert cache.resident_bytes == 0
+    assert cache.keys("p2") == [_key("p2", 1), _key("p2", 2)]
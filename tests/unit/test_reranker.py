@@ -0,0 +1,118 @@
+"""Unit tests for docseer.retrievers.AsyncFlashrankRerank."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+from flashrank import Ranker
+from langchain_core.documents import Document
+
+from docseer.retrievers import AsyncFlashrankRerank
+
+
+class FakeSession:
+    """Cross-encoder stub scoring a pair by the passage length."""
+
+    def __init__(self):
+        self.batches: list[int] = []
+        self.threads: list[str] = []
+
+    def run(self, _, onnx_input):
+        self.batches.append(len(onnx_input["input_ids"]))
+        self.threads.append(threading.current_thread().name)
+        return [onnx_input["input_ids"][:, 1:2].astype(np.float32) / 10]
+
+
+def _encode_batch(pairs):
+    return [
+        SimpleNamespace(
+            ids=[len(q), len(p)], type_ids=[0, 0], attention_mask=[1, 1]
+        )
+        for q, p in pairs
+    ]
+
+
+def _reranker(**kwargs) -> AsyncFlashrankRerank:
+    client = MagicMock(spec=Ranker)
+    client.llm_model = None
+    client.tokenizer = SimpleNamespace(encode_batch=_encode_batch)
+    client.session = FakeSession()
+    return AsyncFlashrankRerank(
+        client=client, model="fake", **({"top_n": 3} | kwargs)
+    )
+
+
+def _docs(*texts: str) -> list[Document]:
+    return [Document(page_content=t, id=t) for t in texts]
+
+
+async def test_reranks_by_score_on_dedicated_pool():
+    reranker = _reranker(top_n=2)
+
+    ranked = await reranker.acompress_documents(_docs("a", "ccc", "bb"), "q")
+
+    assert [d.page_content for d in ranked] == ["ccc", "bb"]
+    assert [d.id for d in ranked] == ["ccc", "bb"]
+    assert ranked[0].metadata["relevance_score"] > 0.5
+    assert reranker.client.session.threads == ["flashrank_0"]
+
+
+async def test_concurrent_requests_share_one_inference_call():
+    reranker = _reranker()
+
+    await asyncio.gather(
+        reranker.acompress_documents(_docs("a", "bb"), "first"),
+        reranker.acompress_documents(_docs("ccc", "dddd"), "second"),
+    )
+
+    assert reranker.client.session.batches == [4]
+
+
+async def test_batch_is_flushed_early_when_full():
+    reranker = _reranker(max_batch_pairs=2, batch_window=10.0)
+    ranked = await asyncio.wait_for(
+        reranker.acompress_documents(_docs("a", "bb"), "q"), timeout=1
+    )
+    assert len(ranked) == 2
+
+
+async def test_repeated_query_hits_score_cache():
+    reranker = _reranker()
+    docs = _docs("a", "bb", "ccc")
+
+    first = await reranker.acompress_documents(docs, "q")
+    second = await reranker.acompress_documents(docs, "q")
+    await reranker.acompress_documents(docs, "other query")
+
+    assert [d.id for d in first] == [d.id for d in second]
+    assert reranker.client.session.batches == [3, 3]
+
+
+async def test_score_cache_only_scores_new_chunks():
+    reranker = _reranker()
+    await reranker.acompress_documents(_docs("a", "bb"), "q")
+    await reranker.acompress_documents(_docs("a", "bb", "ccc"), "q")
+    assert reranker.client.session.batches == [2, 1]
+
+
+async def test_score_cache_follows_text_not_id():
+    reranker = _reranker()
+    child = Document(page_content="a", id="p-1")
+    parent = Document(page_content="a much longer parent", id="p-1")
+
+    await reranker.acompress_documents([child], "q")
+    ranked = await reranker.acompress_documents([parent], "q")
+
+    assert reranker.client.session.batches == [1, 1]
+    assert ranked[0].metadata["relevance_score"] > 0.8
+
+
+def test_warmup_runs_one_rerank():
+    reranker = _reranker()
+    reranker.client.rerank.return_value = []
+    reranker.warmup()
+    reranker.client.rerank.assert_called_once()
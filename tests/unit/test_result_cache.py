@@ -0,0 +1,77 @@
+"""Unit tests for docseer.retrievers.result_cache."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+from langchain_core.stores import InMemoryByteStore
+
+from docseer.retrievers import IndexVersions, RetrievalCache
+from docseer.retrievers.result_cache import ALL_DOCUMENTS
+
+DOCS = [Document(page_content="text", metadata={"distance": 0.1}, id="c1")]
+
+
+def _key(versions: list[str], **kwargs) -> str:
+    args = dict(text="q", paper_ids=["b", "a"], topk=5, model_name="m")
+    return RetrievalCache.key(versions=versions, **(args | kwargs))
+
+
+# ── IndexVersions ─────────────────────────────────────────────────────────────
+
+
+def test_versions_default_and_bump():
+    versions = IndexVersions()
+    assert versions.get(["p1", "p2"]) == ["0", "0"]
+
+    versions.bump("p1")
+    v1, v2 = versions.get(["p1", "p2"])
+    assert v1 != "0" and v2 == "0"
+    assert versions.get([ALL_DOCUMENTS]) == [v1]
+
+    versions.bump("p1")
+    assert versions.get(["p1"]) != [v1]
+
+
+# ── RetrievalCache ────────────────────────────────────────────────────────────
+
+
+def test_key_ignores_paper_order_but_not_versions():
+    assert _key(["1"], paper_ids=["a", "b"]) == _key(["1"])
+    assert _key(["1"]) != _key(["2"])
+    assert _key(["1"]) != _key(["1"], topk=3)
+    assert _key(["1"]) != _key(["1"], model_name="other")
+
+
+def test_roundtrip_returns_copies():
+    cache = RetrievalCache()
+    cache.set("k", DOCS)
+    docs = cache.get("k")
+    assert docs == DOCS
+    docs[0].metadata["relevance_score"] = 1.0
+    assert "relevance_score" not in cache.get("k")[0].metadata
+
+
+def test_lru_eviction():
+    cache = RetrievalCache(maxsize=2)
+    cache.set("a", DOCS)
+    cache.set("b", DOCS)
+    cache.get("a")
+    cache.set("c", DOCS)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_ttl_expiry():
+    cache = RetrievalCache(ttl=10)
+    with patch("docseer.retrievers.result_cache.time.time", return_value=0):
+        cache.set("k", DOCS)
+    with patch("docseer.retrievers.result_cache.time.time", return_value=11):
+        assert cache.get("k") is None
+
+
+def test_store_tier_is_shared():
+    store = InMemoryByteStore()
+    RetrievalCache(store=store).set("k", DOCS)
+    assert RetrievalCache(store=store).get("k") == DOCS
@@ -0,0 +1,764 @@
+"""Unit tests for docseer.retrievers.retriever.Retriever."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake import FakeStreamingListLLM
+
+from docseer.chunkers import ParentChildChunker
+from docseer.databases import (
+    BM25Index,
+    ChromaVectorDB,
+    LocalFileStoreDB,
+    ParentCache,
+)
+from docseer.retrievers import (
+    IndexVersions,
+    MultiStepsRetriever,
+    Retriever,
+    RetrievalCache,
+    StageBudget,
+    interleave_papers,
+)
+
+SAMPLE_MD = """\
+# Introduction
+
+Transformers replace recurrence with attention over the whole sequence.
+
+## Method
+
+Multi-head attention projects queries, keys and values several times.
+
+## Results
+
+The model reaches 28.4 BLEU on WMT 2014 English-to-German.
+
+# Conclusion
+
+Attention is all you need.
+"""
+
+
+class HashEmbeddings:
+    model = "hash"
+
+    def _embed(self, text: str) -> list[float]:
+        return [float(text.lower().count(c)) + 0.1 for c in "aeioutnsrl"]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+
+@pytest.fixture
+def retriever(tmp_path) -> Retriever:
+    (tmp_path / "docstore").mkdir()
+    return Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        docstore=LocalFileStoreDB(tmp_path / "docstore"),
+        topk=3,
+    )
+
+
+async def _ingest(retriever: Retriever, content: str) -> dict[str, int]:
+    result = ParentChildChunker(
+        child_chunk_size=60, child_chunk_overlap=0
+    ).chunk(content, "paper")
+    return await retriever.aupdate_document(
+        "paper",
+        chunks=result["chunks"],
+        metadata={"document_id": "paper"},
+        parent_ids=result["parent_ids"],
+        parent_chunks=result["parent_chunks"],
+    )
+
+
+# ── incremental re-ingest ─────────────────────────────────────────────────────
+
+
+async def test_first_ingest_adds_everything(retriever):
+    diff = await _ingest(retriever, SAMPLE_MD)
+    assert diff["added"] > 0
+    assert diff["deleted"] == 0
+    assert diff["unchanged"] == 0
+    assert len(retriever.vector_db.get_ids("paper")) == diff["added"]
+
+
+async def test_unchanged_reingest_writes_nothing(retriever):
+    first = await _ingest(retriever, SAMPLE_MD)
+    second = await _ingest(retriever, SAMPLE_MD)
+    assert second == {"added": 0, "deleted": 0, "unchanged": first["added"]}
+
+
+async def test_edit_only_touches_changed_chunks(retriever):
+    first = await _ingest(retriever, SAMPLE_MD)
+    edited = SAMPLE_MD.replace("28.4 BLEU", "41.8 BLEU")
+    diff = await _ingest(retriever, edited)
+
+    assert 0 < diff["added"] < first["added"]
+    assert diff["deleted"] > 0
+    assert diff["unchanged"] > 0
+
+    stored = set(retriever.vector_db.get_ids("paper"))
+    assert len(stored) == diff["added"] + diff["unchanged"]
+    docs = await retriever.aretrieve("BLEU results", paper_ids=["paper"])
+    assert all("28.4" not in d.page_content for d in docs)
+
+
+async def test_streamed_update_matches_batch_update(retriever):
+    chunker = ParentChildChunker(child_chunk_size=60, child_chunk_overlap=0)
+    first = await _ingest(retriever, SAMPLE_MD)
+    parents = sorted(retriever.docstore.keys("paper"))
+
+    same = await retriever.aupdate_document_stream(
+        "paper",
+        chunker.achunk_stream(SAMPLE_MD, "paper"),
+        metadata={"document_id": "paper"},
+    )
+    assert same == {"added": 0, "deleted": 0, "unchanged": first["added"]}
+
+    edited = SAMPLE_MD.replace("28.4 BLEU", "41.8 BLEU")
+    diff = await retriever.aupdate_document_stream(
+        "paper",
+        chunker.achunk_stream(edited, "paper"),
+        metadata={"document_id": "paper"},
+    )
+    assert diff["added"] > 0 and diff["deleted"] > 0
+    expected = chunker.chunk(edited, "paper")
+    assert set(retriever.vector_db.get_ids("paper")) == {
+        c.id for c in expected["chunks"]
+    }
+    assert sorted(retriever.docstore.keys("paper")) == sorted(
+        expected["parent_ids"]
+    )
+    assert sorted(retriever.docstore.keys("paper")) != parents
+
+
+async def test_streamed_update_indexes_lexical_per_batch(retriever, tmp_path):
+    retriever.lexical_index = BM25Index(tmp_path / "lexical")
+    chunker = ParentChildChunker(child_chunk_size=60, child_chunk_overlap=0)
+    batches = []
+    add = retriever.lexical_index.add
+
+    def _add(chunks, metadata):
+        batches.append(len(chunks))
+        add(chunks, metadata)
+
+    retriever.lexical_index.add = _add
+    diff = await retriever.aupdate_document_stream(
+        "paper",
+        chunker.achunk_stream(SAMPLE_MD, "paper"),
+        metadata={"document_id": "paper"},
+        parent_batch_size=1,
+    )
+    assert len([n for n in batches if n]) > 1
+    assert sum(batches) == diff["added"] == len(retriever.lexical_index)
+
+
+async def test_stale_parents_are_removed(retriever):
+    await _ingest(retriever, SAMPLE_MD)
+    await _ingest(retriever, "# Only\n\nA single short section.\n")
+    keys = retriever.docstore.keys("paper")
+    assert len(keys) == 1
+
+
+async def test_delete_document_clears_docstore(retriever):
+    await _ingest(retriever, SAMPLE_MD)
+    retriever.delete_document("paper")
+    assert retriever.vector_db.get_ids("paper") == []
+    assert retriever.docstore.keys("paper") == []
+
+
+# ── parent expansion ──────────────────────────────────────────────────────────
+
+
+async def test_sibling_hits_share_one_parent_block(retriever):
+    retriever.docstore.add(
+        ["paper-a", "paper-b"],
+        [Document(page_content="Parent A"), Document(page_content="Parent B")],
+    )
+    chunks = [
+        Document(page_content="b1", metadata={"parent_id": "paper-b"}),
+        Document(page_content="a1", metadata={"parent_id": "paper-a"}),
+        Document(page_content="gone", metadata={"parent_id": "paper-x"}),
+        Document(page_content="b2", metadata={"parent_id": "paper-b"}),
+        Document(page_content="orphan"),
+    ]
+
+    docs = await retriever._aload_parents(chunks)
+
+    # best-rank order; a missing parent keeps its child chunk
+    assert [d.page_content for d in docs] == [
+        "Parent B",
+        "Parent A",
+        "gone",
+        "orphan",
+    ]
+    assert [d.metadata.get("hits") for d in docs] == [2, 1, None, None]
+    assert docs[0].id == "paper-b"
+    assert retriever._expand_parents(chunks) == docs
+
+
+async def test_cached_parents_skip_the_docstore(retriever, monkeypatch):
+    retriever.docstore.add(["paper-a"], [Document(page_content="Parent A")])
+    retriever.docstore = ParentCache(retriever.docstore)
+    chunks = [Document(page_content="a1", metadata={"parent_id": "paper-a"})]
+    await retriever._aload_parents(chunks)
+
+    def _unreachable(*args):
+        raise AssertionError("docstore read for a cached parent")
+
+    monkeypatch.setattr(asyncio, "to_thread", _unreachable)
+    docs = await retriever._aload_parents(chunks)
+    assert [d.page_content for d in docs] == ["Parent A"]
+
+
+# ── distance cutoff ───────────────────────────────────────────────────────────
+
+
+def _scored(*distances: float) -> list[Document]:
+    return [
+        Document(page_content=f"c{i}", metadata={"distance": d})
+        for i, d in enumerate(distances)
+    ]
+
+
+def test_no_cutoff_keeps_everything(retriever):
+    chunks = _scored(0.1, 0.9, 5.0)
+    assert retriever._apply_cutoff(chunks) == chunks
+
+
+def test_max_distance_cutoff(retriever):
+    retriever.max_distance = 1.0
+    kept = retriever._apply_cutoff(_scored(0.1, 0.9, 5.0))
+    assert [d.page_content for d in kept] == ["c0", "c1"]
+
+
+def test_relative_gap_cutoff(retriever):
+    retriever.relative_gap = 0.5
+    kept = retriever._apply_cutoff(_scored(0.4, 0.5, 0.7))
+    assert [d.page_content for d in kept] == ["c0", "c1"]
+
+
+def test_relative_gap_has_an_absolute_floor(retriever):
+    retriever.relative_gap = 0.5
+    kept = retriever._apply_cutoff(_scored(0.0, 0.04, 0.3))
+    assert [d.page_content for d in kept] == ["c0", "c1"]
+
+
+def test_cutoff_ignores_chunks_without_distance(retriever):
+    retriever.max_distance = 0.0
+    chunks = [Document(page_content="x")]
+    assert retriever._apply_cutoff(chunks) == chunks
+
+
+async def test_query_results_carry_distance(retriever):
+    await _ingest(retriever, SAMPLE_MD)
+    docs = await retriever.aretrieve("attention", paper_ids=["paper"])
+    distances = [d.metadata["distance"] for d in docs]
+    assert distances == sorted(distances)
+
+    retriever.max_distance = distances[0]
+    kept = await retriever.aretrieve("attention", paper_ids=["paper"])
+    assert 1 <= len(kept) <= len(docs)
+
+
+# ── hybrid retrieval ──────────────────────────────────────────────────────────
+
+
+async def test_lexical_index_follows_incremental_updates(retriever, tmp_path):
+    retriever.lexical_index = BM25Index(tmp_path / "lexical")
+    first = await _ingest(retriever, SAMPLE_MD)
+    assert len(retriever.lexical_index) == first["added"]
+
+    await _ingest(retriever, SAMPLE_MD.replace("28.4 BLEU", "41.8 BLEU"))
+    stored = set(retriever.vector_db.get_ids("paper"))
+    assert set(retriever.lexical_index.ids) - {None} == stored
+
+    retriever.delete_document("paper")
+    assert len(retriever.lexical_index) == 0
+
+
+async def test_hybrid_surfaces_exact_identifier(tmp_path):
+    (tmp_path / "docstore").mkdir()
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        lexical_index=BM25Index(tmp_path / "lexical"),
+        topk=1,
+    )
+    chunks = [
+        Document(page_content="attention attention attention", id="a"),
+        Document(page_content="we evaluate on WMT14", id="b"),
+    ]
+    await retriever.apopulate(chunks, {"document_id": "paper"}, None, None)
+
+    docs = await retriever.aretrieve("WMT14", paper_ids=["paper"], topk=2)
+    assert docs[0].id == "b"
+
+    retriever.topk = 2
+    assert retriever.invoke("WMT14")[0].id == "b"
+
+
+# ── retrieval result cache ────────────────────────────────────────────────────
+
+
+async def test_result_cache_hits_until_paper_is_reingested(retriever):
+    retriever.result_cache = RetrievalCache()
+    retriever.index_versions = IndexVersions()
+    await _ingest(retriever, SAMPLE_MD)
+
+    first = await retriever.aretrieve("BLEU", paper_ids=["paper"])
+    with patch.object(retriever.vector_db, "aquery") as aquery:
+        assert await retriever.aretrieve("BLEU", paper_ids=["paper"]) == first
+        aquery.assert_not_called()
+
+    # an ingest of another paper keeps the entry, re-ingesting this one not
+    retriever.index_versions.bump("other")
+    with patch.object(retriever.vector_db, "aquery") as aquery:
+        await retriever.aretrieve("BLEU", paper_ids=["paper"])
+        aquery.assert_not_called()
+
+    await _ingest(retriever, SAMPLE_MD.replace("28.4 BLEU", "41.8 BLEU"))
+    docs = await retriever.aretrieve("BLEU", paper_ids=["paper"])
+    assert docs != first
+
+
+# ── MMR ───────────────────────────────────────────────────────────────────────
+
+
+async def test_mmr_drops_near_duplicate_chunks(tmp_path):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        topk=2,
+    )
+    chunks = [
+        Document(page_content="attention is all you need", id="a"),
+        Document(page_content="attention is all you need!", id="b"),
+        Document(page_content="recurrent nets are slow", id="c"),
+    ]
+    await retriever.apopulate(chunks, {"document_id": "paper"}, None, None)
+
+    plain = await retriever.aretrieve("attention", paper_ids=["paper"])
+    assert {d.id for d in plain} == {"a", "b"}
+
+    retriever.mmr_lambda = 0.3
+    diverse = await retriever.aretrieve("attention", paper_ids=["paper"])
+    assert len(diverse) == 2
+    assert "c" in {d.id for d in diverse}
+    assert [d.id for d in retriever.invoke("attention")] == [
+        d.id for d in diverse
+    ]
+
+
+# ── multi-query fan-out ───────────────────────────────────────────────────────
+
+
+async def test_fan_out_is_bounded_and_starts_while_queries_stream(retriever):
+    retriever.fanout_concurrency = 2
+    events: list[str] = []
+    in_flight = 0
+    peak = 0
+
+    async def fake_aquery(text, k, paper_ids=None, stages=None):
+        nonlocal in_flight, peak
+        events.append(f"search {text}")
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [Document(page_content=text, id=text)]
+
+    async def queries():
+        for text in ["q1", "q2", "q1", "q3", "q4"]:
+            events.append(f"yield {text}")
+            yield text
+            await asyncio.sleep(0)
+
+    with patch.object(retriever, "_aquery", side_effect=fake_aquery):
+        docs = await retriever.aretrieve_stream(queries(), topk=4)
+
+    assert sorted(d.id for d in docs) == ["q1", "q2", "q3", "q4"]
+    assert events.index("search q1") < events.index("yield q4")
+    assert peak == 2
+
+
+async def test_fan_out_fuses_by_chunk_id(retriever):
+    hits = {
+        "q1": ["a", "b", "c"],
+        "q2": ["b", "d"],
+        "q3": ["b", "a"],
+    }
+
+    async def fake_adense_each(texts, k, paper_ids, stages):
+        return [
+            [Document(page_content=i, id=i) for i in hits[text]]
+            for text in texts
+        ]
+
+    with patch.object(retriever, "_adense_each", side_effect=fake_adense_each):
+        docs = await retriever.aretrieve_many(["q1", "q2", "q3"])
+
+    # fused over every variant, then cut to topk
+    assert [d.id for d in docs] == ["b", "a", "d"]
+
+
+async def test_known_queries_share_one_embedding_and_search(retriever):
+    chunks = [
+        Document(page_content="attention is all you need", id="a"),
+        Document(page_content="recurrent nets are slow", id="c"),
+    ]
+    await retriever.apopulate(chunks, {"document_id": "paper"}, None, None)
+    db = retriever.vector_db
+    queries = ["attention", "recurrent nets", "attention"]
+
+    with (
+        patch.object(db, "aembed_query") as aembed_query,
+        patch.object(
+            db.collection, "query", wraps=db.collection.query
+        ) as query,
+    ):
+        docs = await retriever.aretrieve_many(queries, topk=2)
+        assert {d.id for d in docs} == {"a", "c"}
+        assert retriever.retrieve_many(queries, topk=2) == docs
+
+    aembed_query.assert_not_called()
+    assert query.call_count == 2
+    assert len(query.call_args.kwargs["query_embeddings"]) == 2
+
+
+async def test_cached_variants_are_searched_in_one_batch(retriever):
+    llm = FakeStreamingListLLM(responses=["alpha\nbeta"])
+    multi = MultiStepsRetriever.init(retriever, llm=llm, think_mode=True)
+
+    stream, many = Retriever.aretrieve_stream, Retriever.aretrieve_many
+    with (
+        patch.object(
+            Retriever, "aretrieve_stream", autospec=True, side_effect=stream
+        ) as streamed,
+        patch.object(
+            Retriever, "aretrieve_many", autospec=True, side_effect=many
+        ) as batched,
+    ):
+        await multi.ainvoke("q")
+        await multi.ainvoke("q")
+
+    streamed.assert_called_once()
+    assert batched.call_args.args[1] == ["q", "alpha", "beta"]
+
+
+async def test_query_variants_stream_and_are_cached(retriever):
+    llm = FakeStreamingListLLM(responses=["alpha\n\nbeta\ngamma"])
+    multi = MultiStepsRetriever.init(retriever, llm=llm, think_mode=True)
+
+    variants = [v async for v in multi.agenerate_queries("q")]
+    assert variants == ["q", "alpha", "beta", "gamma"]
+
+    llm.responses = ["delta"]
+    assert [v async for v in multi.agenerate_queries("q")] == variants
+    assert multi.generate_queries("q") == variants
+    assert multi.generate_queries("other") == ["other", "delta"]
+
+    # variants are cached per llm model
+    class OtherModel(FakeStreamingListLLM):
+        model: str = "other-model"
+
+    multi.llm = OtherModel(responses=["epsilon"])
+    assert multi.generate_queries("q") == ["q", "epsilon"]
+
+
+# ── stage deadlines ───────────────────────────────────────────────────────────
+
+
+async def test_expand_timeout_keeps_child_chunks_uncached(retriever):
+    retriever.result_cache = RetrievalCache()
+    await _ingest(retriever, SAMPLE_MD)
+    parents = await retriever.aretrieve("BLEU", paper_ids=["paper"])
+    retriever.result_cache = RetrievalCache()
+
+    slow_mget = retriever.docstore.mget
+
+    def _slow(ids):
+        time.sleep(0.2)
+        return slow_mget(ids)
+
+    stages = StageBudget({"expand": 0.05})
+    with patch.object(retriever.docstore, "mget", side_effect=_slow):
+        docs = await retriever.aretrieve(
+            "BLEU", paper_ids=["paper"], stages=stages
+        )
+
+    assert stages.degraded == {"expand": "timeout"}
+    assert {"embed", "search", "expand"} <= stages.timings.keys()
+    assert list(dict.fromkeys(d.metadata["parent_id"] for d in docs)) == [
+        d.metadata["parent_id"] for d in parents
+    ]
+    assert [d.page_content for d in docs] != [d.page_content for d in parents]
+    # the degraded result is not cached
+    assert await retriever.aretrieve("BLEU", paper_ids=["paper"]) == parents
+
+
+async def test_dense_timeout_falls_back_to_lexical_hits(tmp_path):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        lexical_index=BM25Index(tmp_path / "lexical"),
+        topk=2,
+    )
+    chunks = [
+        Document(page_content="attention attention attention", id="a"),
+        Document(page_content="we evaluate on WMT14", id="b"),
+    ]
+    await retriever.apopulate(chunks, {"document_id": "paper"}, None, None)
+
+    async def _slow_embed(text):
+        await asyncio.sleep(1)
+
+    stages = StageBudget({"embed": 0.01})
+    with patch.object(
+        retriever.vector_db, "aembed_query", side_effect=_slow_embed
+    ):
+        docs = await retriever.aretrieve(
+            "WMT14", paper_ids=["paper"], stages=stages
+        )
+
+    assert [d.id for d in docs] == ["b"]
+    assert stages.degraded == {"embed": "timeout"}
+
+
+async def test_overall_deadline_caps_stage_budgets(retriever):
+    await _ingest(retriever, SAMPLE_MD)
+    retriever.result_cache = RetrievalCache()
+    slow_mget = retriever.docstore.mget
+
+    def _slow(ids):
+        time.sleep(0.3)
+        return slow_mget(ids)
+
+    # the expand budget alone would let the slow docstore finish
+    stages = StageBudget({"expand": 5.0})
+    with (
+        patch.object(retriever.docstore, "mget", side_effect=_slow),
+        stages.deadline(0.1),
+    ):
+        docs = await retriever.aretrieve(
+            "BLEU", paper_ids=["paper"], stages=stages
+        )
+
+    assert docs
+    assert stages.degraded == {"expand": "timeout"}
+
+
+async def test_timeout_in_unbudgeted_stage_returns_fallback():
+    async def _late():
+        raise TimeoutError
+
+    stages = StageBudget()
+    assert await stages.run("summarize", _late(), fallback=[]) == []
+    assert stages.degraded == {"summarize": "timeout"}
+
+
+async def test_failed_lexical_search_keeps_dense_hits(tmp_path):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        lexical_index=BM25Index(tmp_path / "lexical"),
+        topk=2,
+    )
+    chunks = [Document(page_content="we evaluate on WMT14", id="b")]
+    await retriever.apopulate(chunks, {"document_id": "paper"}, None, None)
+
+    stages = StageBudget()
+    with patch.object(
+        retriever.lexical_index, "search", side_effect=OSError("corrupt")
+    ):
+        docs = await retriever.aretrieve("WMT14", stages=stages)
+
+    assert [d.id for d in docs] == ["b"]
+    assert stages.degraded == {"lexical": "error"}
+
+
+# ── two-stage paper → chunk retrieval ─────────────────────────────────────────
+
+
+async def test_paper_index_follows_ingest_and_delete(retriever):
+    await _ingest(retriever, SAMPLE_MD)
+    papers = retriever.vector_db.paper_collection
+    sections = papers.get(where={"document_id": "paper"})["ids"]
+    assert len(sections) == 4  # one centroid per parent chunk
+
+    await retriever.aupdate_document(
+        "paper",
+        chunks=[],
+        metadata={"document_id": "paper"},
+        parent_ids=None,
+        parent_chunks=None,
+        title="Attention is all you need",
+    )
+    assert papers.get(where={"document_id": "paper"})["ids"] == []
+
+    await _ingest(retriever, SAMPLE_MD)
+    retriever.delete_document("paper")
+    assert papers.count() == 0
+
+
+async def test_populate_indexes_title_in_both_paths(tmp_path):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+    )
+    chunks = [Document(page_content="attention heads", id="c")]
+    retriever.populate(
+        chunks, {"document_id": "sync"}, None, None, title="Attention"
+    )
+    await retriever.apopulate(
+        [Document(page_content="attention heads", id="d")],
+        {"document_id": "async"},
+        None,
+        None,
+        title="Attention",
+    )
+
+    papers = retriever.vector_db.paper_collection
+    for paper in ("sync", "async"):
+        assert (
+            f"{paper}#title" in papers.get(where={"document_id": paper})["ids"]
+        )
+
+
+async def test_paper_stage_restricts_chunk_search(tmp_path):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        topk=2,
+        paper_fetch_n=1,
+    )
+    for paper, texts in {
+        "nlp": ["attention translation", "attention heads"],
+        "vision": ["sss rrr lll", "sss lll nnn"],
+    }.items():
+        chunks = [
+            Document(page_content=t, id=f"{paper}-{i}")
+            for i, t in enumerate(texts)
+        ]
+        await retriever.apopulate(chunks, {"document_id": paper}, None, None)
+
+    stages = StageBudget()
+    docs = await retriever.aretrieve("attention", stages=stages)
+    assert {d.metadata["document_id"] for d in docs} == {"nlp"}
+    assert "papers" in stages.timings
+    assert {d.metadata["document_id"] for d in retriever.invoke("sss")} == {
+        "vision"
+    }
+
+    # scopes no larger than paper_fetch_n skip the paper stage
+    stages = StageBudget()
+    docs = await retriever.aretrieve(
+        "attention", paper_ids=["vision"], stages=stages
+    )
+    assert {d.metadata["document_id"] for d in docs} == {"vision"}
+    assert "papers" not in stages.timings
+
+
+# ── per-paper quota ───────────────────────────────────────────────────────────
+
+
+async def test_per_paper_quota_covers_every_paper(tmp_path):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        topk=3,
+    )
+    papers = {
+        "verbose": [f"attention{p}" for p in "!?.;:"],
+        "short": ["attention span ratios"],
+        "other": ["sss rrr lll"],
+    }
+    for paper, texts in papers.items():
+        chunks = [
+            Document(page_content=t, id=f"{paper}-{i}")
+            for i, t in enumerate(texts)
+        ]
+        await retriever.apopulate(chunks, {"document_id": paper}, None, None)
+
+    plain = await retriever.aretrieve("attention", paper_ids=list(papers))
+    assert {d.metadata["document_id"] for d in plain} == {"verbose"}
+
+    docs = await retriever.aretrieve(
+        "attention", paper_ids=list(papers), per_paper_quota=2
+    )
+    assert len(docs) == 3
+    assert {d.metadata["document_id"] for d in docs} == set(papers)
+    assert docs[0].metadata["document_id"] == "verbose"
+
+
+async def test_per_paper_drops_failed_papers(tmp_path, monkeypatch):
+    retriever = Retriever(
+        vector_db=ChromaVectorDB(
+            HashEmbeddings(), path_db=tmp_path / "embeds_db"
+        ),
+        topk=3,
+    )
+    for paper in ("good", "bad"):
+        chunk = Document(page_content=f"attention {paper}", id=paper)
+        await retriever.apopulate([chunk], {"document_id": paper}, None, None)
+
+    aquery = Retriever._aquery
+
+    async def _flaky(self, text, k, paper_ids=None, *args, **kwargs):
+        if paper_ids == ["bad"]:
+            raise RuntimeError("search failed")
+        return await aquery(self, text, k, paper_ids, *args, **kwargs)
+
+    monkeypatch.setattr(Retriever, "_aquery", _flaky)
+    stages = StageBudget()
+    docs = await retriever.aretrieve(
+        "attention",
+        paper_ids=["good", "bad"],
+        per_paper_quota=2,
+        stages=stages,
+    )
+    assert [d.metadata["document_id"] for d in docs] == ["good"]
+    assert stages.degraded == {"search": "error"}
+
+    with pytest.raises(RuntimeError):
+        await retriever.aretrieve(
+            "attention", paper_ids=["bad", "bad"], per_paper_quota=2
+        )
+
+
+def test_interleave_papers_round_robin():
+    docs = [
+        Document(page_content=c, metadata={"document_id": p})
+        for p, c in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+    ]
+    assert [d.page_content for d in interleave_papers(docs)] == [
+        "a1",
+        "b1",
+        "a2",
+        "a3",
+    ]
@@ -0,0 +1,34 @@
+"""Unit tests for backend.app.services.retriever."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from backend.app.config import Settings
+from backend.app.services.retriever import build_retriever
+
+
+def test_build_retriever_applies_retriever_settings():
+    settings = Settings(
+        retriever_topk=7,
+        retriever_max_distance=0.8,
+        retriever_mmr_lambda=0.5,
+        retriever_paper_fetch_n=3,
+    )
+    docstore, lexical_index = MagicMock(), MagicMock()
+
+    retriever = build_retriever(
+        settings,
+        MagicMock(),
+        docstore=docstore,
+        lexical_index=lexical_index,
+        result_cache=None,
+        index_versions=None,
+    )
+
+    assert retriever.topk == 7
+    assert retriever.max_distance == 0.8
+    assert retriever.mmr_lambda == 0.5
+    assert retriever.paper_fetch_n == 3
+    assert retriever.docstore is docstore
+    assert retriever.lexical_index is lexical_index
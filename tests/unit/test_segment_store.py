@@ -0,0 +1,149 @@
+"""Unit tests for docseer.databases.segment_store.SegmentStoreDB."""
+
+from __future__ import annotations
+
+import os
+
+from langchain_core.documents import Document
+
+from docseer.databases import LocalFileStoreDB, SegmentStoreDB
+from docseer.databases.segment_store import migrate_local_file_store
+
+
+def _key(document_id: str, i: int) -> str:
+    return f"{document_id}-{i:016x}"
+
+
+def _add(store: SegmentStoreDB, document_id: str, n: int) -> list[str]:
+    ids = [_key(document_id, i) for i in range(n)]
+    store.add(
+        ids,
+        [Document(page_content=f"{document_id} parent {i}") for i in range(n)],
+    )
+    return ids
+
+
+def _segments(path) -> list[str]:
+    return sorted(p for p in os.listdir(path) if p.endswith(".seg"))
+
+
+def test_add_get_keys(tmp_path):
+    store = SegmentStoreDB(tmp_path)
+    assert store.is_empty
+    ids = _add(store, "p1", 3)
+    _add(store, "p1-v2", 2)
+
+    assert not store.is_empty
+    assert store.get([ids[2], "missing", ids[0]]) == [
+        "p1 parent 2",
+        "p1 parent 0",
+    ]
+    # "p1-v2" is another document, not a parent of "p1"
+    assert store.keys("p1") == ids
+    assert len(store.keys("p1-v2")) == 2
+
+
+def test_overwrite_keeps_latest_value(tmp_path):
+    store = SegmentStoreDB(tmp_path)
+    key = _key("p1", 0)
+    store.add([key], [Document(page_content="old")])
+    store.add([key], [Document(page_content="new")])
+    assert store.get([key]) == ["new"]
+    assert SegmentStoreDB(tmp_path).get([key]) == ["new"]
+
+
+def test_delete_document_and_ids(tmp_path):
+    store = SegmentStoreDB(tmp_path)
+    p1 = _add(store, "p1", 3)
+    p2 = _add(store, "p2", 2)
+
+    store.delete("p1")
+    assert store.get(p1) == []
+    assert store.keys("p1") == []
+    store.delete_ids([p2[0]])
+    assert store.get(p2) == ["p2 parent 1"]
+
+    reopened = SegmentStoreDB(tmp_path)
+    assert reopened.keys("p1") == []
+    assert reopened.keys("p2") == [p2[1]]
+
+
+def test_writes_are_visible_to_other_instances(tmp_path):
+    reader = SegmentStoreDB(tmp_path)
+    assert reader.is_empty
+    writer = SegmentStoreDB(tmp_path)
+    ids = _add(writer, "p1", 2)
+    assert reader.get(ids) == ["p1 parent 0", "p1 parent 1"]
+    writer.delete("p1")
+    assert reader.is_empty
+
+
+def test_rolls_over_to_new_segments(tmp_path):
+    store = SegmentStoreDB(tmp_path, segment_size=64)
+    ids = [_key("p1", i) for i in range(5)]
+    for i, key in enumerate(ids):
+        store.add([key], [Document(page_content=f"parent {i}")])
+    assert len(_segments(tmp_path)) > 1
+    assert SegmentStoreDB(tmp_path).get(ids) == [
+        f"parent {i}" for i in range(5)
+    ]
+
+
+def test_torn_tail_is_ignored_and_overwritten(tmp_path):
+    store = SegmentStoreDB(tmp_path)
+    ids = _add(store, "p1", 2)
+    with open(tmp_path / _segments(tmp_path)[-1], "ab") as f:
+        f.write(b"\x01\x10\x00half a record")
+
+    reader = SegmentStoreDB(tmp_path)
+    assert reader.get(ids) == ["p1 parent 0", "p1 parent 1"]
+    more = _add(reader, "p2", 1)
+    assert SegmentStoreDB(tmp_path).get(ids + more) == [
+        "p1 parent 0",
+        "p1 parent 1",
+        "p2 parent 0",
+    ]
+
+
+def test_compaction_drops_dead_records(tmp_path):
+    store = SegmentStoreDB(tmp_path, segment_size=256)
+    reader = SegmentStoreDB(tmp_path)
+    kept = _add(store, "keep", 4)
+    for n in range(5):
+        _add(store, f"gone{n}", 4)
+        store.delete(f"gone{n}")
+    assert reader.get(kept)
+    before = sum(os.path.getsize(tmp_path / s) for s in _segments(tmp_path))
+
+    store.compact(force=True)
+    assert len(_segments(tmp_path)) == 1
+    assert os.path.getsize(tmp_path / _segments(tmp_path)[0]) < before
+    assert store.get(kept) == [f"keep parent {i}" for i in range(4)]
+    # a reader holding maps of the old segments picks up the new one
+    assert reader.get(kept) == [f"keep parent {i}" for i in range(4)]
+    assert reader.keys("gone0") == []
+
+
+def test_compaction_starts_past_dead_ratio(tmp_path):
+    store = SegmentStoreDB(tmp_path, min_compact_bytes=0, compact_ratio=0.5)
+    kept = _add(store, "keep", 1)
+    _add(store, "gone", 8)
+    store.delete("gone")
+    store._compaction.join()
+    assert store.get(kept) == ["keep parent 0"]
+    assert store.keys("gone") == []
+    assert store._live_bytes == store._total_bytes
+
+
+def test_migrate_local_file_store(tmp_path):
+    (tmp_path / "docstore").mkdir()
+    legacy = LocalFileStoreDB(tmp_path / "docstore")
+    ids = [_key("p1", i) for i in range(3)]
+    legacy.add(ids, [Document(page_content=f"parent {i}") for i in range(3)])
+
+    store = SegmentStoreDB(tmp_path / "docstore" / "segments")
+    assert migrate_local_file_store(tmp_path / "docstore", store) == 3
+    assert store.get(ids) == legacy.get(ids)
+    assert store.keys("p1") == sorted(ids)
+    # re-running copies nothing twice
+    assert migrate_local_file_store(tmp_path / "docstore", store) == 0
@@ -0,0 +1,79 @@
+"""Unit tests for token-aware chunking (docseer.chunkers.TokenCounter)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from backend.app.routers.chat import _build_context_md
+from docseer.chunkers import ParentChildChunker, TokenCounter
+from docseer.retrievers import doc_tokens
+
+MD = (
+    "# Results\n\n"
+    + " ".join(f"word{i}" for i in range(120))
+    + "\n\n## Table\n\n| a | b |\n| --- | --- |\n| 1 | 2 |\n"
+)
+
+
+@pytest.fixture
+def counter(tmp_path) -> TokenCounter:
+    tokenizer = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    path = tmp_path / "tokenizer.json"
+    tokenizer.save(str(path))
+    return TokenCounter(str(path))
+
+
+def test_counter_is_memoized(counter):
+    assert counter("a b, c") == 4
+    assert counter("a b, c") == 4
+    assert counter._count.cache_info().hits == 1
+
+
+def test_children_fit_the_token_budget(counter):
+    chunker = ParentChildChunker(
+        child_chunk_size=30, child_chunk_overlap=0, length_function=counter
+    )
+    result = chunker.chunk(MD, "doc")
+    chunks = result["chunks"]
+
+    assert len(chunks) > 4
+    assert all(c.metadata["tokens"] == counter(c.page_content) for c in chunks)
+    assert all(c.metadata["tokens"] <= 30 for c in chunks)
+    parents = {p.id: p for p in result["parent_chunks"]}
+    assert all(
+        c.metadata["parent_tokens"]
+        == counter(parents[c.metadata["parent_id"]].page_content)
+        for c in chunks
+    )
+
+
+def test_character_mode_records_no_counts():
+    chunks = ParentChildChunker().chunk(MD, "doc")["chunks"]
+    assert all("tokens" not in c.metadata for c in chunks)
+    assert doc_tokens(chunks[0]) == len(chunks[0].page_content) // 4
+
+
+def test_context_is_packed_by_tokens():
+    settings = SimpleNamespace(
+        chat_context_docs=5,
+        chat_max_context_chars=100_000,
+        chat_max_context_tokens=250,
+    )
+    context = [
+        Document(page_content=f"block {i}", metadata={"tokens": 100})
+        for i in range(4)
+    ]
+    md = _build_context_md("q", context, settings)
+    assert "block 1" in md and "block 2" not in md
+
+    # a first block over budget is still sent
+    context[0].metadata["tokens"] = 1000
+    md = _build_context_md("q", context, settings)
+    assert "block 0" in md and "block 1" not in md